@@ -0,0 +1,19 @@
+#!/bin/sh
+# Streaming read replica of fms-postgres for testing the GET routing locally
+# - cloned from the primary with pg_basebackup on the first start (-R writes standby.signal and primary_conninfo)
+# - read-only afterwards, follows the primary's WAL
+set -e
+
+PGDATA="${PGDATA:-/var/lib/postgresql/data}"
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$POSTGRES_PRIMARY_HOST" -U "$POSTGRES_USER"; do
+        sleep 1
+    done
+
+    PGPASSWORD="$POSTGRES_PASSWORD" pg_basebackup \
+        -h "$POSTGRES_PRIMARY_HOST" -U "$POSTGRES_USER" -D "$PGDATA" -X stream -R
+    chmod 0700 "$PGDATA"
+fi
+
+exec postgres
@@ -0,0 +1,11 @@
+#!/bin/sh
+# Allow streaming replication connections (fms-postgres-replica) with a password
+# - runs only when the primary's data directory is initialized, on an existing volume run it once with
+#   docker compose exec fms-postgres sh /docker-entrypoint-initdb.d/replication-init.sh && docker compose restart fms-postgres
+set -e
+
+PGDATA="${PGDATA:-/var/lib/postgresql/data}"
+
+if ! grep -q "^host replication all all md5" "$PGDATA/pg_hba.conf"; then
+    echo "host replication all all md5" >> "$PGDATA/pg_hba.conf"
+fi
@@ -0,0 +1,109 @@
+"""add_indexes
+
+Revision ID: c2f81d6a9b47
+Revises: a45137925ac9
+Create Date: 2026-10-17 10:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f81d6a9b47'
+down_revision: Union[str, None] = 'a45137925ac9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# B-tree indexes on foreign keys
+# - used by the mastertable permission filters, the submodel id lists and ON DELETE checks
+# - tree.orchard_id is covered by the composite position index below,
+#   tree_image.tree_id by the uq_tree_file (tree_id, file_id) constraint
+foreign_keys = (
+    ("tree", "genotype_id"),
+    ("tree", "rootstock_id"),
+    ("file", "file_batch_id"),
+    ("tree_image", "file_id"),
+    ("harvest", "tree_id"),
+    ("tree_data", "tree_id"),
+    ("spraying", "tree_id"),
+    ("spraying", "agent_id"),
+    ("fruit_thinning", "tree_id"),
+    ("fruit_thinning", "spraying_id"),
+    ("flower_thinning", "tree_id"),
+    ("flower_thinning", "spraying_id"),
+)
+
+# Position of a tree in an orchard - trees of an orchard, a row or a single tree
+tree_position = ("orchard_id", "row", "field", "number")
+
+# BRIN indexes on timestamps
+# - rows are inserted roughly in time order, a BRIN index stays a few pages large on millions of rows
+timestamps = (
+    ("file", "datetime"),
+    ("harvest", "datetime"),
+    ("tree_data", "datetime"),
+    ("spraying", "datetime"),
+    ("fruit_thinning", "datetime"),
+    ("flower_thinning", "datetime"),
+    ("tree", "updated_at"),
+    ("file", "updated_at"),
+    ("tree_image", "updated_at"),
+    ("harvest", "updated_at"),
+    ("tree_data", "updated_at"),
+    ("spraying", "updated_at"),
+    ("fruit_thinning", "updated_at"),
+    ("flower_thinning", "updated_at"),
+)
+
+
+def index_name(table_name: str, *column_names: str) -> str:
+    return f"ix_{table_name}_{'_'.join(column_names)}"
+
+
+def create_index_concurrently(name: str, table_name: str, column_names: list[str], **kwargs) -> None:
+    # A failed or interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+    # IF NOT EXISTS alone would skip it - dropped and built again instead
+    invalid = op.get_bind().execute(
+        sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+    op.create_index(name, table_name, column_names, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def upgrade() -> None:
+
+    # CREATE INDEX CONCURRENTLY does not lock the tables for writes, it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+
+        for table_name, column_name in foreign_keys:
+            create_index_concurrently(index_name(table_name, column_name), table_name, [column_name])
+
+        create_index_concurrently(index_name("tree", *tree_position), "tree", list(tree_position))
+
+        for table_name, column_name in timestamps:
+            create_index_concurrently(
+                index_name(table_name, column_name), table_name, [column_name], postgresql_using="brin",
+            )
+
+
+def downgrade() -> None:
+
+    with op.get_context().autocommit_block():
+
+        for table_name, column_name in (*foreign_keys, *timestamps):
+            op.drop_index(
+                index_name(table_name, column_name), table_name=table_name,
+                postgresql_concurrently=True, if_exists=True,
+            )
+
+        op.drop_index(
+            index_name("tree", *tree_position), table_name="tree",
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,45 @@
+"""keycloak_role_outbox
+
+Revision ID: d4a7e2b91c35
+Revises: c2f81d6a9b47
+Create Date: 2026-10-17 14:03:26.114970
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e2b91c35'
+down_revision: Union[str, None] = 'c2f81d6a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+    op.create_table(
+        "keycloak_role_outbox",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("action", sa.String, nullable=False),
+        sa.Column("role_name", sa.String, nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column("last_error", sa.String, nullable=True),
+        sa.Column("claim_id", sa.String, nullable=True),
+        sa.Column("claimed_until", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    )
+
+    # The dispatcher only reads pending entries which are due
+    op.create_index(
+        "ix_keycloak_role_outbox_pending", "keycloak_role_outbox", ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("keycloak_role_outbox")
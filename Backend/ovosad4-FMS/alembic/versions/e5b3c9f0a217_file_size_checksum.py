@@ -0,0 +1,30 @@
+"""file_size_checksum
+
+Revision ID: e5b3c9f0a217
+Revises: d4a7e2b91c35
+Create Date: 2026-10-17 15:21:08.372514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b3c9f0a217'
+down_revision: Union[str, None] = 'd4a7e2b91c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+    # Computed while the upload is streamed to storage - NULL for files uploaded before
+    op.add_column("file", sa.Column("size", sa.BigInteger, nullable=True))
+    op.add_column("file", sa.Column("sha256", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("file", "sha256")
+    op.drop_column("file", "size")
@@ -0,0 +1,61 @@
+"""file_blob
+
+Revision ID: f1a6d8e4c053
+Revises: e5b3c9f0a217
+Create Date: 2026-10-17 16:44:52.906131
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6d8e4c053'
+down_revision: Union[str, None] = 'e5b3c9f0a217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+    # Content-addressed blobs - existing uid-named files are moved over by app.backend.file_storage_dedup
+    op.create_table(
+        "file_blob",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size", sa.BigInteger, nullable=False),
+        sa.Column("ref_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    )
+
+    # Unreferenced blobs are found without a scan of the whole table
+    op.create_index(
+        "ix_file_blob_unreferenced", "file_blob", ["created_at"],
+        postgresql_where=sa.text("ref_count <= 0"),
+    )
+
+    # Files by their content - reference counts are repaired and orphans found by uid
+    with op.get_context().autocommit_block():
+        # An interrupted concurrent build leaves an INVALID index, IF NOT EXISTS alone would keep it
+        invalid = op.get_bind().execute(
+            sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass('ix_file_uid')")
+        ).scalar()
+        if invalid:
+            op.drop_index("ix_file_uid", table_name="file", postgresql_concurrently=True, if_exists=True)
+
+        op.create_index(
+            "ix_file_uid", "file", ["uid"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_file_uid", table_name="file",
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+    op.drop_table("file_blob")
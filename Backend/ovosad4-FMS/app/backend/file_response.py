@@ -0,0 +1,60 @@
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+# Config - From docker environment variables
+FILE_CACHE_MAX_AGE = int(os.getenv("FILE_CACHE_MAX_AGE", "31536000")) # Seconds a browser keeps downloaded files
+
+# private - the files are only served to authenticated users, shared caches must not keep them
+FILE_CACHE_CONTROL = f"private, max-age={FILE_CACHE_MAX_AGE}, immutable"
+
+
+class ImmutableFileResponse(FileResponse):
+    """FileResponse for stored content which never changes under its URL.
+
+    - the file is sent from disk in chunks, Range requests are answered by FileResponse (206, multipart ranges)
+    - strong ETag derived from the stored content instead of FileResponse's mtime/size ETag,
+      If-None-Match is answered with 304 and If-Range is compared against it
+    - Cache-Control immutable, browsers do not revalidate while max-age lasts
+    """
+
+    def __init__(self, path: str | os.PathLike, content_tag: str, media_type: str | None = None) -> None:
+        self.etag = f'"{content_tag}"'
+        super().__init__(
+            path,
+            media_type=media_type,
+            headers={"etag": self.etag, "cache-control": FILE_CACHE_CONTROL},
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+
+        # Conditional GET - the browser already has this content
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and self._etag_matches(if_none_match):
+            response = Response(status_code=304, headers={"etag": self.etag, "cache-control": FILE_CACHE_CONTROL})
+            await response(scope, receive, send)
+            return
+
+        # FileResponse compares If-Range with its own ETag - compare with ours and drop the header:
+        # matching -> the Range is served, not matching -> the whole file is served
+        if_range = request_headers.get("if-range")
+        if if_range is not None:
+            scope = {
+                **scope,
+                "headers": [
+                    (key, value) for key, value in scope["headers"]
+                    if key != b"if-range" and (key != b"range" or if_range == self.etag)
+                ],
+            }
+
+        await super().__call__(scope, receive, send)
+
+    def _etag_matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, W/"x" matches "x"
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return self.etag in tags
@@ -0,0 +1,140 @@
+"""Move uid-named files into the content-addressed (sha256) file storage.
+
+Files uploaded before FILE_STORAGE_MODE=sha256 are stored under a uuid4 each.
+For every such File row the content is hashed, linked to its sha256 name (or
+found to be a duplicate of an existing blob), the row is pointed at the blob
+and the uid-named file is removed. Runs in batches, one transaction each, and
+can be interrupted and started again at any time. The API can keep running -
+a file is linked under its new name before its row changes.
+
+    python -m app.backend.file_storage_dedup --dry-run
+    python -m app.backend.file_storage_dedup --batch-size 200
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import pathlib
+
+from sqlalchemy import or_, select
+
+from app.backend.session import open_session
+from app.models.orchard import File
+from app.services.file import FileDataManager, FileStorageService, FILE_UPLOAD_CHUNK_SIZE
+
+
+def hash_file(path: pathlib.Path) -> tuple[int, str]:
+    # (size, sha256) - runs in a worker thread
+    checksum = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(FILE_UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            checksum.update(chunk)
+    return size, checksum.hexdigest()
+
+
+def link_blob(path: pathlib.Path, blob_path: pathlib.Path) -> bool:
+    # True when the blob is new, False when the content is already stored
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(path, blob_path)
+    except FileExistsError:
+        return False
+    return True
+
+
+async def migrate_batch(storage: FileStorageService, after_id: int, batch_size: int, dry_run: bool, seen: set[str]) -> tuple[int, dict]:
+    """Migrate the next batch of uid-named files.
+
+    Returns:
+        (id of the last row of the batch - 0 when done, counters of the batch)
+    """
+    counters = {"files": 0, "duplicates": 0, "missing": 0, "reclaimed_bytes": 0}
+    unlink_after_commit = []
+
+    async with open_session() as session:
+        files = (await session.scalars(
+            select(File)
+            .where(File.id > after_id, or_(File.sha256.is_(None), File.uid != File.sha256))
+            .order_by(File.id)
+            .limit(batch_size)
+        )).all()
+
+        if not files:
+            return 0, counters
+
+        last_id = files[-1].id
+        data_manager = FileDataManager(session)
+
+        for file in files:
+            path = await storage.find_file_path(file.uid)
+            if path is None:
+                print(f"File {file.id}: {file.uid} not found, skipped")
+                counters["missing"] += 1
+                continue
+
+            size, sha256 = await asyncio.to_thread(hash_file, path)
+            blob_path = storage.get_file_path(sha256)
+            counters["files"] += 1
+
+            if dry_run:
+                # Nothing is linked - remember the content seen so far instead
+                duplicate = sha256 in seen or await storage.find_file_path(sha256) is not None
+                seen.add(sha256)
+            else:
+                # Reference first - the blob cannot be removed as unreferenced while it is linked
+                await data_manager.add_blob_reference(sha256, size)
+                duplicate = not await asyncio.to_thread(link_blob, path, blob_path)
+
+                file.uid, file.size, file.sha256 = sha256, size, sha256
+                unlink_after_commit.append(path)
+
+            if duplicate:
+                counters["duplicates"] += 1
+                counters["reclaimed_bytes"] += size
+
+        if dry_run:
+            await session.rollback()
+
+    # The rows point at the blobs now - the old names can go
+    for path in unlink_after_commit:
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    return last_id, counters
+
+
+async def migrate(batch_size: int, dry_run: bool) -> dict:
+    storage = FileStorageService()
+    totals = {"files": 0, "duplicates": 0, "missing": 0, "reclaimed_bytes": 0}
+    after_id = 0
+    seen = set()
+
+    while True:
+        after_id, counters = await migrate_batch(storage, after_id, batch_size, dry_run, seen)
+        if not after_id:
+            break
+
+        for key, value in counters.items():
+            totals[key] += value
+        print(f"... up to file {after_id}: {totals}")
+
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100, help="files per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only hash and report, change nothing")
+    args = parser.parse_args()
+
+    totals = asyncio.run(migrate(args.batch_size, args.dry_run))
+    print(
+        f"{'Would migrate' if args.dry_run else 'Migrated'} {totals['files']} files, "
+        f"{totals['duplicates']} duplicates, {totals['missing']} missing, "
+        f"{totals['reclaimed_bytes'] / 1024 / 1024:.1f} MiB reclaimed"
+    )
+
+
+if __name__ == "__main__":
+    main()
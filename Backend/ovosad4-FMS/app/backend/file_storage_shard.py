@@ -0,0 +1,86 @@
+"""Move files of the flat storage layout into the sharded layout (ab/cd/<uid>).
+
+Runs while the API serves files. Every file is first hard-linked under its
+sharded path, then - after --grace seconds, so requests which resolved the flat
+path just before can still open it - the flat name is removed. The API reads
+the sharded path first and falls back to the flat one. Can be interrupted and
+started again at any time.
+
+    python -m app.backend.file_storage_shard --dry-run
+    python -m app.backend.file_storage_shard --batch-size 1000 --grace 5
+"""
+import argparse
+import os
+import time
+
+from app.services.file import FileStorageService
+
+
+def flat_files(storage: FileStorageService):
+    # Files directly in the storage directory - not the shard directories and not uploads in progress
+    with os.scandir(storage.storage_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and not entry.name.endswith(".part"):
+                yield entry.name
+
+
+def link_batch(storage: FileStorageService, uids: list[str]) -> None:
+    for uid in uids:
+        sharded_path = storage.get_file_path(uid)
+        sharded_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(storage.get_legacy_file_path(uid), sharded_path)
+        except FileExistsError:
+            # Stored again since (a content-addressed re-upload) or linked by an interrupted run
+            pass
+        except FileNotFoundError:
+            # Removed in between
+            pass
+
+
+def unlink_batch(storage: FileStorageService, uids: list[str]) -> None:
+    # Only flat names whose sharded path exists - a different file under the same uid
+    # can only be a content-addressed blob, the same content
+    for uid in uids:
+        if storage.get_file_path(uid).is_file():
+            storage.get_legacy_file_path(uid).unlink(missing_ok=True)
+
+
+def migrate(batch_size: int, grace: float, dry_run: bool) -> int:
+    storage = FileStorageService()
+    moved = 0
+    batch = []
+
+    def flush():
+        nonlocal moved
+        if not dry_run:
+            link_batch(storage, batch)
+            time.sleep(grace)
+            unlink_batch(storage, batch)
+        moved += len(batch)
+        print(f"... {moved} files")
+        batch.clear()
+
+    for uid in flat_files(storage):
+        batch.append(uid)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    return moved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="files linked before their flat names are removed")
+    parser.add_argument("--grace", type=float, default=5, help="seconds between linking and removing the flat names")
+    parser.add_argument("--dry-run", action="store_true", help="only count the flat files")
+    args = parser.parse_args()
+
+    moved = migrate(args.batch_size, args.grace, args.dry_run)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} files into the sharded layout")
+
+
+if __name__ == "__main__":
+    main()
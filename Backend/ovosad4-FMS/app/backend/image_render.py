@@ -0,0 +1,47 @@
+import os
+
+from PIL import Image, ImageOps
+
+# Pillow format name and mime of every derivative format
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+
+# EXIF orientations which rotate the image by 90 or 270 degrees
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION = 0x0112
+
+
+# RENDERS A RESIZED VARIANT OF AN IMAGE
+# - runs in a worker process of the derivative pool, only depends on Pillow
+# - never upscales, keeps the aspect ratio, applies the EXIF orientation
+# - written under a temporary name and renamed, readers see the whole file or none
+def render_derivative(source_path: str, target_path: str, width: int, image_format: str) -> int:
+    pillow_format, _ = IMAGE_FORMATS[image_format]
+
+    with Image.open(source_path) as image:
+        # Resize before rotating - the bounding box is rotated instead,
+        # so JPEGs are decoded at a reduced scale (draft) instead of in full resolution
+        box = (width, width * 100)
+        if image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+            box = box[::-1]
+        image.thumbnail(box, Image.Resampling.LANCZOS)
+        image = ImageOps.exif_transpose(image)
+
+        if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        partial_path = f"{target_path}.{os.getpid()}.part"
+        try:
+            image.save(partial_path, pillow_format, quality=80)
+            os.replace(partial_path, target_path)
+        finally:
+            # Left behind only when saving failed - the eviction would never count it
+            try:
+                os.remove(partial_path)
+            except FileNotFoundError:
+                pass
+
+    return os.path.getsize(target_path)
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Bounded in-process cache which drops the least recently used entry when full.
+
+    Every worker process has its own cache, hits and misses are counted for statistics.
+    Entries can expire at a given time (time.time() timestamp), expired entries count as misses.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        # key -> (value, expires_at or None)
+        self.entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        if key not in self.entries:
+            self.misses += 1
+            return None
+
+        value, expires_at = self.entries[key]
+        if expires_at is not None and time.time() >= expires_at:
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        if self.max_size <= 0:
+            return
+
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
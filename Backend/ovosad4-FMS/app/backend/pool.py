@@ -0,0 +1,47 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Connection pool which records how long requests wait for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            # Pool exhausted for longer than pool_timeout (or the database is unreachable)
+            self.checkout_timeouts += 1
+            raise
+
+        wait_time = time.perf_counter() - start
+        self.checkouts += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return connection
+
+    def statistics(self) -> dict:
+        checked_out = self.checkedout()
+
+        return {
+            "pool_size": self.size(),
+            "checked_out": checked_out,
+            "idle": self.checkedin(),
+            # overflow() is negative while the pool has not opened all of its pool_size connections yet
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "average_wait_time": self.total_wait_time / self.checkouts if self.checkouts else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
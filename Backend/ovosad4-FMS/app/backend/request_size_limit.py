@@ -0,0 +1,51 @@
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """Rejects request bodies over a size limit with 413 before anything parses them.
+
+    The multipart parser spools every uploaded file (to disk beyond 1 MB) before the endpoint runs,
+    limits checked by the endpoint only apply after the whole body is stored. Here:
+    - a Content-Length over the limit is rejected without reading the body
+    - a body without Content-Length (chunked) is counted while it is read, the read fails at the limit
+
+    Only for the paths in limits (exact path -> bytes), other requests pass untouched.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]) -> None:
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                {"detail": f"Request body is larger than {limit} bytes"},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the body parser - re-raised by FastAPI, rendered by its exception handler
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Request body is larger than {limit} bytes",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,14 +1,20 @@
 import os
+import time
 
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import (
-    Session,
-    sessionmaker,
+import jwt
+from fastapi import Request
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
 )
 
+from app.backend.pool import InstrumentedAsyncPool
+
 # with open(os.getenv("POSTGRES_PASSWORD_FILE"), "r") as file:
 #     password = file.read().splitlines()[0]
 password = os.getenv("POSTGRES_PASSWORD")
@@ -20,40 +26,157 @@ database = os.getenv("POSTGRES_DATABASE")
 
 sqlalchemy_uri = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{database}"
 
+# Optional read replica (same user, password and database as the primary)
+# - GET requests read from the replica, all other requests use the primary
+replica_host = os.getenv("POSTGRES_REPLICA_HOST")
+replica_port = os.getenv("POSTGRES_REPLICA_PORT", port)
+
+replica_sqlalchemy_uri = f"postgresql+psycopg://{user}:{password}@{replica_host}:{replica_port}/{database}"
+
+# Read-your-writes window
+# - seconds after a user's own write during which their GET requests still use the primary,
+#   so they do not read stale data while the replica catches up (0 disables)
+read_your_writes_window = float(os.getenv("POSTGRES_READ_YOUR_WRITES_WINDOW", "0"))
+
+# Connection pool config
+# - size the pool against the number of workers, every worker process has its own pool
+# - the replica engine has a pool of the same size
+pool_size = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+max_overflow = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+pool_timeout = float(os.getenv("POSTGRES_POOL_TIMEOUT", "30"))
+pool_recycle = int(os.getenv("POSTGRES_POOL_RECYCLE", "-1"))
+pool_pre_ping = os.getenv("POSTGRES_POOL_PRE_PING", "false").lower() == "true"
+echo = os.getenv("SQLALCHEMY_ECHO", "false").lower() == "true"
+
+
+def _create_engine(uri: str) -> AsyncEngine:
+    # - psycopg (v3) runs in async mode with create_async_engine, queries do not block the event loop
+    return create_async_engine(
+        uri,
+        echo=echo,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
+
+
+engine = _create_engine(sqlalchemy_uri)
+replica_engine = _create_engine(replica_sqlalchemy_uri) if replica_host else None
+
 # create session factory to generate new database sessions
-SessionFactory = sessionmaker(
-    bind=create_engine(sqlalchemy_uri, echo=True),
+SessionFactory = async_sessionmaker(
+    bind=engine,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False,
 )
 
+ReplicaSessionFactory = async_sessionmaker(
+    bind=replica_engine,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+) if replica_engine is not None else None
+
+# Requests that only read and can be served by the replica
+READ_METHODS = {"GET", "HEAD"}
+
+# Time of the last write of each user (token subject) - per worker process
+LAST_WRITES: dict[str, float] = {}
+
 
-def create_session() -> Iterator[Session]:
+async def create_session(request: Request = None) -> AsyncIterator[AsyncSession]:
     """Create new database session.
 
+    GET requests get a replica session when a replica is configured,
+    unless the user wrote within the read-your-writes window.
+
+    Args:
+        request: Current request, None outside of FastAPI dependencies.
+
     Yields:
         Database session.
     """
 
-    session = SessionFactory()
+    read_only = request is not None and request.method in READ_METHODS and not _wrote_recently(request)
+
+    async with open_session(read_only=read_only) as session:
+        yield session
+
+    # Committed - reads of this user go to the primary for a while
+    if request is not None and request.method not in READ_METHODS:
+        _record_write(request)
+
+
+@asynccontextmanager
+async def open_session(read_only: bool = False) -> AsyncIterator[AsyncSession]:
+    """Create new database session with async context manager (outside of FastAPI dependencies).
+
+    Args:
+        read_only: Use the read replica if one is configured.
+
+    Yields:
+        Database session, committed on exit.
+    """
+
+    if read_only and ReplicaSessionFactory is not None:
+        session = ReplicaSessionFactory()
+    else:
+        session = SessionFactory()
+    session.info["read_only"] = read_only
 
     try:
         yield session
-        session.commit()
+        await session.commit()
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
 
 
-@contextmanager
-def open_session() -> Iterator[Session]:
-    """Create new database session with context manager.
+def _request_user(request: Request) -> str | None:
+    # Token subject, only used to route reads - the token is verified by the auth dependencies
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("sub")
+    except jwt.PyJWTError:
+        return None
 
-    Yields:
-        Database session.
-    """
 
-    return create_session()
+def _wrote_recently(request: Request) -> bool:
+    if ReplicaSessionFactory is None or read_your_writes_window <= 0:
+        return False
+    user = _request_user(request)
+    return user in LAST_WRITES and time.monotonic() - LAST_WRITES[user] < read_your_writes_window
+
+
+def _record_write(request: Request) -> None:
+    if ReplicaSessionFactory is None or read_your_writes_window <= 0:
+        return
+    user = _request_user(request)
+    if user is None:
+        return
+
+    now = time.monotonic()
+    LAST_WRITES[user] = now
+
+    # Drop expired entries so the dict does not grow with every user ever seen
+    if len(LAST_WRITES) > 1000:
+        for expired_user in [u for u, t in LAST_WRITES.items() if now - t >= read_your_writes_window]:
+            del LAST_WRITES[expired_user]
+
+
+def pool_statistics() -> dict[str, dict]:
+    """Return connection pool usage of this worker process, per engine ("primary", "replica" when configured)."""
+
+    statistics = {"primary": engine.sync_engine.pool.statistics()}
+    if replica_engine is not None:
+        statistics["replica"] = replica_engine.sync_engine.pool.statistics()
+    return statistics
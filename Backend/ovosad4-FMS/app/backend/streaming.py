@@ -0,0 +1,99 @@
+import sys
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+
+from app.backend.session import open_session
+from app.schemas.pagination import NEXT_CURSOR_HEADER, PaginationParams
+
+# Newline delimited JSON - one item per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+# DEPENDENCY FOR MASTERTABLES WITH STREAMING MODE
+# - Accept: application/x-ndjson switches the endpoint to a StreamingResponse
+async def wants_ndjson(accept: Optional[str] = Header(None)) -> bool:
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+
+async def ndjson_response(
+    session: AsyncSession,
+    stream_batches: Callable[[AsyncSession], AsyncIterator[list]],
+    pagination: PaginationParams | None = None,
+) -> StreamingResponse:
+    """Stream the batches of stream_batches as NDJSON.
+
+    The session of the create_session dependency is closed before the response body
+    is sent, so the stream opens its own session for as long as it runs.
+
+    Streaming returns the whole mastertable - a page would need its X-Next-Cursor header,
+    which is sent before the last item is known, so limit and cursor are rejected (400).
+
+    Args:
+        session: Session of the create_session dependency, the stream uses the same database (primary or replica).
+        stream_batches: Called with the stream session, yields lists of items
+            (schema objects or dicts), e.g. a service's stream_*_mastertable.
+        pagination: Pagination of the request, only checked for a limit or cursor.
+
+    Returns:
+        StreamingResponse with one JSON item per line.
+    """
+
+    if pagination is not None and pagination.requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit and cursor are not supported with Accept: {NDJSON_MEDIA_TYPE} - the whole mastertable is streamed, "
+                   f"request application/json to get pages and the {NEXT_CURSOR_HEADER} header",
+        )
+
+    # Closed by the response in every case - streamed to the end, failed, or never started (client gone)
+    exit_stack = AsyncExitStack()
+    stream_session = await exit_stack.enter_async_context(
+        open_session(read_only=session.info.get("read_only", False))
+    )
+    batches = stream_batches(stream_session)
+
+    # The first batch is read before the response is started
+    # - errors (e.g. unknown fields -> 400) still get their own status code
+    try:
+        first_batch = await anext(batches, [])
+    except BaseException:
+        await exit_stack.__aexit__(*sys.exc_info())
+        raise
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            # One chunk per batch instead of one per row
+            yield b"".join(to_json(item) + b"\n" for item in first_batch)
+            async for batch in batches:
+                yield b"".join(to_json(item) + b"\n" for item in batch)
+        except BaseException:
+            # Rolled back - the stream failed or was cancelled
+            await exit_stack.__aexit__(*sys.exc_info())
+            raise
+
+    return SessionStreamingResponse(body(), exit_stack, media_type=NDJSON_MEDIA_TYPE)
+
+
+class SessionStreamingResponse(StreamingResponse):
+    """StreamingResponse which owns the session of its body.
+
+    The body generator only cleans up once it runs, a response which is never iterated
+    (client disconnected before the body, failed send) would keep the session and its connection.
+    The exit stack is closed when the response is over, whatever happened - closing it twice does nothing.
+    """
+
+    def __init__(self, content, exit_stack: AsyncExitStack, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.exit_stack = exit_stack
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.exit_stack.aclose()
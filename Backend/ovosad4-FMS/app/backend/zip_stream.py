@@ -0,0 +1,69 @@
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple
+
+import aiofiles
+import aiofiles.os
+
+# Bytes read from a member file at once - also the size of the yielded chunks
+ZIP_STREAM_CHUNK_SIZE = 256 * 1024
+
+# Earliest timestamp a ZIP entry can hold
+ZIP_EPOCH = datetime(1980, 1, 1)
+
+
+class ZipMember(NamedTuple):
+    name: str
+    path: str
+    modified: datetime
+    # Images (JPEG, PNG, WebP) are compressed already - stored as they are
+    compress: bool = False
+
+
+class _ZipOutput:
+    # Write-only, unseekable target of zipfile - collects the written bytes until they are drained
+    # (zipfile writes data descriptors after each member instead of seeking back to its header)
+
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+# STREAMS A ZIP ARCHIVE OF FILES ON DISK
+# - built while it is sent, memory use is one chunk no matter how large the archive is
+# - the first bytes are sent as soon as the first member is opened
+# - ZIP64 for members and archives over 4 GB
+async def stream_zip(members: AsyncIterator[ZipMember]) -> AsyncIterator[bytes]:
+    output = _ZipOutput()
+
+    with zipfile.ZipFile(output, "w", allowZip64=True) as archive:
+        async for member in members:
+            info = zipfile.ZipInfo(member.name, date_time=max(member.modified, ZIP_EPOCH).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if member.compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            # Known size - zipfile decides on ZIP64 headers before the data is written
+            info.file_size = (await aiofiles.os.stat(member.path)).st_size
+
+            with archive.open(info, "w") as entry:
+                async with aiofiles.open(member.path, "rb") as file:
+                    while chunk := await file.read(ZIP_STREAM_CHUNK_SIZE):
+                        entry.write(chunk)
+                        yield output.drain()
+
+            # Data descriptor of the member
+            if data := output.drain():
+                yield data
+
+    # Central directory
+    yield output.drain()
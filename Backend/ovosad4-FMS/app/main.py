@@ -11,6 +11,11 @@ from app.const import (
 )
 from app.version import __version__, __api_version__
 from .backend.migrations import run_migrations
+from .security.keycloak_admin_client import keycloak_admin_client
+from .security.keycloak_outbox import keycloak_outbox_dispatcher
+from .services.file_derivative import derivative_cache
+from .services.file_sweeper import file_sweeper
+from .backend.request_size_limit import RequestSizeLimitMiddleware
 
 from fastapi import FastAPI
 
@@ -28,6 +33,8 @@ from .routers import agent
 from .routers import fruit_thinning
 from .routers import flower_thinning
 from .routers import map_proxy 
+from .routers import database
+from .routers import cache
 
 
 logger = logging.getLogger("uvicorn")
@@ -38,9 +45,17 @@ async def lifespan(app_: FastAPI):
     logger.info("Starting up...")
     logger.info("run alembic upgrade head...")
     run_migrations()
+    logger.info("starting Keycloak role outbox dispatcher...")
+    keycloak_outbox_dispatcher.start()
+    logger.info("starting file storage sweeper...")
+    file_sweeper.start()
     yield
     # Code to run on shutdown
     logger.info("Shutting down...")
+    await keycloak_outbox_dispatcher.stop()
+    await file_sweeper.stop()
+    await keycloak_admin_client.aclose()
+    await derivative_cache.aclose()
 
 
 app = FastAPI(
@@ -56,6 +71,12 @@ app = FastAPI(
 
 prefix=f"/api/{__api_version__}"
 
+# Upload bodies are bounded before the multipart parser writes them to disk
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={f"{prefix}{file.router.prefix}{path}": limit for path, limit in file.UPLOAD_BODY_LIMITS.items()},
+)
+
 app.include_router(orchard.router, prefix=prefix)
 app.include_router(tree.router, prefix=prefix)
 app.include_router(file_batch.router, prefix=prefix)
@@ -68,6 +89,8 @@ app.include_router(agent.router, prefix=prefix)
 app.include_router(fruit_thinning.router, prefix=prefix)
 app.include_router(flower_thinning.router, prefix=prefix)
 app.include_router(map_proxy.router, prefix=prefix)
+app.include_router(database.router, prefix=prefix)
+app.include_router(cache.router, prefix=prefix)
 
 
 @app.get("/")
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import SQLModelBase
+
+from sqlalchemy import BigInteger, DateTime, String, func
+
+
+# Content-addressed blob of the file storage - stored under its sha256
+# - ref_count is the number of File rows with uid == sha256, the same photo in several batches is stored once
+# - blobs with ref_count 0 are no longer referenced and can be removed from the storage
+class FileBlob(SQLModelBase):
+    __tablename__ = 'file_blob'
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger)
+    ref_count: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import SQLModelBase
 
-from sqlalchemy import ForeignKey, UniqueConstraint, DateTime, func, Float
+from sqlalchemy import ForeignKey, UniqueConstraint, DateTime, func, Float, BigInteger, String
 from sqlalchemy.orm import relationship
 
 
@@ -22,9 +22,9 @@ class MetaModel(SQLModelBase):
                 continue
             setattr(self, key, value)
 
-    @property
-    def submodel_ids(self):
-        raise NotImplementedError
+    # Names of the one-to-many relationships whose ids are listed in the schemas
+    # - collected by BaseDataManager._get_submodel_ids
+    submodel_names: tuple[str, ...] = ()
 
 class User(MetaModel):
     __tablename__ = 'user'
@@ -42,11 +42,7 @@ class Agent(MetaModel):
 
     sprayings: Mapped[list["Spraying"]] = relationship(back_populates="agent")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "sprayings": [spraying.id for spraying in self.sprayings]
-        }
+    submodel_names = ("sprayings",)
 
 class Orchard(MetaModel):
     __tablename__ = 'orchard'
@@ -56,11 +52,7 @@ class Orchard(MetaModel):
 
     trees: Mapped[list["Tree"]] = relationship(back_populates="orchard")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "trees": [tree.id for tree in self.trees]
-        }
+    submodel_names = ("trees",)
 
 
 class Genotype(MetaModel):
@@ -71,11 +63,7 @@ class Genotype(MetaModel):
 
     trees: Mapped[list["Tree"]] = relationship(back_populates="genotype")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "trees": [tree.id for tree in self.trees]
-        }
+    submodel_names = ("trees",)
 
 class Rootstock(MetaModel):
     __tablename__ = 'rootstock'
@@ -85,11 +73,7 @@ class Rootstock(MetaModel):
 
     trees: Mapped[list["Tree"]] = relationship(back_populates="rootstock")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "trees": [tree.id for tree in self.trees]
-        }
+    submodel_names = ("trees",)
 
 
 class Tree(MetaModel):
@@ -123,16 +107,7 @@ class Tree(MetaModel):
     genotype: Mapped["Genotype"] = relationship(back_populates="trees")
     rootstock: Mapped["Rootstock"] = relationship(back_populates="trees")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "tree_images": [tree_image.id for tree_image in self.tree_images],
-            "tree_data": [tree_data.id for tree_data in self.tree_data],
-            "harvests": [harvest.id for harvest in self.harvests],
-            "flower_thinnings": [flower_thinning.id for flower_thinning in self.flower_thinnings],
-            "fruit_thinnings": [fruit_thinning.id for fruit_thinning in self.fruit_thinnings],
-            "sprayings": [spraying.id for spraying in self.sprayings]
-        }
+    submodel_names = ("tree_images", "tree_data", "harvests", "flower_thinnings", "fruit_thinnings", "sprayings")
 
 
 class FileBatch(MetaModel):
@@ -144,11 +119,7 @@ class FileBatch(MetaModel):
 
     files: Mapped[list["File"]] = relationship(back_populates="file_batch")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "files": [file.id for file in self.files],
-        }
+    submodel_names = ("files",)
 
 
 class File(MetaModel):
@@ -160,16 +131,14 @@ class File(MetaModel):
     datetime: Mapped[datetime]
     mime: Mapped[str]
     uid: Mapped[str] = mapped_column(default="")
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=True)
 
     file_batch: Mapped["FileBatch"] = relationship(back_populates="files")
 
     tree_images: Mapped[list["TreeImage"]] = relationship(back_populates="file")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "tree_images": [tree_image.id for tree_image in self.tree_images],
-        }
+    submodel_names = ("tree_images",)
 
 
 class TreeImage(MetaModel):
@@ -241,12 +210,7 @@ class Spraying(MetaModel):
     tree: Mapped["Tree"] = relationship(back_populates="sprayings")
     agent: Mapped["Agent"] = relationship(back_populates="sprayings")
 
-    @property
-    def submodel_ids(self):
-        return {
-            "flower_thinnings": [flower_thinning.id for flower_thinning in self.flower_thinnings],
-            "fruit_thinnings": [fruit_thinning.id for fruit_thinning in self.fruit_thinnings]
-        }
+    submodel_names = ("flower_thinnings", "fruit_thinnings")
 
 class FruitThinning(MetaModel):
     __tablename__ = 'fruit_thinning'
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import SQLModelBase
+
+from sqlalchemy import DateTime, func
+
+
+# Keycloak role changes written in the same transaction as the orchard
+# - applied by the KeycloakOutboxDispatcher after the commit, rows are deleted once applied
+# - claim_id and claimed_until are set while a dispatcher calls Keycloak for the entry
+class KeycloakRoleOutbox(SQLModelBase):
+    __tablename__ = 'keycloak_role_outbox'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    action: Mapped[str] # "create" or "delete"
+    role_name: Mapped[str]
+    status: Mapped[str] = mapped_column(default="pending") # "pending" or "failed" (out of attempts)
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    last_error: Mapped[str] = mapped_column(nullable=True)
+    claim_id: Mapped[str] = mapped_column(nullable=True) # Dispatcher round which claimed the entry
+    claimed_until: Mapped[datetime] = mapped_column(DateTime, nullable=True) # Lease - claimed again by any dispatcher once expired
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
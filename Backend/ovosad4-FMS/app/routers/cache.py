@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+
+from app.schemas import CacheStatisticsSchema
+
+from app.security.auth import verify_global_admin_access, TOKEN_CACHE, PERMISSIONS_CACHE
+from app.security.orchard_id_resolve import ORCHARD_ID_CACHE
+from app.schemas.user_permissions import UserOrchardPermissions
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+# Entity -> orchard_id cache statistics of the worker which handles the request
+@router.get("/orchard_id", response_model=CacheStatisticsSchema)
+async def get_orchard_id_cache_statistics(
+    # Only a GLOBAL ADMIN can inspect the caches
+    permissions: UserOrchardPermissions = Depends(verify_global_admin_access)
+) -> CacheStatisticsSchema:
+    return CacheStatisticsSchema(**ORCHARD_ID_CACHE.statistics())
+
+
+# Verified token cache statistics of the worker which handles the request
+@router.get("/token", response_model=CacheStatisticsSchema)
+async def get_token_cache_statistics(
+    # Only a GLOBAL ADMIN can inspect the caches
+    permissions: UserOrchardPermissions = Depends(verify_global_admin_access)
+) -> CacheStatisticsSchema:
+    return CacheStatisticsSchema(**TOKEN_CACHE.statistics())
+
+
+# Role set -> permissions cache statistics of the worker which handles the request
+@router.get("/permissions", response_model=CacheStatisticsSchema)
+async def get_permissions_cache_statistics(
+    # Only a GLOBAL ADMIN can inspect the caches
+    permissions: UserOrchardPermissions = Depends(verify_global_admin_access)
+) -> CacheStatisticsSchema:
+    return CacheStatisticsSchema(**PERMISSIONS_CACHE.statistics())
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from typing import Dict
+
+from app.backend.session import pool_statistics
+from app.schemas import PoolStatisticsSchema
+
+from app.security.auth import verify_global_admin_access
+from app.schemas.user_permissions import UserOrchardPermissions
+
+router = APIRouter(prefix="/database", tags=["database"])
+
+
+# Connection pool statistics of the worker which handles the request
+# - per engine, {"primary": ..., "replica": ...} (the replica only when one is configured)
+@router.get("/pool", response_model=Dict[str, PoolStatisticsSchema])
+async def get_pool_statistics(
+    # Only a GLOBAL ADMIN can inspect the connection pool
+    permissions: UserOrchardPermissions = Depends(verify_global_admin_access)
+) -> Dict[str, PoolStatisticsSchema]:
+    return {name: PoolStatisticsSchema(**statistics) for name, statistics in pool_statistics().items()}
+
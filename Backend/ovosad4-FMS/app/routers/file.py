@@ -1,50 +1,126 @@
+import os
 from datetime import datetime as datetime_type
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Response, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, UploadFile, File, HTTPException, Query, Request, Response, status
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
 
+from app.backend.file_response import ImmutableFileResponse
 from app.backend.session import create_session
-from app.schemas import FileSchema, CreateFileSchema, UpdateFileSchema
+from app.schemas import FileSchema, CreateFileSchema, UpdateFileSchema, FileBulkResultSchema, FileSweeperStatisticsSchema
 from app.services import FileService, FileBatchService
+from app.services.file import FILE_MAX_UPLOAD_SIZE
+from app.services.file_sweeper import file_sweeper
 
 from app.security.auth import verify_any_orchard_view_access, verify_any_orchard_admin_access, verify_global_admin_access
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.schemas.pagination import PaginationParams, get_pagination_params
 
 router = APIRouter(prefix="/file", tags=["file"])
 
+# Config - From docker environment variables
+FILE_BULK_MAX_FILES = int(os.getenv("FILE_BULK_MAX_FILES", "100")) # Files per POST /file/bulk request
+FILE_BULK_MAX_BODY_SIZE = int(os.getenv("FILE_BULK_MAX_BODY_SIZE", str(512 * 1024 * 1024))) # Bytes per POST /file/bulk request, all files together
+
+# Multipart boundary and part headers of one file, on top of its content
+MULTIPART_PART_OVERHEAD = 64 * 1024
+
+# Request body limits of the upload endpoints (path within the router -> bytes),
+# enforced by RequestSizeLimitMiddleware before the multipart parser spools anything
+UPLOAD_BODY_LIMITS = {
+    "/": FILE_MAX_UPLOAD_SIZE + MULTIPART_PART_OVERHEAD,
+    # Not FILE_BULK_MAX_FILES full-size files (GBs) - that much would be spooled before a per-file 413
+    "/bulk": FILE_BULK_MAX_BODY_SIZE,
+}
+
+# The bulk form is parsed by the endpoint (file count limit) - its body documented here instead
+BULK_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["upload_files"],
+                    "properties": {
+                        "upload_files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+def parse_file_datetime(file_datetime: str) -> datetime_type:
+    try:
+        return datetime_type.strptime(file_datetime, "%y%m%d_%H%M%S")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Provided datetime string ({file_datetime}), does not match desired format '%y%m%d_%H%M%S'")
+
 
 @router.get("/", response_model=List[FileSchema])
 async def get_file_mastertable(
-    session: Session = Depends(create_session),
+    response: Response,
+    pagination: PaginationParams = Depends(get_pagination_params),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to at least one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
 ) -> List[FileSchema]:
     # The dependency chain handles authorization
-    return FileService(session).get_file_mastertable()
+    files = await FileService(session).get_file_mastertable(pagination)
+    pagination.set_next_cursor(response, files)
+    return files
+
+
+# Storage reclaimed by the file sweeper of the worker which handles the request
+# - before /{file_id}, which would take "sweeper" for an id
+@router.get("/sweeper", response_model=FileSweeperStatisticsSchema)
+async def get_file_sweeper_statistics(
+    # Only a GLOBAL ADMIN can inspect the sweeper
+    permissions: UserOrchardPermissions = Depends(verify_global_admin_access)
+) -> FileSweeperStatisticsSchema:
+    return FileSweeperStatisticsSchema(**file_sweeper.statistics())
 
 
 @router.get("/{file_id}", response_model=FileSchema)
 async def get_file(
     file_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to at least one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
 ) -> FileSchema:
     # The dependency chain handles authorization
-    return FileService(session).get_file(file_id)
+    return await FileService(session).get_file(file_id)
 
 
 @router.get("/{file_id}/content", response_class=Response)
 async def get_file_content(
     file_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
+    # User must have VIEW ACCESS to at least one orchard
+    permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
+) -> Response:
+    path, media_type, content_tag = await FileService(session).get_file_content(file_id)
+    # The dependency chain handles authorization
+    # - sent from disk, Range, ETag and Cache-Control handled by the response
+    return ImmutableFileResponse(path, content_tag, media_type=media_type)
+
+
+# Resized variant of an image, e.g. /file/1/derivative?w=256&format=webp for a thumbnail
+@router.get("/{file_id}/derivative", response_class=Response)
+async def get_file_derivative(
+    file_id: int,
+    w: int = Query(..., description="Width in pixels, one of FILE_DERIVATIVE_WIDTHS"),
+    format: Literal["webp", "jpeg", "png"] = Query("webp"),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to at least one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
 ) -> Response:
-    content, media_type = FileService(session).get_file_content(file_id)
+    path, media_type, content_tag = await FileService(session).get_file_derivative(file_id, w, format)
     # The dependency chain handles authorization
-    return Response(content=content, media_type=media_type)
+    return ImmutableFileResponse(path, content_tag, media_type=media_type)
 
 
 @router.post("/", response_model=FileSchema)
@@ -52,15 +128,12 @@ async def create_file(
     file_batch_id: int,
     file_datetime: str,
     upload_file: UploadFile = File(...),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to at least one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
 ) -> FileSchema:
-    
-    try:
-        file_datetime = datetime_type.strptime(file_datetime, "%y%m%d_%H%M%S")
-    except ValueError:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Provided datetime string ({file_datetime}), does not match desired format '%y%m%d_%H%M%S'")
+
+    file_datetime = parse_file_datetime(file_datetime)
 
     file = CreateFileSchema(
             file_batch_id=file_batch_id,
@@ -69,24 +142,68 @@ async def create_file(
             mime=upload_file.content_type,
         )
 
-    FileBatchService(session).get_file_batch(file_batch_id)
+    await FileBatchService(session).get_file_batch(file_batch_id)
     # The dependency chain handles authorization
-    return FileService(session).create_file(file, content=upload_file.file.read())
+    # Streamed to storage in chunks, never read into memory as a whole
+    return await FileService(session).create_file(file, upload_file)
+
 
 
-# @router.put("/", response_model=FileSchema)
-# async def update_file(
-#     file_dto: UpdateFileSchema,
-#     session: Session = Depends(create_session)
-# ) -> FileSchema:
-#
-#     return FileService(session).update_file(file_dto)
+# Bulk upload - many files of one batch, one authorization, one batch lookup and one transaction
+@router.post("/bulk", response_model=List[FileBulkResultSchema], openapi_extra=BULK_UPLOAD_OPENAPI)
+async def create_files(
+    request: Request,
+    file_batch_id: int,
+    file_datetime: str,
+    session: AsyncSession = Depends(create_session),
+    # User must have ADMIN ACCESS to at least one orchard
+    permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
+) -> List[FileBulkResultSchema]:
+
+    file_datetime = parse_file_datetime(file_datetime)
+    await FileBatchService(session).get_file_batch(file_batch_id)
+
+    # Parsed here, not by FastAPI - the parser stops at the part after FILE_BULK_MAX_FILES (400)
+    # before spooling it, and nothing is read for a missing batch or a bad datetime
+    async with request.form(max_files=FILE_BULK_MAX_FILES) as form:
+        upload_files = [value for value in form.getlist("upload_files") if isinstance(value, StarletteUploadFile)]
+        if not upload_files:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="No upload_files in the form")
+
+        files = [
+            CreateFileSchema(
+                file_batch_id=file_batch_id,
+                name=upload_file.filename,
+                datetime=file_datetime,
+                mime=upload_file.content_type,
+            )
+            for upload_file in upload_files
+        ]
+
+        # The dependency chain handles authorization
+        # - per file result, a file too large does not fail the others
+        return await FileService(session).create_files(files, upload_files)
+
+
+@router.put("/{file_id}", response_model=FileSchema)
+async def update_file(
+    file_id: int,
+    file: UpdateFileSchema = Body(...),
+    session: AsyncSession = Depends(create_session),
+    # User must have ADMIN ACCESS to at least one orchard
+    permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
+) -> FileSchema:
+    # The dependency chain handles authorization
+    return await FileService(session).update_file(file_id, file)
 
 
-# @router.delete("/", response_model=FileSchema)
-# async def delete_file(
-#     file_id: int,
-#     session: Session = Depends(create_session)
-# ) -> FileSchema:
-#
-#     return FileService(session).delete_file(file_id)
+@router.delete("/{file_id}", response_model=FileSchema)
+async def delete_file(
+    file_id: int,
+    session: AsyncSession = Depends(create_session),
+    # User must have ADMIN ACCESS to at least one orchard
+    permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
+) -> FileSchema:
+    # The dependency chain handles authorization
+    # - the content is removed from the storage by the file sweeper, unless other files share it
+    return await FileService(session).delete_file(file_id)
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Body, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.backend.session import create_session
@@ -8,60 +9,82 @@ from app.services import FileBatchService
 
 from app.security.auth import verify_any_orchard_view_access, verify_any_orchard_admin_access, verify_global_admin_access
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.schemas.pagination import PaginationParams, get_pagination_params
 
 router = APIRouter(prefix="/file_batch", tags=["file_batch"])
 
 
 @router.get("/", response_model=List[FileBatchSchema])
 async def get_file_batch_mastertable(
-    session: Session = Depends(create_session),
+    response: Response,
+    pagination: PaginationParams = Depends(get_pagination_params),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to atleast one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
 ) -> List[FileBatchSchema]:
     # The dependency chain handles authorization
-    return FileBatchService(session).get_file_batch_mastertable()
+    file_batches = await FileBatchService(session).get_file_batch_mastertable(pagination)
+    pagination.set_next_cursor(response, file_batches)
+    return file_batches
 
 
 @router.get("/{file_batch_id}", response_model=FileBatchSchema)
 async def get_file_batch(
     file_batch_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to atleast one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
 ) -> FileBatchSchema:
     # The dependency chain handles authorization
-    return FileBatchService(session).get_file_batch(file_batch_id)
+    return await FileBatchService(session).get_file_batch(file_batch_id)
+
+
+# All files of the batch as one ZIP, built while it is sent
+@router.get("/{file_batch_id}/archive", response_class=StreamingResponse)
+async def get_file_batch_archive(
+    file_batch_id: int,
+    session: AsyncSession = Depends(create_session),
+    # User must have VIEW ACCESS to atleast one orchard
+    permissions: UserOrchardPermissions = Depends(verify_any_orchard_view_access)
+) -> StreamingResponse:
+    # The dependency chain handles authorization
+    archive = await FileBatchService(session).get_file_batch_archive(file_batch_id)
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="file_batch_{file_batch_id}.zip"'},
+    )
 
 
 @router.post("/", response_model=FileBatchSchema)
 async def create_file_batch(
     file_batch: CreateFileBatchSchema = Body(...),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to atleast one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
 ) -> FileBatchSchema:
     # The dependency chain handles authorization
-    return FileBatchService(session).create_file_batch(file_batch)
+    return await FileBatchService(session).create_file_batch(file_batch)
 
 
 @router.put("/{file_batch_id}", response_model=FileBatchSchema)
 async def update_file_batch(
     file_batch_id: int,
     file_batch: UpdateFileBatchSchema = Body(...),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to atleast one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
 ) -> FileBatchSchema:
     # The dependency chain handles authorization
-    return FileBatchService(session).update_file_batch(file_batch_id, file_batch)
+    return await FileBatchService(session).update_file_batch(file_batch_id, file_batch)
 
 
 @router.delete("/{file_batch_id}", response_model=FileBatchSchema)
 async def delete_file_batch(
     file_batch_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to atleast one orchard
     permissions: UserOrchardPermissions = Depends(verify_any_orchard_admin_access)
 ) -> FileBatchSchema:
     # The dependency chain handles authorization
-    return FileBatchService(session).delete_file_batch(file_batch_id)
+    return await FileBatchService(session).delete_file_batch(file_batch_id)
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Body, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.schemas import CreateSprayingSchema, UpdateSprayingSchema, SprayingSchema
@@ -7,9 +7,12 @@ from app.services import TreeService
 from app.services import AgentService
 from app.services import SprayingService
 from app.backend.session import create_session
+from app.backend.streaming import ndjson_response, wants_ndjson
 
 from app.security.auth import verify_orchard_view_access, verify_orchard_admin_access, get_user_orchard_permissions
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.schemas.sparse_fields import get_sparse_fields, sparse_response
+from app.schemas.pagination import PaginationParams, get_pagination_params
 from app.security.orchard_id_resolve import get_orchard_id_from_spraying_id, get_orchard_id_from_tree_id
 
 router = APIRouter(prefix="/spraying", tags=["spraying"])
@@ -17,7 +20,7 @@ router = APIRouter(prefix="/spraying", tags=["spraying"])
 # Helper dependency for POST spraying
 async def orchard_id_from_create_spraying(
     spraying: CreateSprayingSchema,
-    session: Session = Depends(create_session)
+    session: AsyncSession = Depends(create_session)
 ) -> int:
     tree_id = spraying.tree_id
     return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
@@ -25,65 +28,81 @@ async def orchard_id_from_create_spraying(
 # New endpoint for mastertable
 @router.get("/", response_model=List[SprayingSchema])
 async def get_spraying_mastertable(
-    session: Session = Depends(create_session),
+    response: Response,
+    pagination: PaginationParams = Depends(get_pagination_params),
+    fields: list[str] | None = Depends(get_sparse_fields),
+    stream: bool = Depends(wants_ndjson),
+    session: AsyncSession = Depends(create_session),
     # Full permissions object to pass to the service for filtering
     permissions: UserOrchardPermissions = Depends(get_user_orchard_permissions)
 ) -> List[SprayingSchema]:  
+    # Streaming mode - Accept: application/x-ndjson
+    if stream:
+        return await ndjson_response(
+            session,
+            lambda stream_session: SprayingService(stream_session).stream_spraying_mastertable(permissions, fields),
+            pagination,
+        )
+
     # Service handles filtering based on permissions
-    return SprayingService(session).get_spraying_mastertable(permissions)
+    sprayings = await SprayingService(session).get_spraying_mastertable(permissions, pagination, fields)
+    pagination.set_next_cursor(response, sprayings)
+    return sparse_response(sprayings, response) if fields is not None else sprayings
 
 
 @router.get("/{spraying_id}", response_model=SprayingSchema)
 async def get_spraying(
     spraying_id: int,
-    session: Session = Depends(create_session),
+    fields: list[str] | None = Depends(get_sparse_fields),
+    session: AsyncSession = Depends(create_session),
     # User must have VIEW ACCESS to the orchard the spraying belongs to
     permissions: UserOrchardPermissions = Depends(verify_orchard_view_access(
         orchard_id_dependency=get_orchard_id_from_spraying_id
     ))
 ) -> SprayingSchema:
     # The dependency handles authorization
-    return SprayingService(session).get_spraying(spraying_id)
+    spraying = await SprayingService(session).get_spraying(spraying_id, fields)
+    return sparse_response(spraying) if fields is not None else spraying
 
 
 @router.post("/", response_model=SprayingSchema)
 async def create_spraying(
         spraying: CreateSprayingSchema = Body(...),
-        session: Session = Depends(create_session),
+        session: AsyncSession = Depends(create_session),
         # User must have ADMIN ACCESS to the orchard where the spraying is being created
         permissions: UserOrchardPermissions = Depends(verify_orchard_admin_access(
             orchard_id_dependency=orchard_id_from_create_spraying
         ))
 ) -> SprayingSchema:
     
-    TreeService(session).get_tree(spraying.tree_id)
-    AgentService(session).get_agent(spraying.agent_id)
+    await TreeService(session).get_tree(spraying.tree_id)
+    await AgentService(session).get_agent(spraying.agent_id)
     # The dependency handles authorization
-    return SprayingService(session).create_spraying(spraying)
+    return await SprayingService(session).create_spraying(spraying)
 
 
 @router.put("/{spraying_id}", response_model=SprayingSchema)
 async def update_spraying(
     spraying_id: int,
     spraying: UpdateSprayingSchema = Body(...),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to the orchard the spraying belongs to
     permissions: UserOrchardPermissions = Depends(verify_orchard_admin_access(
         orchard_id_dependency=get_orchard_id_from_spraying_id
     ))
 ) -> SprayingSchema:
     # The dependency handles authorization
-    return SprayingService(session).update_spraying(spraying_id, spraying)
+    return await SprayingService(session).update_spraying(spraying_id, spraying)
 
 
 @router.delete("/{spraying_id}", response_model=SprayingSchema)
 async def delete_spraying(
     spraying_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     # User must have ADMIN ACCESS to the orchard the spraying belongs to
     permissions: UserOrchardPermissions = Depends(verify_orchard_admin_access(
         orchard_id_dependency=get_orchard_id_from_spraying_id
     ))
 ) -> SprayingSchema:
     # The dependency handles authorization
-    return SprayingService(session).delete_spraying(spraying_id)
+    return await SprayingService(session).delete_spraying(spraying_id)
@@ -1,9 +1,9 @@
-from .orchard import OrchardSchema, CreateOrchardSchema, UpdateOrchardSchema
+from .orchard import OrchardSchema, CreateOrchardSchema, UpdateOrchardSchema, OrchardBulkResultSchema
 from .rootstock import RootstockSchema
 from .genotype import GenotypeSchema
 from .tree import TreeSchema, CreateTreeSchema, UpdateTreeSchema
 from .file_batch import FileBatchSchema, CreateFileBatchSchema, UpdateFileBatchSchema
-from .file import FileSchema, CreateFileSchema, UpdateFileSchema
+from .file import FileSchema, CreateFileSchema, UpdateFileSchema, FileBulkResultSchema, FileSweeperStatisticsSchema
 from .tree_image import TreeImageSchema, CreateTreeImageSchema, UpdateTreeImageSchema
 from .tree_data import TreeDataSchema, CreateTreeDataSchema, UpdateTreeDataSchema
 from .harvest import HarvestSchema, CreateHarvestSchema, UpdateHarvestSchema
@@ -11,5 +11,6 @@ from .flower_thinning import FlowerThinningSchema, CreateFlowerThinningSchema, U
 from .fruit_thinning import FruitThinningSchema, CreateFruitThinningSchema, UpdateFruitThinningSchema
 from .spraying import SprayingSchema, CreateSprayingSchema, UpdateSprayingSchema
 from .agent import AgentSchema, CreateAgentSchema, UpdateAgentSchema
+from .database import PoolStatisticsSchema, CacheStatisticsSchema
 
 from .user_permissions import UserOrchardPermissions
\ No newline at end of file
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+
+
+# Connection pool usage of a single worker process
+
+class PoolStatisticsSchema(BaseModel):
+    pool_size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    max_overflow: int
+    timeout: float
+
+    # Cumulative since the worker started, wait times in seconds
+    checkouts: int
+    checkout_timeouts: int
+    average_wait_time: float
+    max_wait_time: float
+
+
+# In-process cache usage of a single worker process
+
+class CacheStatisticsSchema(BaseModel):
+    size: int
+    max_size: int
+
+    # Cumulative since the worker started
+    hits: int
+    misses: int
+    hit_rate: float
@@ -1,6 +1,8 @@
 from datetime import datetime as datetime_type
 from typing import Optional
 
+from pydantic import BaseModel
+
 from .base_schema import BaseSchema
 
 
@@ -20,5 +22,28 @@ class UpdateFileSchema(BaseSchema):
 class FileSchema(CreateFileSchema):
     id: int
     # uid: str
+    size: Optional[int] = None
+    sha256: Optional[str] = None
 
     tree_images: list[int]
+
+
+# Result of one file of POST /file/bulk
+
+class FileBulkResultSchema(BaseModel):
+    name: str
+    status_code: int
+
+    file: Optional[FileSchema] = None
+    error: Optional[str] = None
+
+
+# Storage reclaimed by the file sweeper of a single worker process - cumulative since the worker started
+
+class FileSweeperStatisticsSchema(BaseModel):
+    sweeps: int
+    blobs: int
+    orphans: int
+    # Rows without content - reported, a row is counted again on every pass over the table
+    missing: int
+    reclaimed_bytes: int
@@ -1,3 +1,5 @@
+from pydantic import BaseModel
+
 from .base_schema import BaseSchema
 
 
@@ -13,3 +15,12 @@ class OrchardSchema(CreateOrchardSchema):
     id: int
 
     trees: list[int]
+
+
+# Result of one orchard of POST /orchard/bulk
+
+class OrchardBulkResultSchema(BaseModel):
+    orchard: OrchardSchema
+
+    # "pending" - the roles are created in the background by the outbox dispatcher once the orchards are committed
+    roles_status: str
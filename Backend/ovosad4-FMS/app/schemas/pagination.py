@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+import os
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+
+# Maximum number of items on one mastertable page
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Items on a page when the client sends no limit - no mastertable response is unbounded
+DEFAULT_PAGE_SIZE = min(int(os.getenv("DEFAULT_PAGE_SIZE", "500")), MAX_PAGE_SIZE)
+
+# Response header with the cursor of the next page, missing on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Keyset (cursor) pagination of mastertables
+# - items are ordered by id, the cursor holds the id of the last item of the previous page
+
+class PaginationParams(BaseModel):
+    limit: Optional[int] = None
+    after_id: Optional[int] = None
+    # limit or cursor sent by the client (not only DEFAULT_PAGE_SIZE)
+    requested: bool = False
+
+    @property
+    def is_paginated(self) -> bool:
+        return self.limit is not None or self.after_id is not None
+
+    def set_next_cursor(self, response: Response, items: Sequence) -> None:
+        # A full page means there might be more items
+        if self.limit is not None and len(items) == self.limit:
+            # Items are schemas or dicts (sparse fieldsets)
+            last_item = items[-1]
+            last_id = last_item["id"] if isinstance(last_item, dict) else last_item.id
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_id)
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        last_id = None
+
+    if not isinstance(last_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+    return last_id
+
+
+# DEPENDENCY FOR PAGINATED MASTERTABLES
+# - without limit the page has DEFAULT_PAGE_SIZE items, the X-Next-Cursor header leads to the next one
+async def get_pagination_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header of the previous page"),
+) -> PaginationParams:
+    return PaginationParams(
+        limit=limit if limit is not None else DEFAULT_PAGE_SIZE,
+        after_id=decode_cursor(cursor) if cursor is not None else None,
+        requested=limit is not None or cursor is not None,
+    )
@@ -0,0 +1,26 @@
+from typing import Optional, Sequence
+
+from fastapi import Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+# Sparse fieldsets - ?fields=id,latitude,longitude
+# - only the requested columns are selected from the database, "id" is always included
+
+
+# DEPENDENCY FOR ENDPOINTS WITH SPARSE FIELDSETS
+# - without fields the full schema is returned
+async def get_sparse_fields(
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return, e.g. id,latitude,longitude"),
+) -> list[str] | None:
+    if fields is None:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+# Projected items are plain dicts, they are not validated against the full response_model
+def sparse_response(items: Sequence[dict] | dict, response: Response | None = None) -> JSONResponse:
+    # Keep headers already set on the injected response (e.g. X-Next-Cursor)
+    headers = dict(response.headers) if response is not None else None
+    return JSONResponse(content=jsonable_encoder(items), headers=headers)
@@ -1,14 +1,20 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Set
+from functools import cached_property
+from pydantic import BaseModel
+from typing import FrozenSet, Optional
 
 
 # Schema for authenticated user permissions, parsed from Keycloak roles
 
 class UserOrchardPermissions(BaseModel):
     
-    # Set[int] for  uniqueness and efficient lookups
-    # default_factory=set ensures each new instance gets its own empty set
-    allowed_view_orchard_ids: Set[int] = Field(default_factory=set)
-    allowed_admin_orchard_ids: Set[int] = Field(default_factory=set)
+    # FrozenSet[int] for uniqueness and efficient lookups
+    # - immutable, the parsed permissions are shared by all requests with the same roles
+    allowed_view_orchard_ids: FrozenSet[int] = frozenset()
+    allowed_admin_orchard_ids: FrozenSet[int] = frozenset()
     is_global_admin: bool = False
-    username: Optional[str] = None
\ No newline at end of file
+    username: Optional[str] = None
+
+    # Sorted array of the view orchard ids - sent to the database as a single ARRAY parameter
+    @cached_property
+    def view_orchard_ids_array(self) -> list[int]:
+        return sorted(self.allowed_view_orchard_ids)
@@ -1,13 +1,16 @@
 import jwt
 from jwt.algorithms import RSAAlgorithm
-import requests
 from fastapi import HTTPException, Security, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 import os 
+import hashlib
 
 # Schema
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.security.jwks import JWKSCache
+from app.security.local_issuer import get_local_issuer
+from app.backend.lru_cache import LRUCache
 from typing import Callable
 
 # Role parsing
@@ -25,54 +28,25 @@ KEYCLOAK_JWKS_URL = f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/ope
 bearer_scheme = HTTPBearer()
 
 # Public Key Caching
-# - stores kid (Key ID) and matching public key object
+# - stores kid (Key ID) and matching public key object, refreshed in the background
 # - prevents unnecessary HTTP requests
-PUBLIC_KEYS = {}
-
-# FUNCTION TO FETCH PUBLIC KEY FROM KEYCLOAK
+# - load tests without Keycloak: with AUTH_LOCAL_ISSUER_KEY_FILE set the keys come from the local issuer
+LOCAL_ISSUER = get_local_issuer()
+if LOCAL_ISSUER is not None:
+    print(f"WARNING: verifying access tokens with the local issuer key {LOCAL_ISSUER.key_file} instead of Keycloak")
+    JWKS_CACHE = JWKSCache(KEYCLOAK_JWKS_URL, transport=LOCAL_ISSUER.transport())
+else:
+    JWKS_CACHE = JWKSCache(KEYCLOAK_JWKS_URL)
+
+# Verified Token Caching
+# - token digest -> decoded payload, kept until the token's exp
+# - a browser session sends the same token for every request, its signature is verified only once
+TOKEN_CACHE = LRUCache(int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+# FUNCTION TO GET PUBLIC KEY FROM KEYCLOAK
 # - to verify access tokens
 async def get_public_key(kid: str) -> RSAAlgorithm | None:
-    if kid in PUBLIC_KEYS:
-        return PUBLIC_KEYS[kid]
-    try:
-        #print(f"DEBUG: Attempting to fetch JWKS from: {KEYCLOAK_JWKS_URL}")
-        resp = requests.get(KEYCLOAK_JWKS_URL)  # {"keys":[
-                                                    # {
-                                                    # "kid":"...",
-                                                    # "kty":"RSA",
-                                                    # "alg":"RSA-OAEP",
-                                                    # "use":"enc",
-                                                    # "x5c":["..."],
-                                                    # "x5t":"...",
-                                                    # "x5t#S256":"...",
-                                                    # "n":"...",
-                                                    # "e":"..."
-                                                    # },
-                                                    # {
-                                                    # "kid":"...",
-                                                    # "kty":"RSA",
-                                                    # "alg":"RS256",
-                                                    # "use":"sig",
-                                                    # "x5c":["..."],
-                                                    # "x5t":"...",
-                                                    # "x5t#S256":"...",
-                                                    # "n":"...",
-                                                    # "e":"..."
-                                                    # }]} 
-        resp.raise_for_status()
-        jwks = resp.json()  # JSON Web Key Set
-                            # Returns dictionary
-
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-                PUBLIC_KEYS[kid] = public_key
-                return public_key
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching JWKS from Keycloak: {e}")
-        return None
-    return None
+    return await JWKS_CACHE.get_key(kid)
 
 
 """
@@ -81,8 +55,15 @@ AUTHENTICATION
 
 # DEPENDENCY TO VERIFY ACCESS TOKEN
 async def verify_access_token(credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)):
-    # Check if the token is correct format
     token = credentials.credentials
+
+    # Token verified before and not expired yet
+    token_digest = hashlib.sha256(token.encode()).digest()
+    payload = TOKEN_CACHE.get(token_digest)
+    if payload is not None:
+        return payload
+
+    # Check if the token is correct format
     headers = jwt.get_unverified_header(token)
 
     if not headers:
@@ -120,6 +101,8 @@ async def verify_access_token(credentials: HTTPAuthorizationCredentials = Securi
             audience="react-frontend",
             issuer=f"{KEYCLOAK_PUBLIC_SERVER_URL}/realms/{KEYCLOAK_REALM}", 
         )
+        if "exp" in payload:
+            TOKEN_CACHE.set(token_digest, payload, expires_at=payload["exp"])
         return payload
     
     # Exceptions
@@ -155,43 +138,64 @@ async def verify_access_token(credentials: HTTPAuthorizationCredentials = Securi
 AUTHORIZATION
 """
 
-# EXTRACTING ROLES FROM VERIFIED ACCESS TOKEN - FULL PERMISSION OBJECT
-async def get_user_orchard_permissions(
-    payload: dict = Security(verify_access_token)
-) -> UserOrchardPermissions:
+# Regex patterns for orchard roles
+VIEWER_ROLE_PATTERN = re.compile(r"^Orchard-(\d+)-View$")
+ADMIN_ROLE_PATTERN = re.compile(r"^Orchard-(\d+)-Admin$")
 
-    user_roles = payload.get("realm_access", {}).get("roles", [])
+# Global admin roles defined in Keycloak - full access
+GLOBAL_ADMIN_ROLES = {"admin", "Orchard-Global-Admin"}
 
-    # SET Username 
-    permissions = UserOrchardPermissions(
-        username=payload.get("preferred_username")
-    )
+# Permissions Caching
+# - set of roles -> parsed permissions (without username), many users share the same roles
+PERMISSIONS_CACHE = LRUCache(int(os.getenv("PERMISSIONS_CACHE_SIZE", "1000")))
 
-    # Regex patterns for orchard roles
-    viewer_role_pattern = re.compile(r"^Orchard-(\d+)-View$")
-    admin_role_pattern = re.compile(r"^Orchard-(\d+)-Admin$")
 
-    # Global admin roles defined in Keycloak - full access
-    GLOBAL_ADMIN_ROLES = {"admin", "Orchard-Global-Admin"}
+# PARSING ORCHARD ROLES INTO A PERMISSION OBJECT
+def parse_orchard_roles(user_roles: frozenset[str]) -> UserOrchardPermissions:
+    is_global_admin = False
+    allowed_view_orchard_ids = set()
+    allowed_admin_orchard_ids = set()
 
     for role in user_roles:
         # SET Global admin
         if role in GLOBAL_ADMIN_ROLES:
-            permissions.is_global_admin = True
+            is_global_admin = True
 
         # SET Orchard View
-        viewer_match = viewer_role_pattern.match(role)
+        viewer_match = VIEWER_ROLE_PATTERN.match(role)
         if viewer_match:
-            permissions.allowed_view_orchard_ids.add(int(viewer_match.group(1)))
+            allowed_view_orchard_ids.add(int(viewer_match.group(1)))
 
         # SET Orchard Admin
-        admin_match = admin_role_pattern.match(role)
+        admin_match = ADMIN_ROLE_PATTERN.match(role)
         if admin_match:
-            permissions.allowed_admin_orchard_ids.add(int(admin_match.group(1)))
+            allowed_admin_orchard_ids.add(int(admin_match.group(1)))
             # Admin access implicitly includes view access
-            permissions.allowed_view_orchard_ids.add(int(admin_match.group(1)))
+            allowed_view_orchard_ids.add(int(admin_match.group(1)))
+
+    return UserOrchardPermissions(
+        is_global_admin=is_global_admin,
+        allowed_view_orchard_ids=frozenset(allowed_view_orchard_ids),
+        allowed_admin_orchard_ids=frozenset(allowed_admin_orchard_ids),
+    )
+
+
+# EXTRACTING ROLES FROM VERIFIED ACCESS TOKEN - FULL PERMISSION OBJECT
+async def get_user_orchard_permissions(
+    payload: dict = Security(verify_access_token)
+) -> UserOrchardPermissions:
 
-    return permissions
+    user_roles = frozenset(payload.get("realm_access", {}).get("roles", []))
+
+    permissions = PERMISSIONS_CACHE.get(user_roles)
+    if permissions is None:
+        permissions = parse_orchard_roles(user_roles)
+        # Sorted array is computed once per role set
+        permissions.view_orchard_ids_array
+        PERMISSIONS_CACHE.set(user_roles, permissions)
+
+    # SET Username 
+    return permissions.model_copy(update={"username": payload.get("preferred_username")})
 
 """
 HELPER DEPENDENCIES
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+
+import httpx # Async-friendly
+import jwt
+from jwt.algorithms import RSAAlgorithm
+
+from app.backend.lru_cache import LRUCache
+
+
+# Config - From docker environment variables
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "300")) # Seconds the fetched keys are fresh
+JWKS_REFRESH_BEFORE = float(os.getenv("JWKS_REFRESH_BEFORE", "30")) # Refresh in the background this long before expiry
+JWKS_UNKNOWN_KID_TTL = float(os.getenv("JWKS_UNKNOWN_KID_TTL", "60")) # Seconds an unknown kid is rejected without a fetch
+JWKS_UNKNOWN_KID_CACHE_SIZE = int(os.getenv("JWKS_UNKNOWN_KID_CACHE_SIZE", "1000")) # Unknown kids remembered, least recently seen dropped
+JWKS_MIN_FETCH_INTERVAL = float(os.getenv("JWKS_MIN_FETCH_INTERVAL", "10")) # Seconds between two fetches (also after errors)
+JWKS_FETCH_TIMEOUT = float(os.getenv("JWKS_FETCH_TIMEOUT", "5"))
+
+
+class JWKSCache:
+    """Public keys of the realm (JSON Web Key Set) fetched from Keycloak without blocking the event loop.
+
+    - keys are refreshed in the background shortly before they expire, requests keep using the cached keys
+    - only one fetch runs at a time, concurrent misses wait for the same fetch (single-flight)
+    - a new kid waits for a fetch which started after it was seen (at most JWKS_MIN_FETCH_INTERVAL),
+      only then it is unknown
+    - unknown kids (rotated or forged) are remembered and do not trigger a fetch for JWKS_UNKNOWN_KID_TTL,
+      at most JWKS_UNKNOWN_KID_CACHE_SIZE of them (LRU) - Keycloak is asked at most once per
+      JWKS_MIN_FETCH_INTERVAL no matter how many different kids arrive
+    - when Keycloak is unreachable the last fetched keys stay in use
+    """
+
+    def __init__(self, jwks_url: str, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        self.jwks_url = jwks_url
+        # e.g. the JWKS of the local issuer in load tests (app.security.local_issuer)
+        self.transport = transport
+        self.keys: dict[str, RSAAlgorithm] = {}
+        self.expires_at = 0.0
+        self.fetched_at = float("-inf")
+        self.unknown_kids = LRUCache(JWKS_UNKNOWN_KID_CACHE_SIZE)
+        self._fetch_task: asyncio.Task | None = None
+
+    async def get_key(self, kid: str) -> RSAAlgorithm | None:
+        now = time.monotonic()
+        may_fetch = now - self.fetched_at >= JWKS_MIN_FETCH_INTERVAL
+
+        if kid in self.keys:
+            # Cached keys are used right away, a refresh before expiry runs in the background
+            if now >= self.expires_at - JWKS_REFRESH_BEFORE and may_fetch:
+                self._start_fetch()
+            return self.keys[kid]
+
+        # Negative cache
+        if self.unknown_kids.get(kid):
+            return None
+
+        # New kid (e.g. after key rotation) - wait for a fetch which started after the kid was seen,
+        # a fetch is never earlier than JWKS_MIN_FETCH_INTERVAL after the previous one
+        while kid not in self.keys and (self.fetched_at < now or self._is_fetching()):
+            delay = self.fetched_at + JWKS_MIN_FETCH_INTERVAL - time.monotonic()
+            if delay > 0 and not self._is_fetching():
+                await asyncio.sleep(delay)
+            else:
+                await self._fetch()
+
+        if kid not in self.keys:
+            # Negative cache - only after Keycloak was asked for the kid
+            # Bounded - any number of forged kids keeps at most JWKS_UNKNOWN_KID_CACHE_SIZE entries
+            self.unknown_kids.set(kid, True, expires_at=time.time() + JWKS_UNKNOWN_KID_TTL)
+            return None
+
+        return self.keys[kid]
+
+    def _is_fetching(self) -> bool:
+        return self._fetch_task is not None and not self._fetch_task.done()
+
+    def _start_fetch(self) -> asyncio.Task:
+        if not self._is_fetching():
+            # Start of the fetch - kids seen before it are answered by it
+            self.fetched_at = time.monotonic()
+            self._fetch_task = asyncio.create_task(self._fetch_keys())
+        return self._fetch_task
+
+    async def _fetch(self) -> None:
+        # shield - a cancelled request must not cancel the fetch other requests wait for
+        await asyncio.shield(self._start_fetch())
+
+    async def _fetch_keys(self) -> None:
+        try:
+            async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT, transport=self.transport) as client:
+                response = await client.get(self.jwks_url)  # {"keys":[
+                                                            # {
+                                                            # "kid":"...",
+                                                            # "kty":"RSA",
+                                                            # "alg":"RS256",
+                                                            # "use":"sig",
+                                                            # "n":"...",
+                                                            # "e":"..."
+                                                            # }, ...]}
+                response.raise_for_status()
+                jwks = response.json()  # JSON Web Key Set
+
+            keys = {}
+            for key in jwks.get("keys", []):
+                if key.get("kty") != "RSA" or key.get("use", "sig") != "sig" or "kid" not in key:
+                    continue
+                try:
+                    keys[key["kid"]] = jwt.algorithms.RSAAlgorithm.from_jwk(key)
+                except (jwt.PyJWTError, ValueError, KeyError) as e:
+                    # One malformed key must not drop the others
+                    print(f"Skipping JWKS key {key['kid']}: {e}")
+
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            # Keep the previous keys - retried after JWKS_MIN_FETCH_INTERVAL
+            print(f"Error fetching JWKS from Keycloak: {e}")
+            return
+
+        self.keys = keys
+        self.expires_at = time.monotonic() + JWKS_CACHE_TTL
+        # Kids of the new key set are no longer unknown
+        for kid in keys:
+            self.unknown_kids.invalidate(kid)
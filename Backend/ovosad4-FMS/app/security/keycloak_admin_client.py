@@ -1,6 +1,13 @@
+import asyncio
 import os
+import time
 import httpx # Async-friendly
 
+# Config - From docker environment variables
+KEYCLOAK_ADMIN_TOKEN_REFRESH_BEFORE = float(os.getenv("KEYCLOAK_ADMIN_TOKEN_REFRESH_BEFORE", "30")) # Seconds before expiry to refresh the admin token
+KEYCLOAK_ADMIN_TIMEOUT = float(os.getenv("KEYCLOAK_ADMIN_TIMEOUT", "10"))
+KEYCLOAK_ADMIN_MAX_CONNECTIONS = int(os.getenv("KEYCLOAK_ADMIN_MAX_CONNECTIONS", "10"))
+
 class KeycloakAdminClient:
     def __init__(self):
 
@@ -16,75 +23,126 @@ class KeycloakAdminClient:
         self.token_url = f"{self.keycloak_server_url}/realms/master/protocol/openid-connect/token"
         self.roles_url = f"{self.keycloak_server_url}/admin/realms/{self.target_realm}/roles"
 
+        # One pooled client per process - connections are kept alive between requests
+        # - created on first use, inside the running event loop
+        self._client: httpx.AsyncClient | None = None
+
+        # Cached admin token, reused until shortly before it expires
+        self._token: str | None = None
+        self._token_expires_at = 0.0
+        self._token_task: asyncio.Task | None = None
+
+
+    # Pooled HTTP client
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=KEYCLOAK_ADMIN_TIMEOUT,
+                limits=httpx.Limits(max_connections=KEYCLOAK_ADMIN_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    # Close the pooled client - on application shutdown
+    async def aclose(self):
+        if self._token_task is not None and not self._token_task.done():
+            self._token_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 
     # GET admin access token
-    # - Authenticates to Keycloak's master realm as admin and obtains an access token
+    # - cached token while it is valid, refreshed in the background shortly before it expires
+    # - concurrent requests without a valid token wait for the same token request (single-flight)
     async def _get_admin_token(self) -> str:
+        now = time.monotonic()
+
+        if self._token is not None and now < self._token_expires_at:
+            if now >= self._token_expires_at - KEYCLOAK_ADMIN_TOKEN_REFRESH_BEFORE:
+                self._start_token_request()
+            return self._token
+
+        # shield - a cancelled request must not cancel the token request other requests wait for
+        return await asyncio.shield(self._start_token_request())
+
+    def _start_token_request(self) -> asyncio.Task:
+        if self._token_task is None or self._token_task.done():
+            self._token_task = asyncio.create_task(self._request_admin_token())
+            # Errors of background refreshes are already logged, the next request retries
+            self._token_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._token_task
+
+    # Drop the cached token - e.g. after Keycloak rejected it
+    def _invalidate_admin_token(self):
+        self._token = None
+        self._token_expires_at = 0.0
+
+    # Authenticates to Keycloak's master realm as admin and obtains an access token
+    async def _request_admin_token(self) -> str:
+        try:
+            requested_at = time.monotonic()
+            response = await self._get_client().post(
+                self.token_url,
+                data={
+                    "grant_type": "password",
+                    "client_id": "admin-cli",
+                    "username": self.admin_username,
+                    "password": self.admin_password
+                },
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    self.token_url,
-                    data={
-                        "grant_type": "password",
-                        "client_id": "admin-cli",
-                        "username": self.admin_username,
-                        "password": self.admin_password
-                    },
-                    headers={"Content-Type": "application/x-www-form-urlencoded"}
-                )
-
-                # Raise an exception for HTTP errors (4xx or 5xx)
-                response.raise_for_status()
-
-                token_data = response.json()
-                return token_data["access_token"]
-            
-            except httpx.HTTPStatusError as e:
-                print(f"HTTP error getting Keycloak admin token: {e.response.status_code} - {e.response.text}")
-                raise
-            except httpx.RequestError as e:
-                print(f"Network error getting Keycloak admin token: {e}")
-                raise
-            except Exception as e:
-                print(f"An unexpected error occurred getting Keycloak admin token: {e}")
-                raise
+            # Raise an exception for HTTP errors (4xx or 5xx)
+            response.raise_for_status()
+
+            token_data = response.json()
+            self._token = token_data["access_token"]
+            # expires_in counts from when Keycloak issued the token - measured from the request start
+            self._token_expires_at = requested_at + token_data.get("expires_in", 60)
+            return self._token
+        
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP error getting Keycloak admin token: {e.response.status_code} - {e.response.text}")
+            raise
+        except httpx.RequestError as e:
+            print(f"Network error getting Keycloak admin token: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred getting Keycloak admin token: {e}")
+            raise
     
     
     # Make authenticated admin request to Keycloak Admin API
-    # - Attempts to get a fresh token for each request. Includes retry on 401.
-    async def _make_admin_request(self, method: str, url: str, **kwargs):
-        # Get a fresh token
+    # - Uses the cached token. Includes retry with a new token on 401.
+    async def _make_admin_request(self, method: str, url: str, retried_token: bool = False, **kwargs):
         token = await self._get_admin_token()
         
-        # 
-        headers = kwargs.pop("headers", {})
+        headers = dict(kwargs.pop("headers", {}))
         headers["Authorization"] = f"Bearer {token}"
         
         # Make authenticated request
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.request(method, url, headers=headers, **kwargs)
-                response.raise_for_status()
-                return response
-            
-            except httpx.HTTPStatusError as e:
-                # If token might have expired (unlikely but good safeguard)
-                # - try refreshing and retrying once
-                if e.response.status_code == 401 and not kwargs.get("retried_token"):
-                    print("Keycloak admin token invalid on first attempt, attempting refresh and retry.")
-                    # Setting 'retried_token' flag - avoids loops
-                    kwargs["retried_token"] = True
-                     # Retry with new token
-                    return await self._make_admin_request(method, url, **kwargs)
-                print(f"HTTP error during Keycloak admin request: {e.response.status_code} - {e.response.text}")
-                raise
-            except httpx.RequestError as e:
-                print(f"Network error during Keycloak admin request: {e}")
-                raise
-            except Exception as e:
-                print(f"An unexpected error occurred during Keycloak admin request: {e}")
-                raise
+        try:
+            response = await self._get_client().request(method, url, headers=headers, **kwargs)
+            response.raise_for_status()
+            return response
+        
+        except httpx.HTTPStatusError as e:
+            # If token expired or was revoked
+            # - get a new one and retry once
+            if e.response.status_code == 401 and not retried_token:
+                print("Keycloak admin token rejected, requesting a new one and retrying.")
+                if self._token == token:
+                    self._invalidate_admin_token()
+                # Setting 'retried_token' flag - avoids loops
+                return await self._make_admin_request(method, url, retried_token=True, **kwargs)
+            print(f"HTTP error during Keycloak admin request: {e.response.status_code} - {e.response.text}")
+            raise
+        except httpx.RequestError as e:
+            print(f"Network error during Keycloak admin request: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred during Keycloak admin request: {e}")
+            raise
             
 
     # Create new realm role in the target realm
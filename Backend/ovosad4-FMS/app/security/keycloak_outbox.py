@@ -0,0 +1,234 @@
+import asyncio
+import os
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import delete, event, func, or_, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backend.session import open_session
+from app.models.outbox import KeycloakRoleOutbox
+from app.security.keycloak_admin_client import keycloak_admin_client
+
+# Config - From docker environment variables
+KEYCLOAK_OUTBOX_BATCH_SIZE = int(os.getenv("KEYCLOAK_OUTBOX_BATCH_SIZE", "50")) # Entries applied per round
+KEYCLOAK_OUTBOX_CONCURRENCY = int(os.getenv("KEYCLOAK_OUTBOX_CONCURRENCY", "5")) # Parallel Keycloak requests
+KEYCLOAK_OUTBOX_POLL_INTERVAL = float(os.getenv("KEYCLOAK_OUTBOX_POLL_INTERVAL", "5")) # Seconds between polls when idle
+KEYCLOAK_OUTBOX_MAX_ATTEMPTS = int(os.getenv("KEYCLOAK_OUTBOX_MAX_ATTEMPTS", "10"))
+KEYCLOAK_OUTBOX_MAX_RETRY_DELAY = float(os.getenv("KEYCLOAK_OUTBOX_MAX_RETRY_DELAY", "300"))
+KEYCLOAK_OUTBOX_LEASE = float(os.getenv("KEYCLOAK_OUTBOX_LEASE", "300")) # Seconds claimed entries stay reserved for their dispatcher
+
+ROLE_CREATE = "create"
+ROLE_DELETE = "delete"
+
+
+# WRITES THE ROLES OF AN ORCHARD TO THE OUTBOX
+# - part of the caller's transaction, nothing is sent to Keycloak before the commit
+def enqueue_orchard_roles(session: AsyncSession, orchard_id: int, action: str) -> list[KeycloakRoleOutbox]:
+    entries = [
+        KeycloakRoleOutbox(action=action, role_name=f"Orchard-{orchard_id}-Admin"),
+        KeycloakRoleOutbox(action=action, role_name=f"Orchard-{orchard_id}-View"),
+    ]
+    session.add_all(entries)
+
+    # Wake the dispatcher of this worker as soon as the transaction commits
+    if not event.contains(session.sync_session, "after_commit", _wake_dispatcher):
+        event.listen(session.sync_session, "after_commit", _wake_dispatcher, once=True)
+
+    return entries
+
+
+def _wake_dispatcher(session):
+    keycloak_outbox_dispatcher.wake()
+
+
+def _no_older_pending_entry():
+    # The role of the entry has no pending entry before it - a failed one waiting for its retry included
+    older = aliased(KeycloakRoleOutbox)
+    return ~(
+        select(older.id)
+        .where(
+            older.role_name == KeycloakRoleOutbox.role_name,
+            older.status == "pending",
+            older.id < KeycloakRoleOutbox.id,
+        )
+        .exists()
+    )
+
+
+class KeycloakOutboxDispatcher:
+    """Background task which applies the Keycloak role outbox.
+
+    - entries are claimed in a short transaction (FOR UPDATE SKIP LOCKED, then a lease in claimed_until),
+      every worker process can run a dispatcher
+    - Keycloak is called with no session open, the outcome is written in a second short transaction -
+      no connection, transaction or row lock is held during the Keycloak requests
+    - entries of a dispatcher which died are claimed again once their lease expires
+    - a batch of entries is applied with bounded concurrency
+    - an entry is only taken once no older pending entry of its role is left - across batches and workers,
+      so the delete of a role never overtakes a create which is waiting for its retry
+    - failed entries are retried with exponential backoff, after KEYCLOAK_OUTBOX_MAX_ATTEMPTS they are marked failed
+    """
+
+    def __init__(self):
+        self._wake_event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wake_event.set()
+
+    async def _run(self):
+        while True:
+            try:
+                applied = await self.dispatch_batch()
+            except Exception as e:
+                print(f"Error dispatching Keycloak role outbox: {e}")
+                applied = 0
+
+            # Full batch - there may be more due entries right away
+            if applied >= KEYCLOAK_OUTBOX_BATCH_SIZE:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), KEYCLOAK_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_event.clear()
+
+    async def dispatch_batch(self) -> int:
+        """Apply one batch of due outbox entries.
+
+        Returns:
+            Number of entries taken from the outbox (applied or rescheduled).
+        """
+
+        entries = await self._claim_entries(
+            KeycloakRoleOutbox.next_attempt_at <= func.now(),
+            limit=KEYCLOAK_OUTBOX_BATCH_SIZE,
+        )
+        results = await self._apply_entries(entries)
+
+        return len(results)
+
+    @staticmethod
+    async def _claim_entries(*conditions, limit: int | None = None) -> list[KeycloakRoleOutbox]:
+        # Committed before any Keycloak request - the lease keeps other dispatchers away instead of a row lock
+        claim_id = str(uuid.uuid4())
+
+        async with open_session() as session:
+            entries = (await session.scalars(
+                select(KeycloakRoleOutbox)
+                .where(
+                    KeycloakRoleOutbox.status == "pending",
+                    or_(KeycloakRoleOutbox.claimed_until.is_(None), KeycloakRoleOutbox.claimed_until <= func.now()),
+                    _no_older_pending_entry(),
+                    *conditions,
+                )
+                .order_by(KeycloakRoleOutbox.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )).all()
+
+            if entries:
+                await session.execute(
+                    update(KeycloakRoleOutbox)
+                    .where(KeycloakRoleOutbox.id.in_([entry.id for entry in entries]))
+                    .values(claim_id=claim_id, claimed_until=func.now() + timedelta(seconds=KEYCLOAK_OUTBOX_LEASE))
+                    .execution_options(synchronize_session=False)
+                )
+
+        # Detached after the commit - the claim is kept to write the outcome
+        for entry in entries:
+            entry.claim_id = claim_id
+
+        return entries
+
+    async def _apply_entries(self, entries: list[KeycloakRoleOutbox]) -> dict[int, str | None]:
+        # Different roles are independent - one entry per role, the oldest pending one (_no_older_pending_entry)
+        entries_by_role = defaultdict(list)
+        for entry in entries:
+            entries_by_role[entry.role_name].append(entry)
+
+        # Only the Keycloak requests run concurrently - the outcome is written afterwards
+        semaphore = asyncio.Semaphore(KEYCLOAK_OUTBOX_CONCURRENCY)
+        results = await asyncio.gather(*[
+            self._apply_role_entries(role_entries, semaphore) for role_entries in entries_by_role.values()
+        ])
+
+        errors = {}
+        if not entries:
+            return errors
+
+        async with open_session() as session:
+            for role_results in results:
+                for entry, error, attempted in role_results:
+                    errors[entry.id] = None if error is None else str(error)
+
+                    # Only while the claim is still ours - after an expired lease another dispatcher owns the entry
+                    claimed = (KeycloakRoleOutbox.id == entry.id, KeycloakRoleOutbox.claim_id == entry.claim_id)
+
+                    if error is None:
+                        await session.execute(delete(KeycloakRoleOutbox).where(*claimed))
+                        continue
+
+                    values = {"claim_id": None, "claimed_until": None}
+                    attempts = entry.attempts
+                    if attempted:
+                        attempts += 1
+                        values.update(attempts=attempts, last_error=str(error)[:1000])
+
+                    if attempts >= KEYCLOAK_OUTBOX_MAX_ATTEMPTS:
+                        values["status"] = "failed"
+                        print(f"Giving up on Keycloak role {entry.action} of '{entry.role_name}' after {attempts} attempts: {error}")
+                    else:
+                        # Database time - the same clock as the func.now() the entries are selected with
+                        delay = min(2 ** max(attempts, 1), KEYCLOAK_OUTBOX_MAX_RETRY_DELAY)
+                        values["next_attempt_at"] = func.now() + timedelta(seconds=delay)
+
+                    await session.execute(update(KeycloakRoleOutbox).where(*claimed).values(**values))
+
+        return errors
+
+    @staticmethod
+    async def _apply_role_entries(role_entries: list[KeycloakRoleOutbox], semaphore: asyncio.Semaphore) -> list[tuple]:
+        # (entry, error or None, attempted) - after a failure the later entries of the role
+        # are not attempted, they are rescheduled together with the failed one
+        results = []
+        error = None
+
+        async with semaphore:
+            for entry in role_entries:
+                if error is not None:
+                    results.append((entry, error, False))
+                    continue
+                try:
+                    if entry.action == ROLE_CREATE:
+                        await keycloak_admin_client.create_realm_role(entry.role_name)
+                    elif entry.action == ROLE_DELETE:
+                        await keycloak_admin_client.delete_realm_role(entry.role_name)
+                    else:
+                        raise ValueError(f"Unknown outbox action '{entry.action}'")
+                except Exception as e:
+                    error = e
+                results.append((entry, error, True))
+
+        return results
+
+
+# Initialize the dispatcher as a global instance
+keycloak_outbox_dispatcher = KeycloakOutboxDispatcher()
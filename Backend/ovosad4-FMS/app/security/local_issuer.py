@@ -0,0 +1,137 @@
+"""Local token issuer for load tests - stands in for Keycloak.
+
+With AUTH_LOCAL_ISSUER_KEY_FILE set the API verifies tokens against the public
+key of this RSA key instead of the realm JWKS. The tokens go through the normal
+verify_access_token path (JWKS cache, signature, iss/aud/exp, token cache, role
+parsing), only the JWKS is served locally. Never set it in production - anyone
+with the key file can mint Orchard-Global-Admin tokens.
+
+Mint tokens with the same key file:
+
+    AUTH_LOCAL_ISSUER_KEY_FILE=/tmp/bench-key.pem \\
+    python -m app.security.local_issuer --roles Orchard-Global-Admin
+
+    AUTH_LOCAL_ISSUER_KEY_FILE=/tmp/bench-key.pem \\
+    python -m app.security.local_issuer --username viewer --roles Orchard-1-View Orchard-2-View --expires-in 86400
+
+The key file is generated on first use.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+# Config - From docker environment variables
+AUTH_LOCAL_ISSUER_KEY_FILE = os.getenv("AUTH_LOCAL_ISSUER_KEY_FILE") # PEM private key, enables the local issuer
+KEYCLOAK_REALM = os.getenv("KEYCLOAK_REALM", "OrchardRealm")
+KEYCLOAK_PUBLIC_SERVER_URL = os.getenv("KEYCLOAK_PUBLIC_SERVER_URL", "http://localhost:8080")
+
+# Claims checked by verify_access_token
+TOKEN_ISSUER = f"{KEYCLOAK_PUBLIC_SERVER_URL}/realms/{KEYCLOAK_REALM}"
+TOKEN_AUDIENCE = "react-frontend"
+
+
+class LocalIssuer:
+    """RSA key which signs Keycloak-shaped access tokens and serves its JWKS."""
+
+    def __init__(self, key_file: str) -> None:
+        self.key_file = key_file
+        self.private_key = self._load_or_generate_key(key_file)
+
+        public_jwk = json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        # Stable kid - the same key file gives the same kid in the API and in the minting process
+        self.kid = "local-" + hashlib.sha256(public_jwk["n"].encode()).hexdigest()[:16]
+        self.public_jwk = {**public_jwk, "kid": self.kid, "alg": "RS256", "use": "sig"}
+
+    @staticmethod
+    def _load_or_generate_key(key_file: str) -> rsa.RSAPrivateKey:
+        if os.path.exists(key_file):
+            return LocalIssuer._load_key(key_file)
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        # Written completely to a temporary file (readable only by the owner), then linked to key_file -
+        # the link appears atomically and fails if another worker generated its key first
+        descriptor, temporary_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(key_file)), suffix=".part")
+        try:
+            with open(descriptor, "wb") as file:
+                file.write(pem)
+            os.link(temporary_file, key_file)
+        except FileExistsError:
+            # Lost the race - every worker has to use the same key
+            return LocalIssuer._load_key(key_file)
+        finally:
+            os.unlink(temporary_file)
+
+        # stderr - stdout of the minting command is only the tokens
+        print(f"Generated local issuer key {key_file}", file=sys.stderr)
+        return private_key
+
+    @staticmethod
+    def _load_key(key_file: str) -> rsa.RSAPrivateKey:
+        with open(key_file, "rb") as file:
+            return serialization.load_pem_private_key(file.read(), password=None)
+
+    def jwks(self) -> dict:
+        # Same shape as the Keycloak certs endpoint
+        return {"keys": [self.public_jwk]}
+
+    def transport(self) -> httpx.MockTransport:
+        # Answers the JWKS requests of JWKSCache without a network round trip
+        return httpx.MockTransport(lambda request: httpx.Response(200, json=self.jwks()))
+
+    def mint_token(self, username: str, roles: list[str], expires_in: int = 3600) -> str:
+        now = int(time.time())
+        payload = {
+            "exp": now + expires_in,
+            "iat": now,
+            "jti": str(uuid.uuid4()),
+            "iss": TOKEN_ISSUER,
+            "aud": TOKEN_AUDIENCE,
+            "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{TOKEN_ISSUER}/{username}")),
+            "typ": "Bearer",
+            "azp": TOKEN_AUDIENCE,
+            "preferred_username": username,
+            "realm_access": {"roles": list(roles)},
+        }
+        return jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+
+def get_local_issuer() -> LocalIssuer | None:
+    if not AUTH_LOCAL_ISSUER_KEY_FILE:
+        return None
+    return LocalIssuer(AUTH_LOCAL_ISSUER_KEY_FILE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", default="bench", help="preferred_username of the token")
+    parser.add_argument("--roles", nargs="+", default=["Orchard-Global-Admin"], help="realm roles, e.g. Orchard-1-View")
+    parser.add_argument("--expires-in", type=int, default=3600, help="seconds until the token expires")
+    parser.add_argument("--count", type=int, default=1, help="number of tokens, one per line")
+    args = parser.parse_args()
+
+    issuer = get_local_issuer()
+    if issuer is None:
+        parser.error("AUTH_LOCAL_ISSUER_KEY_FILE is not set")
+
+    for _ in range(args.count):
+        print(issuer.mint_token(args.username, args.roles, args.expires_in))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,135 +1,105 @@
+import inspect
+import os
+from typing import Awaitable, Callable
+
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from app.backend.lru_cache import LRUCache
 from app.backend.session import create_session
+from app.models.base import SQLModelBase
 from app.models.orchard import Tree, TreeData, TreeImage, Spraying, Harvest, FlowerThinning, FruitThinning
 
-# GET TO WHICH ORCHARD(ID) A TREE(ID) BELONGS TO   
-async def get_orchard_id_from_tree_id(
-    tree_id: int,
-    session: Session = Depends(create_session)
-) -> int:
-    
-    # Select just the orchard_id column
-    orchard_id = session.scalar(select(Tree.orchard_id).where(Tree.id == tree_id))
-    
-    # 404 if the tree is not found
-    if orchard_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Tree with ID {tree_id} not found."
-        )
-    return orchard_id
 
+# Ownership cache - (table name, entity id) -> orchard_id
+# - a tree cannot move to another orchard and a child cannot move to another tree,
+#   so entries only have to be dropped when the entity is deleted
+ORCHARD_ID_CACHE = LRUCache(int(os.getenv("ORCHARD_ID_CACHE_SIZE", "10000")))
 
-# GETS TO WHICH ORCHARD(ID) A TREE_DATA(ID) BELONGS TO
-async def get_orchard_id_from_tree_data_id(
-    tree_data_id: int, session: Session = Depends(create_session)
+
+# GETS TO WHICH ORCHARD(ID) AN ENTITY(ID) BELONGS TO
+# - Tree has the orchard_id column, every other entity is joined to its tree through the "tree" relationship
+# - one query no matter how far the entity is from the orchard
+async def resolve_orchard_id(
+    session: AsyncSession,
+    model_class: type[SQLModelBase],
+    entity_id: int,
+    entity_name: str,
 ) -> int:
-    
-    # Select just the tree_id column from the TreeData table
-    tree_id = session.scalar(select(TreeData.tree_id).where(TreeData.id == tree_data_id))
 
-    # 404 if the tree_data entry is not found
-    if tree_id is None:
+    cache_key = (model_class.__tablename__, entity_id)
+    orchard_id = ORCHARD_ID_CACHE.get(cache_key)
+    if orchard_id is not None:
+        return orchard_id
+
+    # Select just the orchard_id column
+    query = select(Tree.orchard_id)
+    if model_class is not Tree:
+        query = query.select_from(model_class).join(model_class.tree)
+    orchard_id = await session.scalar(query.where(model_class.id == entity_id))
+
+    # 404 if the entity is not found
+    if orchard_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"TreeData with ID {tree_data_id} not found."
+            detail=f"{entity_name} with ID {entity_id} not found."
         )
 
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
+    ORCHARD_ID_CACHE.set(cache_key, orchard_id)
+    return orchard_id
 
 
-# GETS TO WHICH ORCHARD(ID) A TREE_IMAGE(ID) BELONGS TO
-async def get_orchard_id_from_tree_image_id(
-    tree_image_id: int,
-    session: Session = Depends(create_session)
-) -> int:
-    
-    # Select just the tree_id column from the TreeImage table
-    tree_id = session.scalar(select(TreeImage.tree_id).where(TreeImage.id == tree_image_id))
+# CREATES THE ORCHARD(ID) DEPENDENCY FOR AN ENTITY TYPE
+# - id_param is the name of the path parameter with the entity id (e.g. "harvest_id")
+# - usable as orchard_id_dependency in verify_orchard_view_access / verify_orchard_admin_access
+#   or called directly, e.g. await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
+def orchard_id_resolver(
+    model_class: type[SQLModelBase],
+    id_param: str,
+    entity_name: str,
+) -> Callable[..., Awaitable[int]]:
 
-    # 404 if the tree_image entry is not found
-    if tree_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Tree image with ID {tree_image_id} not found."
-        )
+    async def get_orchard_id(session: AsyncSession = Depends(create_session), **entity_id: int) -> int:
+        return await resolve_orchard_id(session, model_class, entity_id[id_param], entity_name)
 
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
+    # FastAPI reads the parameters from the signature - expose the id under its path parameter name
+    get_orchard_id.__signature__ = inspect.Signature(
+        parameters=[
+            inspect.Parameter(id_param, inspect.Parameter.KEYWORD_ONLY, annotation=int),
+            inspect.Parameter(
+                "session", inspect.Parameter.KEYWORD_ONLY,
+                default=Depends(create_session), annotation=AsyncSession
+            ),
+        ],
+        return_annotation=int,
+    )
+    get_orchard_id.__name__ = get_orchard_id.__qualname__ = f"get_orchard_id_from_{id_param}"
 
+    # Drop the cached orchard_id when the entity is deleted (also on cascade deletes through the ORM)
+    @event.listens_for(model_class, "after_delete")
+    def invalidate_orchard_id(mapper, connection, target) -> None:
+        ORCHARD_ID_CACHE.invalidate((model_class.__tablename__, target.id))
 
-# GETS TO WHICH ORCHARD(ID) A SPRAYING(ID) BELONGS TO
-async def get_orchard_id_from_spraying_id(
-    spraying_id: int,
-    session: Session = Depends(create_session)
-) -> int:
- 
-    # Select just the tree_id column from the Spraying table
-    tree_id = session.scalar(select(Spraying.tree_id).where(Spraying.id == spraying_id))
+    return get_orchard_id
 
-    # 404 if the spraying entry is not found
-    if tree_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Spraying with ID {spraying_id} not found."
-        )
-    
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
 
+# GET TO WHICH ORCHARD(ID) A TREE(ID) BELONGS TO
+get_orchard_id_from_tree_id = orchard_id_resolver(Tree, "tree_id", "Tree")
 
-# GETS TO WHICH ORCHARD(ID) A HARVEST(ID) BELONGS TO
-async def get_orchard_id_from_harvest_id(
-    harvest_id: int,
-    session: Session = Depends(create_session)
-) -> int:
+# GETS TO WHICH ORCHARD(ID) A TREE_DATA(ID) BELONGS TO
+get_orchard_id_from_tree_data_id = orchard_id_resolver(TreeData, "tree_data_id", "TreeData")
 
-    # Select just the tree_id column from the Harvets table
-    tree_id = session.scalar(select(Harvest.tree_id).where(Harvest.id == harvest_id))
+# GETS TO WHICH ORCHARD(ID) A TREE_IMAGE(ID) BELONGS TO
+get_orchard_id_from_tree_image_id = orchard_id_resolver(TreeImage, "tree_image_id", "Tree image")
 
-    # 404 if the harvest entry is not found
-    if tree_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Harvest with ID {harvest_id} not found."
-        )
-    
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
+# GETS TO WHICH ORCHARD(ID) A SPRAYING(ID) BELONGS TO
+get_orchard_id_from_spraying_id = orchard_id_resolver(Spraying, "spraying_id", "Spraying")
 
+# GETS TO WHICH ORCHARD(ID) A HARVEST(ID) BELONGS TO
+get_orchard_id_from_harvest_id = orchard_id_resolver(Harvest, "harvest_id", "Harvest")
 
 # GETS TO WHICH ORCHARD(ID) A FLOWER_THINNING(ID) BELONGS TO
-async def get_orchard_id_from_flower_thinning_id(
-    flower_thinning_id: int,
-    session: Session = Depends(create_session)
-) -> int:
-    
-    # Select just the tree_id column from the flower thinning table
-    tree_id = session.scalar(select(FlowerThinning.tree_id).where(FlowerThinning.id == flower_thinning_id))
-
-    # 404 if the flower thinning entry is not found
-    if tree_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Flower Thinning with ID {flower_thinning_id} not found."
-        )
-    
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
-
+get_orchard_id_from_flower_thinning_id = orchard_id_resolver(FlowerThinning, "flower_thinning_id", "Flower Thinning")
 
 # GETS TO WHICH ORCHARD(ID) A FRUIT_THINNING(ID) BELONGS TO
-async def get_orchard_id_from_fruit_thinning_id(
-    fruit_thinning_id: int,
-    session: Session = Depends(create_session)
-) -> int:
-    
-    # Select just the tree_id column from the fruit thinning table
-    tree_id = session.scalar(select(FruitThinning.tree_id).where(FruitThinning.id == fruit_thinning_id))
-
-    # 404 if the fruit thinning entry is not found
-    if tree_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Fruit Thinning with ID {fruit_thinning_id} not found."
-        )
-    
-    return await get_orchard_id_from_tree_id(tree_id=tree_id, session=session)
+get_orchard_id_from_fruit_thinning_id = orchard_id_resolver(FruitThinning, "fruit_thinning_id", "Fruit Thinning")
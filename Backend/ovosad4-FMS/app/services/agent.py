@@ -6,6 +6,8 @@ from app.models.orchard import Agent
 from app.schemas import CreateAgentSchema, UpdateAgentSchema, AgentSchema
 from .base_service import BaseService, BaseDataManager
 
+from app.schemas.pagination import PaginationParams
+
 """
 get_agent create_agent, update_agent, delete_agent
 - their authorization is handled by the verify_orchard_view_access, verify_orchard_admin_access, verify_global_admin_access dependencies in the router
@@ -14,47 +16,51 @@ get_agent create_agent, update_agent, delete_agent
 class AgentService(BaseService):
 
     # New method for mastertable
-    def get_agent_mastertable(self) -> List[AgentSchema]:
-        return AgentDataManager(self.session).get_agent_mastertable()
+    async def get_agent_mastertable(self, pagination: PaginationParams | None = None) -> List[AgentSchema]:
+        return await AgentDataManager(self.session).get_agent_mastertable(pagination)
     
-    def get_agent(self, agent_id: int):
-        return AgentDataManager(self.session).get_agent(agent_id)
+    async def get_agent(self, agent_id: int):
+        return await AgentDataManager(self.session).get_agent(agent_id)
 
-    def create_agent(self, agent: CreateAgentSchema):
+    async def create_agent(self, agent: CreateAgentSchema):
         agent_model = Agent(**agent.model_dump())
-        return AgentDataManager(self.session).create_agent(agent_model)
+        return await AgentDataManager(self.session).create_agent(agent_model)
 
-    def update_agent(self, agent_id: int, agent: UpdateAgentSchema):
-        return AgentDataManager(self.session).update_agent(agent_id, agent)
+    async def update_agent(self, agent_id: int, agent: UpdateAgentSchema):
+        return await AgentDataManager(self.session).update_agent(agent_id, agent)
     
-    def delete_agent(self, agent_id: int):
-        return AgentDataManager(self.session).delete_agent(agent_id)
+    async def delete_agent(self, agent_id: int):
+        return await AgentDataManager(self.session).delete_agent(agent_id)
 
 
 class AgentDataManager(BaseDataManager):
 
-    def _prepare_payload(self, model):
-        return AgentSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(self, model, submodel_ids):
+        return AgentSchema.model_validate({**model.__dict__, **submodel_ids})
     
     # New method for mastertable
-    def get_agent_mastertable(self) -> List[AgentSchema]:
-        model_list = self.session.scalars(select(Agent)).all()
-        return [self._prepare_payload(model) for model in model_list]
-
-    def get_agent(self, agent_id: int) -> AgentSchema:
-        model = self.session.scalar(select(Agent).where(Agent.id == agent_id))
+    async def get_agent_mastertable(self, pagination: PaginationParams | None = None) -> List[AgentSchema]:
+        query = self._paginate(select(Agent), Agent.id, pagination)
+        model_list = (await self.session.scalars(query)).all()
+        submodel_ids = await self._get_submodel_ids(Agent, query.with_only_columns(Agent.id))
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
+
+    async def get_agent(self, agent_id: int) -> AgentSchema:
+        model = await self.session.scalar(select(Agent).where(Agent.id == agent_id))
         if not model:
             raise HTTPException(404, f"{agent_id=} not found")
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Agent, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def create_agent(self, agent: Agent) -> AgentSchema:
+    async def create_agent(self, agent: Agent) -> AgentSchema:
         self.session.add(agent)
-        self.session.flush()
-        self.session.refresh(agent)
-        return self._prepare_payload(agent)
+        await self.session.flush()
+        await self.session.refresh(agent)
+        submodel_ids = await self._get_submodel_ids(Agent, [agent.id])
+        return self._prepare_payload(agent, submodel_ids[agent.id])
 
-    def update_agent(self, agent_id: int, agent: UpdateAgentSchema) -> AgentSchema:
-        model = self.session.scalar(select(Agent).where(Agent.id == agent_id))
+    async def update_agent(self, agent_id: int, agent: UpdateAgentSchema) -> AgentSchema:
+        model = await self.session.scalar(select(Agent).where(Agent.id == agent_id))
         if not model:
             raise HTTPException(404, f"{agent_id=} not found")
 
@@ -66,14 +72,16 @@ class AgentDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Agent, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
     
-    def delete_agent(self, agent_id: int) -> AgentSchema:
-        model = self.session.scalar(select(Agent).where(Agent.id == agent_id))
+    async def delete_agent(self, agent_id: int) -> AgentSchema:
+        model = await self.session.scalar(select(Agent).where(Agent.id == agent_id))
         if not model:
             raise HTTPException(404, f"{agent_id=} not found")
-        self.session.delete(model)
-        return self._prepare_payload(model)
+        await self.session.delete(model)
+        submodel_ids = await self._get_submodel_ids(Agent, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
@@ -1,9 +1,20 @@
-from sqlalchemy.orm import Session
+import os
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import ARRAY, Integer, any_, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+
+from app.schemas.pagination import PaginationParams
+
+# Number of rows fetched from the server-side cursor at once when streaming mastertables
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
 
 
 class SessionMixin:
     """Base class for application services."""
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
 
@@ -13,3 +24,144 @@ class BaseService(SessionMixin):
 
 class BaseDataManager(SessionMixin):
     """Base data manager class responsible for operations over database."""
+
+    @staticmethod
+    def _paginate(query, id_column, pagination: PaginationParams | None):
+        # Keyset pagination - WHERE id > cursor ORDER BY id LIMIT page size
+        if pagination is None or not pagination.is_paginated:
+            return query
+
+        if pagination.after_id is not None:
+            query = query.where(id_column > pagination.after_id)
+
+        return query.order_by(id_column).limit(pagination.limit)
+
+    @staticmethod
+    def _resolve_fields(model_class, schema, fields: list[str]) -> tuple[list[str], list]:
+        # Split requested fields into submodel id lists and model columns
+        unknown_fields = [field for field in fields if field not in schema.model_fields]
+        if unknown_fields:
+            raise HTTPException(400, f"Unknown fields {unknown_fields}")
+
+        # "id" first and always included, duplicates removed
+        fields = list(dict.fromkeys(["id", *fields]))
+        submodel_names = [field for field in fields if field in model_class.submodel_names]
+        columns = [getattr(model_class, field) for field in fields if field not in submodel_names]
+
+        return submodel_names, columns
+
+    @staticmethod
+    def _in_orchards(orchard_id_column, orchard_ids: list[int]):
+        # orchard_id = ANY(:orchard_ids) - one ARRAY parameter instead of one parameter per orchard,
+        # the statement is the same for any number of orchards so its plan can be cached
+        return orchard_id_column == any_(bindparam("orchard_ids", orchard_ids, type_=ARRAY(Integer)))
+
+    async def _get_projected(self, model_class, schema, query, fields: list[str]) -> list[dict]:
+        """Load only the requested fields of the models selected by query.
+
+        Columns are loaded with a column-limited select() instead of full ORM models,
+        submodel id lists only when they are requested.
+
+        Args:
+            model_class: Model selected by query (e.g. Tree).
+            schema: Full response schema, defines which fields can be requested.
+            query: select() of model_class with filters and pagination applied.
+            fields: Requested field names.
+
+        Returns:
+            List of dicts with "id" and the requested fields.
+        """
+
+        submodel_names, columns = self._resolve_fields(model_class, schema, fields)
+
+        rows = (await self.session.execute(query.with_only_columns(*columns))).all()
+        items = [row._asdict() for row in rows]
+
+        if submodel_names:
+            submodel_ids = await self._get_submodel_ids(
+                model_class, query.with_only_columns(model_class.id), submodel_names
+            )
+            for item in items:
+                item.update(submodel_ids[item["id"]])
+
+        return items
+
+    async def _stream_payloads(self, model_class, schema, query, fields: list[str] | None = None) -> AsyncIterator[list]:
+        """Stream the models selected by query in batches of STREAM_BATCH_SIZE.
+
+        Rows are read with a server-side cursor (yield_per), submodel ids are collected
+        per batch, so memory use does not depend on the size of the table.
+
+        Args:
+            model_class: Model selected by query (e.g. Tree).
+            schema: Full response schema.
+            query: select() of model_class with filters and pagination applied.
+            fields: Requested field names (sparse fieldset), None for the full schema.
+
+        Yields:
+            Lists of schema objects, or dicts with the requested fields.
+        """
+
+        if fields is None:
+            submodel_names = model_class.submodel_names
+            result = await self.session.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        else:
+            submodel_names, columns = self._resolve_fields(model_class, schema, fields)
+            result = await self.session.stream(
+                query.with_only_columns(*columns).execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+
+        async for batch in result.partitions():
+            if fields is None:
+                items = [{**model.__dict__} for model in batch]
+            else:
+                items = [row._asdict() for row in batch]
+
+            if submodel_names:
+                submodel_ids = await self._get_submodel_ids(
+                    model_class, [item["id"] for item in items], submodel_names
+                )
+                for item in items:
+                    item.update(submodel_ids[item["id"]])
+
+            if fields is None:
+                items = [schema.model_validate(item) for item in items]
+
+            yield items
+
+    async def _get_submodel_ids(self, model_class, parent_ids, names=None) -> dict[int, dict[str, list[int]]]:
+        """Collect ids of the submodels listed in model_class.submodel_names.
+
+        Runs one id-only query per relationship no matter how many parents are requested,
+        instead of loading the related models for every parent.
+
+        Args:
+            model_class: Model with submodel_names (e.g. Tree).
+            parent_ids: List of parent ids or a select() of parent ids (mastertables).
+            names: Relationships to collect, defaults to all of model_class.submodel_names.
+
+        Returns:
+            Mapping of parent id to {submodel name: list of submodel ids}.
+        """
+
+        if names is None:
+            names = model_class.submodel_names
+
+        submodel_ids = defaultdict(lambda: {name: [] for name in names})
+
+        for name in names:
+            relationship = getattr(model_class, name).property
+            submodel_class = relationship.mapper.class_
+            # One-to-many relationship - (parent primary key, submodel foreign key)
+            [(_, foreign_key)] = relationship.local_remote_pairs
+
+            rows = await self.session.execute(
+                select(foreign_key, submodel_class.id)
+                .where(foreign_key.in_(parent_ids))
+                .order_by(submodel_class.id)
+            )
+
+            for parent_id, submodel_id in rows:
+                submodel_ids[parent_id][name].append(submodel_id)
+
+        return submodel_ids
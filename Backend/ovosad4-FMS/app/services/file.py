@@ -1,35 +1,68 @@
+import asyncio
+import hashlib
 import os
 import pathlib
 import uuid
+from collections import Counter
 
-from sqlalchemy import select
-from fastapi import HTTPException
+import aiofiles
+import aiofiles.os
+import sqlalchemy.exc
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from fastapi import HTTPException, UploadFile, status
 
+from app.backend.image_render import IMAGE_FORMATS
+from app.models.file_blob import FileBlob
 from app.models.orchard import File
-from app.schemas import FileSchema, CreateFileSchema, UpdateFileSchema
+from app.schemas import FileSchema, CreateFileSchema, UpdateFileSchema, FileBulkResultSchema
 from .base_service import BaseService, BaseDataManager
+from .file_derivative import derivative_cache, FILE_DERIVATIVE_WIDTHS
+
+from app.schemas.pagination import PaginationParams
+
+# Config - From docker environment variables
+FILE_MAX_UPLOAD_SIZE = int(os.getenv("FILE_MAX_UPLOAD_SIZE", str(50 * 1024 * 1024))) # Bytes per uploaded file
+FILE_UPLOAD_CHUNK_SIZE = int(os.getenv("FILE_UPLOAD_CHUNK_SIZE", str(1024 * 1024))) # Bytes read and written at once
+FILE_BULK_CONCURRENCY = int(os.getenv("FILE_BULK_CONCURRENCY", "4")) # Files of a bulk upload streamed to storage at once
+FILE_STORAGE_MODE = os.getenv("FILE_STORAGE_MODE", "sha256") # "sha256" content-addressed (deduplicated), "uuid" one blob per upload
+
+STORAGE_MODE_SHA256 = "sha256"
 
 
 class FileService(BaseService):
 
-    def get_file_mastertable(self) -> list[FileSchema]:
-        return FileDataManager(self.session).get_file_mastertable()
+    async def get_file_mastertable(self, pagination: PaginationParams | None = None) -> list[FileSchema]:
+        return await FileDataManager(self.session).get_file_mastertable(pagination)
+
+    async def get_file(self, file_id: int) -> FileSchema:
+        return await FileDataManager(self.session).get_file(file_id)
 
-    def get_file(self, file_id: int) -> FileSchema:
-        return FileDataManager(self.session).get_file(file_id)
+    async def get_file_content(self, file_id: int) -> tuple[pathlib.Path, str, str]:
+        return await FileDataManager(self.session).get_file_content(file_id)
 
-    def get_file_content(self, file_id: int) -> tuple[bytes, str]:
-        return FileDataManager(self.session).get_file_content(file_id)
+    async def get_file_derivative(self, file_id: int, width: int, image_format: str) -> tuple[pathlib.Path, str, str]:
+        return await FileDataManager(self.session).get_file_derivative(file_id, width, image_format)
 
-    def create_file(self, file: CreateFileSchema, content: bytes) -> FileSchema:
+    async def create_file(self, file: CreateFileSchema, upload_file: UploadFile) -> FileSchema:
         file_model = File(**file.model_dump())
-        return FileDataManager(self.session).create_file(file_model, content)
+        return await FileDataManager(self.session).create_file(file_model, upload_file)
 
-    def update_file(self, file: UpdateFileSchema):
-        raise NotImplemented()
+    async def create_files(self, files: list[CreateFileSchema], upload_files: list[UploadFile]) -> list[FileBulkResultSchema]:
+        results = await FileDataManager(self.session).create_files([file.model_dump() for file in files], upload_files)
 
-    def delete_file(self, file_id: int) -> FileSchema:
-        return FileDataManager(self.session).delete_file(file_id)
+        return [
+            FileBulkResultSchema(name=file.name, status_code=result.status_code, error=result.detail)
+            if isinstance(result, HTTPException) else
+            FileBulkResultSchema(name=file.name, status_code=status.HTTP_200_OK, file=result)
+            for file, result in zip(files, results)
+        ]
+
+    async def update_file(self, file_id: int, file: UpdateFileSchema) -> FileSchema:
+        return await FileDataManager(self.session).update_file(file_id, file)
+
+    async def delete_file(self, file_id: int) -> FileSchema:
+        return await FileDataManager(self.session).delete_file(file_id)
 
 
 class FileDataManager(BaseDataManager):
@@ -38,81 +71,406 @@ class FileDataManager(BaseDataManager):
         self.file_storage_service = FileStorageService()
 
     @staticmethod
-    def _prepare_payload(model):
-        return FileSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return FileSchema.model_validate({**model.__dict__, **submodel_ids})
 
-    def get_file_mastertable(self) -> list[FileSchema]:
-        model_list = self.session.scalars(select(File)).all()
+    async def get_file_mastertable(self, pagination: PaginationParams | None = None) -> list[FileSchema]:
+        query = self._paginate(select(File), File.id, pagination)
+        model_list = (await self.session.scalars(query)).all()
 
-        return [self._prepare_payload(model) for model in model_list]
+        submodel_ids = await self._get_submodel_ids(File, query.with_only_columns(File.id))
 
-    def get_file(self, file_id: int) -> FileSchema:
-        model = self.session.scalar(select(File).where(File.id == file_id))
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
+
+    async def get_file(self, file_id: int) -> FileSchema:
+        model = await self.session.scalar(select(File).where(File.id == file_id))
 
         if not model:
             raise HTTPException(404, f"{file_id=} not found")
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(File, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def get_file_content(self, file_id: int) -> tuple[bytes, str]:
-        model = self.session.scalar(select(File).where(File.id == file_id))
+    async def get_file_content(self, file_id: int) -> tuple[pathlib.Path, str, str]:
+        """
+        Returns:
+            (path of the stored file, mime, content tag) - the tag is the sha256 of the content,
+            the uid for files uploaded before checksums (the content under a uid never changes either)
+        """
+        model = await self.session.scalar(select(File).where(File.id == file_id))
 
         if not model:
             raise HTTPException(404, f"{file_id=} not found")
 
-        content = self.file_storage_service.get_file(model.uid)
+        path = await self.file_storage_service.find_file_path(model.uid)
+        if path is None:
+            raise HTTPException(404, f"Content of {file_id=} not found")
 
-        return content, model.mime
+        return path, model.mime, model.sha256 or model.uid
 
-    def create_file(self, file: File, content: bytes) -> FileSchema:
+    async def get_file_derivative(self, file_id: int, width: int, image_format: str) -> tuple[pathlib.Path, str, str]:
+        """
+        Returns:
+            (path of the resized variant, its mime, its content tag)
+        """
+        if width not in FILE_DERIVATIVE_WIDTHS:
+            raise HTTPException(422, f"Width {width} not available, use one of {FILE_DERIVATIVE_WIDTHS}")
 
-        uid = self.file_storage_service.store_file(content)
-        file.uid = uid
+        source_path, mime, content_tag = await self.get_file_content(file_id)
+        if not mime.startswith("image/"):
+            raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"{file_id=} is not an image ({mime})")
 
-        self.session.add(file)
-        self.session.flush()
-        self.session.refresh(file)
+        try:
+            path = await derivative_cache.get(source_path, content_tag, width, image_format)
+        except (OSError, ValueError) as e:
+            # Pillow cannot decode the content (UnidentifiedImageError is an OSError)
+            raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"{file_id=} cannot be resized: {e}")
 
-        return self._prepare_payload(file)
+        _, derivative_mime = IMAGE_FORMATS[image_format]
+        return path, derivative_mime, f"{content_tag}-w{width}.{image_format}"
 
-    def update_file(self) -> None:
-        raise NotImplemented()
+    async def create_file(self, file: File, upload_file: UploadFile) -> FileSchema:
 
-    def delete_file(self, file_id: int) -> FileSchema:
-        model = self.session.scalar(select(File).where(File.id == file_id))
+        await self._store_content(file, upload_file)
+        self._pregenerate_derivatives(file)
+
+        self.session.add(file)
+        await self.session.flush()
+        await self.session.refresh(file)
+
+        submodel_ids = await self._get_submodel_ids(File, [file.id])
+        return self._prepare_payload(file, submodel_ids[file.id])
+
+    async def create_files(self, files: list[dict], upload_files: list[UploadFile]) -> list[FileSchema | HTTPException]:
+        """Bulk upload - the uploads are streamed to storage concurrently, the rows inserted with one statement.
+
+        Returns:
+            Per upload the created file, or the HTTPException it failed with (e.g. 413 too large).
+        """
+
+        semaphore = asyncio.Semaphore(FILE_BULK_CONCURRENCY)
+
+        async def receive_file(upload_file: UploadFile):
+            async with semaphore:
+                return await self.file_storage_service.receive_file(upload_file)
+
+        # Failed uploads clean up after themselves - only HTTPExceptions are reported per file
+        received = await asyncio.gather(*[receive_file(upload_file) for upload_file in upload_files], return_exceptions=True)
+        stored = [(file, result) for file, result in zip(files, received) if not isinstance(result, BaseException)]
+
+        try:
+            for result in received:
+                if isinstance(result, BaseException) and not isinstance(result, HTTPException):
+                    raise result
+
+            for file, (_, size, sha256) in stored:
+                file["size"] = size
+                file["sha256"] = sha256
+                file["uid"] = sha256 if FILE_STORAGE_MODE == STORAGE_MODE_SHA256 else self.file_storage_service.generate_uid()
+
+            if FILE_STORAGE_MODE == STORAGE_MODE_SHA256 and stored:
+                # Reference first - the row locks keep the blobs from being removed while they are placed
+                await self.add_blob_references([(file["sha256"], file["size"]) for file, _ in stored])
+
+            await asyncio.gather(*[
+                self.file_storage_service.place_file(partial_path, file["uid"]) for file, (partial_path, _, _) in stored
+            ])
+
+        except BaseException:
+            for _, (partial_path, _, _) in stored:
+                await self.file_storage_service.discard_file(partial_path)
+            raise
+
+        models = []
+        if stored:
+            # One INSERT ... VALUES (...), (...) RETURNING statement, rows in the order of the parameters
+            models = (await self.session.scalars(
+                insert(File).returning(File, sort_by_parameter_order=True), [file for file, _ in stored]
+            )).all()
+
+        created = iter(models)
+        results = []
+        for result in received:
+            if isinstance(result, HTTPException):
+                results.append(result)
+                continue
+
+            model = next(created)
+            self._pregenerate_derivatives(model)
+            # New files are in no tree image yet
+            results.append(self._prepare_payload(model, {"tree_images": []}))
+
+        return results
+
+    async def _store_content(self, file: File, upload_file: UploadFile) -> None:
+        # Sets uid, size and sha256 of the file
+        partial_path, file.size, file.sha256 = await self.file_storage_service.receive_file(upload_file)
+
+        try:
+            if FILE_STORAGE_MODE == STORAGE_MODE_SHA256:
+                file.uid = file.sha256
+                # Reference first - the row lock keeps the blob from being removed while it is placed
+                await self.add_blob_reference(file.sha256, file.size)
+            else:
+                file.uid = self.file_storage_service.generate_uid()
+
+            await self.file_storage_service.place_file(partial_path, file.uid)
+
+        except BaseException:
+            await self.file_storage_service.discard_file(partial_path)
+            raise
+
+    def _pregenerate_derivatives(self, file: File) -> None:
+        # Thumbnails of the new file, rendered once the transaction commits (nothing for a rolled back upload)
+        source_path = self.file_storage_service.get_file_path(file.uid)
+        content_tag = file.sha256 or file.uid
+        mime = file.mime
+
+        def pregenerate(session) -> None:
+            derivative_cache.pregenerate(source_path, content_tag, mime)
+
+        event.listen(self.session.sync_session, "after_commit", pregenerate, once=True)
+
+    async def add_blob_reference(self, sha256: str, size: int) -> None:
+        await self.add_blob_references([(sha256, size)])
+
+    async def add_blob_references(self, blobs: list[tuple[str, int]]) -> None:
+        # (sha256, size) per reference - one statement, concurrent uploads of the same content all count
+        ref_counts = Counter(sha256 for sha256, _ in blobs)
+        sizes = dict(blobs)
+
+        # One row per blob (ON CONFLICT cannot update a row twice), in sha256 order against deadlocks
+        statement = insert(FileBlob).values([
+            {"sha256": sha256, "size": sizes[sha256], "ref_count": ref_counts[sha256]}
+            for sha256 in sorted(ref_counts)
+        ])
+        await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[FileBlob.sha256],
+                set_={"ref_count": FileBlob.ref_count + statement.excluded.ref_count},
+            )
+        )
+
+    async def remove_blob_reference(self, uid: str) -> None:
+        # uuid-named blobs have no FileBlob row, nothing to count
+        await self.session.execute(
+            update(FileBlob)
+            .where(FileBlob.sha256 == uid)
+            .values(ref_count=FileBlob.ref_count - 1)
+        )
+
+    async def update_file(self, file_id: int, file: UpdateFileSchema) -> FileSchema:
+        model = await self.session.scalar(select(File).where(File.id == file_id))
 
         if not model:
             raise HTTPException(404, f"{file_id=} not found")
 
-        self.session.delete(model)
+        # Get only the fields that were provided in the request body
+        update_data = file.model_dump(exclude_unset=True)
+
+        # Iterate over the provided fields and update the model
+        for key, value in update_data.items():
+            setattr(model, key, value)
+
+        self.session.add(model)
+        await self.session.flush()
+        await self.session.refresh(model)
+
+        submodel_ids = await self._get_submodel_ids(File, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
+
+    async def delete_file(self, file_id: int) -> FileSchema:
+        """Delete the row of a file, its content is reclaimed by the file sweeper.
+
+        Only the request transaction changes - a rolled back deletion leaves the content in place:
+        - content-addressed blobs are released (ref_count), removed by the sweeper at ref_count 0
+        - uid-named content is an orphan once the deletion commits, removed by the sweeper's storage scan
+        """
+        model = await self.session.scalar(select(File).where(File.id == file_id))
 
-        return self._prepare_payload(model)
+        if not model:
+            raise HTTPException(404, f"{file_id=} not found")
+
+        submodel_ids = await self._get_submodel_ids(File, [model.id])
+        payload = self._prepare_payload(model, submodel_ids[model.id])
+
+        try:
+            await self.session.delete(model)
+            await self.session.flush()
+        except sqlalchemy.exc.IntegrityError as e:
+            raise HTTPException(409, f"Database integrity error file with {file_id=} is still used (tree images): {e.orig}")
+
+        # The blob stays in the storage while other files reference it
+        await self.remove_blob_reference(model.uid)
+
+        return payload
+
+    async def reclaim_blobs(self, sha256s: list[str] | None = None, limit: int | None = None) -> tuple[int, int]:
+        """Remove unreferenced content-addressed blobs (ref_count 0) from the storage and the table.
+
+        The rows stay locked until the caller commits - a concurrent upload of the same content
+        waits for the commit and then stores the blob again. Rows locked by another transaction
+        are skipped.
+
+        Returns:
+            (blobs removed, bytes freed)
+        """
+        query = (
+            select(FileBlob.sha256)
+            .where(FileBlob.ref_count <= 0)
+            .order_by(FileBlob.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if sha256s is not None:
+            query = query.where(FileBlob.sha256.in_(sha256s))
+
+        unreferenced = (await self.session.scalars(query)).all()
+        if not unreferenced:
+            return 0, 0
+
+        # A count gone wrong must not lose content - blobs still referenced are counted again instead
+        referenced = set((await self.session.scalars(
+            select(File.uid).where(File.uid.in_(unreferenced)).distinct()
+        )).all())
+        if referenced:
+            print(f"Reference count of {len(referenced)} file blobs was wrong, counted again")
+            await self.session.execute(
+                update(FileBlob)
+                .where(FileBlob.sha256.in_(referenced))
+                .values(ref_count=select(func.count(File.id)).where(File.uid == FileBlob.sha256).scalar_subquery())
+            )
+
+        reclaimed = [sha256 for sha256 in unreferenced if sha256 not in referenced]
+        freed = 0
+        for sha256 in reclaimed:
+            freed += await self.file_storage_service.delete_file(sha256)
+            freed += await derivative_cache.remove(sha256)
+
+        await self.session.execute(delete(FileBlob).where(FileBlob.sha256.in_(reclaimed)))
+        return len(reclaimed), freed
 
 
 class FileStorageService:
+    """Files on disk in FILE_STORAGE_DIRECTORY, named by their uid.
+
+    - FILE_STORAGE_MODE "sha256": uid is the sha256 of the content, equal uploads share one blob (FileBlob counts the references)
+    - FILE_STORAGE_MODE "uuid": uid is a fresh uuid4 per upload
+    - sharded by the first characters of the uid, ab/cd/abcd... - no directory holds more than a few files,
+      files in the flat layout of older versions are read until app.backend.file_storage_shard moves them
+    """
 
     def __init__(self):
 
         self.storage_dir = pathlib.Path(os.getenv("FILE_STORAGE_DIRECTORY"))
 
     @staticmethod
-    def _generate_uid() -> str:
+    def generate_uid() -> str:
         return str(uuid.uuid4())
 
-    def store_file(self, content: bytes) -> str:
-        uid = self._generate_uid()
+    async def receive_file(self, upload_file: UploadFile) -> tuple[pathlib.Path, int, str]:
+        """Stream an upload to a temporary file in chunks.
+
+        Memory use is one chunk per upload no matter the file size. A failed or too
+        large upload leaves nothing behind, a received file is moved to its uid by place_file.
+
+        The multipart parser has spooled the upload before the endpoint runs (to disk beyond 1 MB) -
+        the request body as a whole is bounded before parsing by RequestSizeLimitMiddleware,
+        FILE_MAX_UPLOAD_SIZE is checked here per file of the request.
+
+        Returns:
+            (path of the temporary file, size in bytes, sha256 hex digest)
+        """
+
+        # Size known from the multipart parser - reject before writing anything
+        if upload_file.size is not None and upload_file.size > FILE_MAX_UPLOAD_SIZE:
+            raise self._too_large(upload_file)
 
-        with open(self.storage_dir / uid, '+wb') as file:
-            file.write(content)
+        partial_path = self.storage_dir / f"{self.generate_uid()}.part"
 
-        return uid
+        size = 0
+        checksum = hashlib.sha256()
 
-    def get_file(self, uid: str) -> bytes:
+        try:
+            async with aiofiles.open(partial_path, "wb") as file:
+                while chunk := await upload_file.read(FILE_UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > FILE_MAX_UPLOAD_SIZE:
+                        raise self._too_large(upload_file)
 
-        with open(self.storage_dir / uid, 'rb') as file:
-            content = file.read()
+                    checksum.update(chunk)
+                    await file.write(chunk)
 
-        return content
+        except BaseException:
+            # Also on cancellation (client disconnected)
+            await self.discard_file(partial_path)
+            raise
 
-    def delete_file(self, uid: str) -> None:
-        raise NotImplemented()
+        return partial_path, size, checksum.hexdigest()
+
+    async def place_file(self, partial_path: pathlib.Path, uid: str) -> None:
+        path = self.get_file_path(uid)
+
+        # Content-addressed blob already stored - the upload is a duplicate
+        if await aiofiles.os.path.isfile(path):
+            await self.discard_file(partial_path)
+            return
+
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+        # Atomic - readers see the whole file or none
+        await aiofiles.os.replace(partial_path, path)
+
+    @staticmethod
+    async def discard_file(partial_path: pathlib.Path) -> None:
+        try:
+            await aiofiles.os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _too_large(upload_file: UploadFile) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File {upload_file.filename} is larger than {FILE_MAX_UPLOAD_SIZE} bytes"
+        )
+
+    def get_file_path(self, uid: str) -> pathlib.Path:
+        # Sharded layout - where files are written
+        return self.storage_dir / uid[0:2] / uid[2:4] / uid
+
+    def get_legacy_file_path(self, uid: str) -> pathlib.Path:
+        # Flat layout of older versions
+        return self.storage_dir / uid
+
+    async def find_file_path(self, uid: str) -> pathlib.Path | None:
+        sharded_path = self.get_file_path(uid)
+        if await aiofiles.os.path.isfile(sharded_path):
+            return sharded_path
+
+        legacy_path = self.get_legacy_file_path(uid)
+        if await aiofiles.os.path.isfile(legacy_path):
+            return legacy_path
+
+        # Moved by the shard migration in between - it links the sharded path before removing the flat one
+        if await aiofiles.os.path.isfile(sharded_path):
+            return sharded_path
+
+        return None
+
+    async def delete_file(self, uid: str) -> int:
+        """Remove the content stored under a uid, in the sharded and the flat layout.
+
+        Returns:
+            Bytes freed (names of the same file - hard links of the migrations - counted once)
+        """
+        freed = {}
+
+        for path in (self.get_file_path(uid), self.get_legacy_file_path(uid)):
+            try:
+                stat_result = await aiofiles.os.stat(path)
+                await aiofiles.os.remove(path)
+            except FileNotFoundError:
+                continue
+            freed[(stat_result.st_dev, stat_result.st_ino)] = stat_result.st_size
+
+        return sum(freed.values())
@@ -1,10 +1,17 @@
+import posixpath
+from typing import AsyncIterator
+
 from sqlalchemy import select
 from fastapi import HTTPException
 
+from app.backend.zip_stream import ZipMember, stream_zip
 from app.schemas import CreateFileBatchSchema, UpdateFileBatchSchema
-from app.models.orchard import FileBatch
+from app.models.orchard import File, FileBatch
 from app.schemas import FileBatchSchema
 from .base_service import BaseService, BaseDataManager
+from .file import FileStorageService
+
+from app.schemas.pagination import PaginationParams
 
 """
 get_file_batch, create_file_batch, update_file_batch, delete_file_batch
@@ -13,52 +20,105 @@ get_file_batch, create_file_batch, update_file_batch, delete_file_batch
 
 class FileBatchService(BaseService):
 
-    def get_file_batch_mastertable(self):
-        return FileBatchDataManager(self.session).get_file_batch_mastertable()
+    async def get_file_batch_mastertable(self, pagination: PaginationParams | None = None):
+        return await FileBatchDataManager(self.session).get_file_batch_mastertable(pagination)
 
-    def get_file_batch(self, file_batch_id: int):
-        return FileBatchDataManager(self.session).get_file_batch(file_batch_id)
+    async def get_file_batch(self, file_batch_id: int):
+        return await FileBatchDataManager(self.session).get_file_batch(file_batch_id)
 
-    def create_file_batch(self, file_batch: CreateFileBatchSchema):
+    async def create_file_batch(self, file_batch: CreateFileBatchSchema):
         file_batch_model = FileBatch(**file_batch.model_dump())
-        return FileBatchDataManager(self.session).create_file_batch(file_batch_model)
+        return await FileBatchDataManager(self.session).create_file_batch(file_batch_model)
+
+    async def update_file_batch(self, file_batch_id: int, file_batch: UpdateFileBatchSchema):
+        return await FileBatchDataManager(self.session).update_file_batch(file_batch_id, file_batch)
+
+    async def delete_file_batch(self, file_batch_id: int):
+        return await FileBatchDataManager(self.session).delete_file_batch(file_batch_id)
 
-    def update_file_batch(self, file_batch_id: int, file_batch: UpdateFileBatchSchema):
-        return FileBatchDataManager(self.session).update_file_batch(file_batch_id, file_batch)
+    async def get_file_batch_archive(self, file_batch_id: int) -> AsyncIterator[bytes]:
+        # The rows are read now, the files while the archive is sent (after the session is closed)
+        files = await FileBatchDataManager(self.session).get_file_batch_files(file_batch_id)
+        return stream_zip(self._archive_members(files))
 
-    def delete_file_batch(self, file_batch_id: int):
-        return FileBatchDataManager(self.session).delete_file_batch(file_batch_id)
+    @staticmethod
+    async def _archive_members(files) -> AsyncIterator[ZipMember]:
+        file_storage_service = FileStorageService()
+        used_names = set()
+
+        for file in files:
+            path = await file_storage_service.find_file_path(file.uid)
+            if path is None:
+                print(f"File {file.id} ({file.uid}) not found in the storage, left out of the archive")
+                continue
+
+            yield ZipMember(
+                name=FileBatchService._archive_name(file.name, used_names),
+                path=str(path),
+                modified=file.datetime,
+                compress=not file.mime.startswith("image/"),
+            )
+
+    @staticmethod
+    def _archive_name(name: str, used_names: set[str]) -> str:
+        # No directories (nor ../) from the uploaded names, "photo (2).jpg" for a second "photo.jpg"
+        name = posixpath.basename(name.replace("\\", "/")) or "file"
+        stem, extension = posixpath.splitext(name)
+
+        archive_name, number = name, 1
+        while archive_name in used_names:
+            number += 1
+            archive_name = f"{stem} ({number}){extension}"
+
+        used_names.add(archive_name)
+        return archive_name
 
 
 class FileBatchDataManager(BaseDataManager):
 
     @staticmethod
-    def _prepare_payload(model):
-        return FileBatchSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return FileBatchSchema.model_validate({**model.__dict__, **submodel_ids})
+
+    async def get_file_batch_mastertable(self, pagination: PaginationParams | None = None) -> list[FileBatchSchema]:
+        query = self._paginate(select(FileBatch), FileBatch.id, pagination)
+        model_list = (await self.session.scalars(query)).all()
 
-    def get_file_batch_mastertable(self) -> list[FileBatchSchema]:
-        model_list = self.session.scalars(select(FileBatch)).all()
+        submodel_ids = await self._get_submodel_ids(FileBatch, query.with_only_columns(FileBatch.id))
 
-        return [self._prepare_payload(model) for model in model_list]
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
 
-    def get_file_batch(self, file_batch_id: int) -> FileBatchSchema:
-        model = self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
+    async def get_file_batch(self, file_batch_id: int) -> FileBatchSchema:
+        model = await self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
 
         if not model:
             raise HTTPException(404, f"{file_batch_id=} not found")
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(FileBatch, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
+
+    async def get_file_batch_files(self, file_batch_id: int):
+        # Only the columns of the archive, in upload order
+        if not await self.session.scalar(select(FileBatch.id).where(FileBatch.id == file_batch_id)):
+            raise HTTPException(404, f"{file_batch_id=} not found")
+
+        return (await self.session.execute(
+            select(File.id, File.name, File.uid, File.datetime, File.mime)
+            .where(File.file_batch_id == file_batch_id)
+            .order_by(File.id)
+        )).all()
 
-    def create_file_batch(self, file_batch: FileBatch) -> FileBatchSchema:
+    async def create_file_batch(self, file_batch: FileBatch) -> FileBatchSchema:
 
         self.session.add(file_batch)
-        self.session.flush()
-        self.session.refresh(file_batch)
+        await self.session.flush()
+        await self.session.refresh(file_batch)
 
-        return self._prepare_payload(file_batch)
+        submodel_ids = await self._get_submodel_ids(FileBatch, [file_batch.id])
+        return self._prepare_payload(file_batch, submodel_ids[file_batch.id])
 
-    def update_file_batch(self, file_batch_id: int, file_batch: UpdateFileBatchSchema) -> FileBatchSchema:
-        model = self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
+    async def update_file_batch(self, file_batch_id: int, file_batch: UpdateFileBatchSchema) -> FileBatchSchema:
+        model = await self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
 
         if not model:
             raise HTTPException(404, f"{file_batch_id=} not found")
@@ -71,17 +131,19 @@ class FileBatchDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(FileBatch, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def delete_file_batch(self, file_batch_id: int) -> FileBatchSchema:
-        model = self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
+    async def delete_file_batch(self, file_batch_id: int) -> FileBatchSchema:
+        model = await self.session.scalar(select(FileBatch).where(FileBatch.id == file_batch_id))
 
         if not model:
             raise HTTPException(404, f"{file_batch_id=} not found")
 
-        self.session.delete(model)
+        await self.session.delete(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(FileBatch, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
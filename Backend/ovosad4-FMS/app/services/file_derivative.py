@@ -0,0 +1,188 @@
+import asyncio
+import multiprocessing
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import aiofiles.os
+
+from app.backend.image_render import IMAGE_FORMATS, render_derivative
+
+# Config - From docker environment variables
+FILE_DERIVATIVE_DIRECTORY = pathlib.Path(
+    os.getenv("FILE_DERIVATIVE_DIRECTORY") or os.path.join(os.getenv("FILE_STORAGE_DIRECTORY", "."), "derivatives")
+)
+FILE_DERIVATIVE_CACHE_SIZE = int(os.getenv("FILE_DERIVATIVE_CACHE_SIZE", str(1024 * 1024 * 1024))) # Bytes on disk, least recently used are evicted
+FILE_DERIVATIVE_WORKERS = int(os.getenv("FILE_DERIVATIVE_WORKERS", "2")) # Processes resizing images
+FILE_DERIVATIVE_WIDTHS = tuple(int(width) for width in os.getenv("FILE_DERIVATIVE_WIDTHS", "128,256,512,1024").split(","))
+FILE_DERIVATIVE_PREGENERATE = tuple(int(width) for width in os.getenv("FILE_DERIVATIVE_PREGENERATE", "256").split(",") if width) # Widths rendered on upload
+
+# Formats rendered on upload
+PREGENERATE_FORMAT = "webp"
+
+# Evict down to this share of the cache size - not on every new derivative
+EVICT_TO = 0.9
+
+# Seconds after which a partial rendering is abandoned (its worker died) and removed by the eviction
+PARTIAL_MAX_AGE = 3600
+
+
+class DerivativeCache:
+    """Resized variants of stored images, rendered in a process pool and kept in a size-bounded disk cache.
+
+    - keyed by the content tag of the original (sha256 or uid), the width and the format
+    - least recently used are evicted - the modification time is the last use, so every worker
+      process sharing the directory takes part in the same LRU order
+    - concurrent requests for the same missing variant wait for one rendering
+    """
+
+    def __init__(self, directory: pathlib.Path, max_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        # Bytes in the directory - unknown until the first scan, derivatives of other processes
+        # are only counted by the next scan
+        self.size: int | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._rendering: dict[str, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+
+    def get_path(self, content_tag: str, width: int, image_format: str) -> pathlib.Path:
+        # Sharded like the file storage
+        return self.directory / content_tag[0:2] / content_tag[2:4] / f"{content_tag}-w{width}.{image_format}"
+
+    async def get(self, source_path: pathlib.Path, content_tag: str, width: int, image_format: str) -> pathlib.Path:
+        path = self.get_path(content_tag, width, image_format)
+
+        if await aiofiles.os.path.isfile(path):
+            # Mark as used
+            try:
+                await asyncio.to_thread(os.utime, path)
+                return path
+            except FileNotFoundError:
+                # Evicted in between - rendered again
+                pass
+
+        key = str(path)
+        future = self._rendering.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._render(source_path, path, width, image_format))
+            self._rendering[key] = future
+            future.add_done_callback(lambda _: self._rendering.pop(key, None))
+
+        # shield - a cancelled request must not cancel the rendering other requests wait for
+        await asyncio.shield(future)
+        return path
+
+    def pregenerate(self, source_path: pathlib.Path, content_tag: str, mime: str) -> None:
+        # Standard sizes of a new upload, rendered in the background
+        if not mime.startswith("image/"):
+            return
+
+        for width in FILE_DERIVATIVE_PREGENERATE:
+            task = asyncio.create_task(self.get(source_path, content_tag, width, PREGENERATE_FORMAT))
+            self._background.add(task)
+            task.add_done_callback(self._pregenerated)
+
+    def _pregenerated(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error pre-generating image derivative: {task.exception()}")
+
+    async def _render(self, source_path: pathlib.Path, path: pathlib.Path, width: int, image_format: str) -> None:
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            size = await loop.run_in_executor(pool, render_derivative, str(source_path), str(path), width, image_format)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge image) - the next rendering starts a new pool
+            if self._pool is pool:
+                self._pool = None
+            raise
+
+        if self.size is None or self.size + size > self.max_size:
+            self.size = await asyncio.to_thread(self._evict)
+        else:
+            self.size += size
+
+    async def remove(self, content_tag: str) -> int:
+        # Every variant of a removed original - returns the bytes freed
+        return await asyncio.to_thread(self._remove, content_tag)
+
+    def _remove(self, content_tag: str) -> int:
+        freed = 0
+        for width in FILE_DERIVATIVE_WIDTHS:
+            for image_format in IMAGE_FORMATS:
+                path = self.get_path(content_tag, width, image_format)
+                try:
+                    size = os.stat(path).st_size
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                freed += size
+
+        if self.size is not None:
+            self.size = max(self.size - freed, 0)
+        return freed
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn - a fork of the event loop process would copy its threads and connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=FILE_DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _evict(self) -> int:
+        # Removes the least recently used derivatives until the cache is below EVICT_TO of its size
+        # - returns the bytes left in the directory
+        entries = []
+        abandoned_before = time.time() - PARTIAL_MAX_AGE
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+                # Renderings in progress are left alone, abandoned ones are removed
+                if name.endswith(".part"):
+                    if stat_result.st_mtime < abandoned_before:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                    continue
+
+                entries.append((stat_result.st_mtime, stat_result.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size <= self.max_size:
+            return size
+
+        entries.sort()
+        for _, entry_size, path in entries:
+            if size <= self.max_size * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+        return size
+
+    async def aclose(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, cancel_futures=True)
+            self._pool = None
+
+
+# Initialize the cache as a global instance
+derivative_cache = DerivativeCache(FILE_DERIVATIVE_DIRECTORY, FILE_DERIVATIVE_CACHE_SIZE)
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import re
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.backend.session import open_session
+from app.models.file_blob import FileBlob
+from app.models.orchard import File
+from .file import FileDataManager, FileStorageService
+
+# Config - From docker environment variables
+FILE_SWEEP_INTERVAL = float(os.getenv("FILE_SWEEP_INTERVAL", "300")) # Seconds between sweeps
+FILE_SWEEP_BATCH_SIZE = int(os.getenv("FILE_SWEEP_BATCH_SIZE", "500")) # Blobs, files or rows per transaction
+FILE_SWEEP_GRACE = float(os.getenv("FILE_SWEEP_GRACE", "3600")) # Seconds before a file on disk without a row counts as orphaned
+
+# Names the storage writes - anything else in the directory is left alone
+SHA256_NAME = re.compile(r"[0-9a-f]{64}")
+UUID_NAME = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+PARTIAL_SUFFIX = ".part"
+
+# Top-level shard directories (ab/), then the storage directory itself (flat layout, uploads in progress)
+STORAGE_PREFIXES = [f"{i:02x}" for i in range(256)] + [""]
+
+
+class FileSweeper:
+    """Background task which reclaims storage space no File row uses any more.
+
+    Every sweep does a bounded amount of work, nothing scans the whole storage or table at once:
+    - blobs with ref_count 0 (found by the partial index) are removed, locked like FileDataManager.reclaim_blobs
+    - one shard directory (ab/) is listed for files without a row - the whole storage once per 257 sweeps
+    - one batch of File rows is checked for missing content - rows are only reported, never deleted
+      (a storage volume which is not mounted must not empty the table)
+
+    Files younger than FILE_SWEEP_GRACE are never orphans - an upload places its file before its row commits.
+    Several worker processes can sweep at once, blob rows are locked with FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(self):
+        # Created by the first sweep - FILE_STORAGE_DIRECTORY is not needed to import the app
+        self.file_storage_service: FileStorageService | None = None
+        self._task: asyncio.Task | None = None
+
+        # Position of the incremental scans
+        self._prefix_index = 0
+        self._after_file_id = 0
+
+        # Cumulative since the worker started
+        self.sweeps = 0
+        self.totals = self._counters()
+
+    @staticmethod
+    def _counters() -> dict:
+        return {"blobs": 0, "orphans": 0, "missing": 0, "reclaimed_bytes": 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Error sweeping the file storage: {e}")
+
+            await asyncio.sleep(FILE_SWEEP_INTERVAL)
+
+    async def sweep(self) -> dict:
+        """One sweep - unreferenced blobs, the next shard directory, the next batch of rows.
+
+        Returns:
+            Counters of the sweep: blobs and orphaned files removed, rows with missing content, bytes reclaimed.
+        """
+        counters = self._counters()
+        if self.file_storage_service is None:
+            self.file_storage_service = FileStorageService()
+
+        # Orphans of the listed directory are reclaimed right after, in the same sweep
+        await self.sweep_orphans(counters)
+        await self.reclaim_blobs(counters)
+        await self.check_files(counters)
+
+        self.sweeps += 1
+        for key, value in counters.items():
+            self.totals[key] += value
+
+        if any(counters.values()):
+            print(
+                f"File storage sweep: {counters['blobs']} blobs and {counters['orphans']} orphaned files removed, "
+                f"{counters['missing']} files with missing content, "
+                f"{counters['reclaimed_bytes'] / 1024 / 1024:.1f} MiB reclaimed"
+            )
+        return counters
+
+    async def reclaim_blobs(self, counters: dict) -> None:
+        # Batches until no unreferenced blob is left (or the rest is locked by other transactions)
+        while True:
+            async with open_session() as session:
+                blobs, freed = await FileDataManager(session).reclaim_blobs(limit=FILE_SWEEP_BATCH_SIZE)
+
+            counters["blobs"] += blobs
+            counters["reclaimed_bytes"] += freed
+            if blobs < FILE_SWEEP_BATCH_SIZE:
+                break
+
+    async def sweep_orphans(self, counters: dict) -> None:
+        # Files of the next shard directory that no File row (or FileBlob row) knows
+        prefix = STORAGE_PREFIXES[self._prefix_index]
+        self._prefix_index = (self._prefix_index + 1) % len(STORAGE_PREFIXES)
+
+        partial_paths, candidates = await asyncio.to_thread(self._list_prefix, prefix)
+
+        # Uploads which never finished (the process died while receiving)
+        for path, size in partial_paths:
+            await self.file_storage_service.discard_file(path)
+            counters["orphans"] += 1
+            counters["reclaimed_bytes"] += size
+
+        for start in range(0, len(candidates), FILE_SWEEP_BATCH_SIZE):
+            batch = dict(candidates[start:start + FILE_SWEEP_BATCH_SIZE])
+
+            async with open_session() as session:
+                known = set((await session.scalars(select(File.uid).where(File.uid.in_(batch)).distinct())).all())
+                known.update((await session.scalars(select(FileBlob.sha256).where(FileBlob.sha256.in_(batch)))).all())
+
+                orphaned_blobs = [
+                    {"sha256": uid, "size": size, "ref_count": 0}
+                    for uid, size in batch.items() if uid not in known and SHA256_NAME.fullmatch(uid)
+                ]
+                # Content-addressed - an upload of the same content may use the file any moment,
+                # removed through the locked path of reclaim_blobs instead of here
+                if orphaned_blobs:
+                    await session.execute(insert(FileBlob).values(orphaned_blobs).on_conflict_do_nothing())
+
+            for uid, _ in candidates[start:start + FILE_SWEEP_BATCH_SIZE]:
+                # uid-named content is never reused - removed right away
+                if uid not in known and UUID_NAME.fullmatch(uid):
+                    counters["orphans"] += 1
+                    counters["reclaimed_bytes"] += await self.file_storage_service.delete_file(uid)
+
+    def _list_prefix(self, prefix: str) -> tuple[list, list]:
+        # ([(path, size) of stale partial uploads], [(uid, size) of stored files]) older than the grace period
+        directory = self.file_storage_service.storage_dir / prefix
+        if prefix:
+            directories = [entry.path for entry in self._scandir(directory) if entry.is_dir(follow_symlinks=False)]
+        else:
+            directories = [directory]
+
+        deadline = time.time() - FILE_SWEEP_GRACE
+        partial_paths, candidates = [], []
+
+        for shard_directory in directories:
+            for entry in self._scandir(shard_directory):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    stat_result = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if stat_result.st_mtime > deadline:
+                    continue
+
+                name = entry.name
+                if name.endswith(PARTIAL_SUFFIX) and UUID_NAME.fullmatch(name[:-len(PARTIAL_SUFFIX)]):
+                    partial_paths.append((entry.path, stat_result.st_size))
+                elif SHA256_NAME.fullmatch(name) or UUID_NAME.fullmatch(name):
+                    candidates.append((name, stat_result.st_size))
+
+        return partial_paths, candidates
+
+    @staticmethod
+    def _scandir(directory) -> list:
+        try:
+            with os.scandir(directory) as entries:
+                return list(entries)
+        except FileNotFoundError:
+            return []
+
+    async def check_files(self, counters: dict) -> None:
+        # The next batch of File rows - reported when their content is missing
+        async with open_session(read_only=True) as session:
+            files = (await session.execute(
+                select(File.id, File.uid)
+                .where(File.id > self._after_file_id)
+                .order_by(File.id)
+                .limit(FILE_SWEEP_BATCH_SIZE)
+            )).all()
+
+        # Start over with the first rows next time
+        self._after_file_id = files[-1].id if len(files) == FILE_SWEEP_BATCH_SIZE else 0
+
+        for file in files:
+            if not file.uid or await self.file_storage_service.find_file_path(file.uid) is None:
+                print(f"File {file.id}: content {file.uid} not found in the storage")
+                counters["missing"] += 1
+
+    def statistics(self) -> dict:
+        return {"sweeps": self.sweeps, **self.totals}
+
+
+# Initialize the sweeper as a global instance
+file_sweeper = FileSweeper()
@@ -12,37 +12,37 @@ get_flower_thinning, create_flower_thinning, update_flower_thinning, delete_flow
 
 class FlowerThinningService(BaseService):
 
-    def get_flower_thinning(self, flower_thinning_id: int):
-        return FlowerThinningDataManager(self.session).get_flower_thinning(flower_thinning_id)
+    async def get_flower_thinning(self, flower_thinning_id: int):
+        return await FlowerThinningDataManager(self.session).get_flower_thinning(flower_thinning_id)
 
-    def create_flower_thinning(self, flower_thinning: CreateFlowerThinningSchema):
+    async def create_flower_thinning(self, flower_thinning: CreateFlowerThinningSchema):
         flower_thinning_model = FlowerThinning(**flower_thinning.model_dump())
-        return FlowerThinningDataManager(self.session).create_flower_thinning(flower_thinning_model)
+        return await FlowerThinningDataManager(self.session).create_flower_thinning(flower_thinning_model)
 
-    def update_flower_thinning(self, flower_thinning_id: int, flower_thinning: UpdateFlowerThinningSchema):
-        return FlowerThinningDataManager(self.session).update_flower_thinning(flower_thinning_id, flower_thinning)
+    async def update_flower_thinning(self, flower_thinning_id: int, flower_thinning: UpdateFlowerThinningSchema):
+        return await FlowerThinningDataManager(self.session).update_flower_thinning(flower_thinning_id, flower_thinning)
 
 
-    def delete_flower_thinning(self, flower_thinning_id: int):
-        return FlowerThinningDataManager(self.session).delete_flower_thinning(flower_thinning_id)
+    async def delete_flower_thinning(self, flower_thinning_id: int):
+        return await FlowerThinningDataManager(self.session).delete_flower_thinning(flower_thinning_id)
 
 
 class FlowerThinningDataManager(BaseDataManager):
 
-    def get_flower_thinning(self, flower_thinning_id: int) -> FlowerThinningSchema:
-        model = self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
+    async def get_flower_thinning(self, flower_thinning_id: int) -> FlowerThinningSchema:
+        model = await self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
         if not model:
             raise HTTPException(404, f"{flower_thinning_id=} not found")
         return FlowerThinningSchema.model_validate(model)
 
-    def create_flower_thinning(self, flower_thinning: FlowerThinning) -> FlowerThinningSchema:
+    async def create_flower_thinning(self, flower_thinning: FlowerThinning) -> FlowerThinningSchema:
         self.session.add(flower_thinning)
-        self.session.flush()
-        self.session.refresh(flower_thinning)
+        await self.session.flush()
+        await self.session.refresh(flower_thinning)
         return FlowerThinningSchema.model_validate(flower_thinning)
 
-    def update_flower_thinning(self, flower_thinning_id: int, flower_thinning: UpdateFlowerThinningSchema) -> FlowerThinningSchema:
-        model = self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
+    async def update_flower_thinning(self, flower_thinning_id: int, flower_thinning: UpdateFlowerThinningSchema) -> FlowerThinningSchema:
+        model = await self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
 
         if not model:
             raise HTTPException(404, f"{flower_thinning_id=} not found")
@@ -58,14 +58,14 @@ class FlowerThinningDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
         return FlowerThinningSchema.model_validate(model)
 
-    def delete_flower_thinning(self, flower_thinning_id: int) -> FlowerThinningSchema:
-        model = self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
+    async def delete_flower_thinning(self, flower_thinning_id: int) -> FlowerThinningSchema:
+        model = await self.session.scalar(select(FlowerThinning).where(FlowerThinning.id == flower_thinning_id))
         if not model:
             raise HTTPException(404, f"{flower_thinning_id=} not found")
-        self.session.delete(model)
+        await self.session.delete(model)
         return FlowerThinningSchema.model_validate(model)
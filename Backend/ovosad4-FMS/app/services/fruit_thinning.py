@@ -12,36 +12,36 @@ get_fruit_thinning, create_fruit_thinning, update_fruit_thinning, delete_fruit_t
 
 class FruitThinningService(BaseService):
 
-    def get_fruit_thinning(self, fruit_thinning_id: int):
-        return FruitThinningDataManager(self.session).get_fruit_thinning(fruit_thinning_id)
+    async def get_fruit_thinning(self, fruit_thinning_id: int):
+        return await FruitThinningDataManager(self.session).get_fruit_thinning(fruit_thinning_id)
 
-    def create_fruit_thinning(self, fruit_thinning: CreateFruitThinningSchema):
+    async def create_fruit_thinning(self, fruit_thinning: CreateFruitThinningSchema):
         fruit_thinning_model = FruitThinning(**fruit_thinning.model_dump())
-        return FruitThinningDataManager(self.session).create_fruit_thinning(fruit_thinning_model)
+        return await FruitThinningDataManager(self.session).create_fruit_thinning(fruit_thinning_model)
 
-    def update_fruit_thinning(self, fruit_thinning_id: int, fruit_thinning: UpdateFruitThinningSchema):
-        return FruitThinningDataManager(self.session).update_fruit_thinning(fruit_thinning_id, fruit_thinning)
+    async def update_fruit_thinning(self, fruit_thinning_id: int, fruit_thinning: UpdateFruitThinningSchema):
+        return await FruitThinningDataManager(self.session).update_fruit_thinning(fruit_thinning_id, fruit_thinning)
 
-    def delete_fruit_thinning(self, fruit_thinning_id: int):
-        return FruitThinningDataManager(self.session).delete_fruit_thinning(fruit_thinning_id)
+    async def delete_fruit_thinning(self, fruit_thinning_id: int):
+        return await FruitThinningDataManager(self.session).delete_fruit_thinning(fruit_thinning_id)
 
 
 class FruitThinningDataManager(BaseDataManager):
 
-    def get_fruit_thinning(self, fruit_thinning_id: int) -> FruitThinningSchema:
-        model = self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
+    async def get_fruit_thinning(self, fruit_thinning_id: int) -> FruitThinningSchema:
+        model = await self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
         if not model:
             raise HTTPException(404, f"{fruit_thinning_id=} not found")
         return FruitThinningSchema.model_validate(model)
 
-    def create_fruit_thinning(self, fruit_thinning: FruitThinning) -> FruitThinningSchema:
+    async def create_fruit_thinning(self, fruit_thinning: FruitThinning) -> FruitThinningSchema:
         self.session.add(fruit_thinning)
-        self.session.flush()
-        self.session.refresh(fruit_thinning)
+        await self.session.flush()
+        await self.session.refresh(fruit_thinning)
         return FruitThinningSchema.model_validate(fruit_thinning)
     
-    def update_fruit_thinning(self, fruit_thinning_id: int, fruit_thinning: UpdateFruitThinningSchema) -> FruitThinningSchema:
-        model = self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
+    async def update_fruit_thinning(self, fruit_thinning_id: int, fruit_thinning: UpdateFruitThinningSchema) -> FruitThinningSchema:
+        model = await self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
 
         if not model:
             raise HTTPException(404, f"{fruit_thinning_id=} not found")
@@ -57,14 +57,14 @@ class FruitThinningDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
         return FruitThinningSchema.model_validate(model)
 
-    def delete_fruit_thinning(self, fruit_thinning_id: int) -> FruitThinningSchema:
-        model = self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
+    async def delete_fruit_thinning(self, fruit_thinning_id: int) -> FruitThinningSchema:
+        model = await self.session.scalar(select(FruitThinning).where(FruitThinning.id == fruit_thinning_id))
         if not model:
             raise HTTPException(404, f"{fruit_thinning_id=} not found")
-        self.session.delete(model)
+        await self.session.delete(model)
         return FruitThinningSchema.model_validate(model)
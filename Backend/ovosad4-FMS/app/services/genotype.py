@@ -8,20 +8,21 @@ from .base_service import BaseService, BaseDataManager
 
 class GenotypeService(BaseService):
 
-    def get_genotype(self, genotype_id: int):
-        return GenotypeDataManager(self.session).get_genotype(genotype_id)
+    async def get_genotype(self, genotype_id: int):
+        return await GenotypeDataManager(self.session).get_genotype(genotype_id)
 
 
 class GenotypeDataManager(BaseDataManager):
 
     @staticmethod
-    def _prepare_payload(model):
-        return GenotypeSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return GenotypeSchema.model_validate({**model.__dict__, **submodel_ids})
 
-    def get_genotype(self, genotype_id: int) -> GenotypeSchema:
-        model = self.session.scalar(select(Genotype).where(Genotype.id == genotype_id))
+    async def get_genotype(self, genotype_id: int) -> GenotypeSchema:
+        model = await self.session.scalar(select(Genotype).where(Genotype.id == genotype_id))
 
         if not model:
             raise HTTPException(404, f"{genotype_id=} not found")
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Genotype, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
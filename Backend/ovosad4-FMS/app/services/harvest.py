@@ -8,36 +8,45 @@ from .base_service import BaseService, BaseDataManager
 
 class HarvestService(BaseService):
 
-    def get_harvest(self, harvest_id: int):
-        return HarvestDataManager(self.session).get_harvest(harvest_id)
+    async def get_harvest(self, harvest_id: int, fields: list[str] | None = None):
+        return await HarvestDataManager(self.session).get_harvest(harvest_id, fields)
 
-    def create_harvest(self, harvest: CreateHarvestSchema):
+    async def create_harvest(self, harvest: CreateHarvestSchema):
         harvest_model = Harvest(**harvest.model_dump())
-        return HarvestDataManager(self.session).create_harvest(harvest_model)
+        return await HarvestDataManager(self.session).create_harvest(harvest_model)
     
-    def update_harvest(self, harvest_id: int, harvest: UpdateHarvestSchema) -> HarvestSchema:
-        return HarvestDataManager(self.session).update_harvest(harvest_id, harvest)
+    async def update_harvest(self, harvest_id: int, harvest: UpdateHarvestSchema) -> HarvestSchema:
+        return await HarvestDataManager(self.session).update_harvest(harvest_id, harvest)
 
-    def delete_harvest(self, harvest_id: int):
-        return HarvestDataManager(self.session).delete_harvest(harvest_id)
+    async def delete_harvest(self, harvest_id: int):
+        return await HarvestDataManager(self.session).delete_harvest(harvest_id)
 
 
 class HarvestDataManager(BaseDataManager):
 
-    def get_harvest(self, harvest_id: int) -> HarvestSchema:
-        model = self.session.scalar(select(Harvest).where(Harvest.id == harvest_id))
+    async def get_harvest(self, harvest_id: int, fields: list[str] | None = None) -> HarvestSchema | dict:
+        query = select(Harvest).where(Harvest.id == harvest_id)
+
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            items = await self._get_projected(Harvest, HarvestSchema, query, fields)
+            if not items:
+                raise HTTPException(404, f"{harvest_id=} not found")
+            return items[0]
+
+        model = await self.session.scalar(query)
         if not model:
             raise HTTPException(404, f"{harvest_id=} not found")
         return HarvestSchema.model_validate(model)
 
-    def create_harvest(self, harvest: Harvest) -> HarvestSchema:
+    async def create_harvest(self, harvest: Harvest) -> HarvestSchema:
         self.session.add(harvest)
-        self.session.flush()
-        self.session.refresh(harvest)
+        await self.session.flush()
+        await self.session.refresh(harvest)
         return HarvestSchema.model_validate(harvest)
 
-    def update_harvest(self, harvest_id: int, harvest: UpdateHarvestSchema) -> HarvestSchema:
-        model = self.session.scalar(select(Harvest).where(Harvest.id == harvest_id))
+    async def update_harvest(self, harvest_id: int, harvest: UpdateHarvestSchema) -> HarvestSchema:
+        model = await self.session.scalar(select(Harvest).where(Harvest.id == harvest_id))
         if not model:
             raise HTTPException(404, f"{harvest_id=} not found")
 
@@ -52,14 +61,14 @@ class HarvestDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
         return HarvestSchema.model_validate(model)
 
-    def delete_harvest(self, harvest_id: int) -> HarvestSchema:
-        model = self.session.scalar(select(Harvest).where(Harvest.id == harvest_id))
+    async def delete_harvest(self, harvest_id: int) -> HarvestSchema:
+        model = await self.session.scalar(select(Harvest).where(Harvest.id == harvest_id))
         if not model:
             raise HTTPException(404, f"{harvest_id=} not found")
-        self.session.delete(model)
+        await self.session.delete(model)
         return HarvestSchema.model_validate(model)
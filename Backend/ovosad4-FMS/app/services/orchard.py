@@ -1,13 +1,14 @@
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from fastapi import HTTPException, status
 
 from app.schemas import CreateOrchardSchema, UpdateOrchardSchema
 from app.models.orchard import Orchard
-from app.schemas import OrchardSchema
+from app.schemas import OrchardSchema, OrchardBulkResultSchema
 from .base_service import BaseService, BaseDataManager
 
 from app.schemas.user_permissions import UserOrchardPermissions
-from app.security.keycloak_admin_client import keycloak_admin_client
+from app.schemas.pagination import PaginationParams
+from app.security.keycloak_outbox import enqueue_orchard_roles, ROLE_CREATE, ROLE_DELETE
 
 """
 get_orchard, create_orchard, update_orchard, delete_orchard
@@ -23,76 +24,60 @@ Orchard-{orchard_id}-View and Orchard-{orchard_id}-Admin
 
 delete_orchard{orchard_id} - also deletes the roles associated with the orchard
 Orchard-{orchard_id}-View and Orchard-{orchard_id}-Admin
+
+Roles are written to the keycloak_role_outbox table in the same transaction,
+the KeycloakOutboxDispatcher applies them once the transaction commits
+
+create_orchards - bulk create, one INSERT for all orchards
+- the roles of all orchards go to the outbox like in create_orchard, the response reports them as pending
 """
 class OrchardService(BaseService):
 
-    def get_orchard_mastertable(self, permissions: UserOrchardPermissions) -> list[OrchardSchema]:
-        return OrchardDataManager(self.session).get_orchard_mastertable(permissions)
+    async def get_orchard_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None) -> list[OrchardSchema]:
+        return await OrchardDataManager(self.session).get_orchard_mastertable(permissions, pagination)
 
-    def get_orchard(self, orchard_id: int):
-        return OrchardDataManager(self.session).get_orchard(orchard_id)
+    async def get_orchard(self, orchard_id: int):
+        return await OrchardDataManager(self.session).get_orchard(orchard_id)
     
     async def create_orchard(self, orchard: CreateOrchardSchema):
         # Create the orchard in the database first
         orchard_model = Orchard(**orchard.model_dump())
         # Flush and refresh the model so its ID is available immediately
-        created_orchard_db = OrchardDataManager(self.session).create_orchard(orchard_model)
+        created_orchard_db = await OrchardDataManager(self.session).create_orchard(orchard_model)
         
         # Get the ID of the newly created orchard
         orchard_id = created_orchard_db.id
 
         # Create the corresponding roles in Keycloak
-        # These operations are asynchronous - we need to await them
-        try:
-            admin_role_name = f"Orchard-{orchard_id}-Admin"
-            viewer_role_name = f"Orchard-{orchard_id}-View"
-
-            await keycloak_admin_client.create_realm_role(admin_role_name)
-            await keycloak_admin_client.create_realm_role(viewer_role_name)
-            
-            print(f"Successfully created Keycloak roles for Orchard ID {orchard_id}: {admin_role_name}, {viewer_role_name}")
-
-        except Exception as e:
-            # Handle Keycloak API errors
-            # Might want to implement rollback strategy (delete the created orchard from DB)
-            self.session.rollback() # Rollback DB transaction if Keycloak fails
-            print(f"Failed to create Keycloak roles for Orchard ID {orchard_id}: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Orchard created but failed to create Keycloak roles: {e}"
-            )
+        # - written to the outbox in the same transaction, applied by the dispatcher after the commit
+        enqueue_orchard_roles(self.session, orchard_id, ROLE_CREATE)
 
         # Return the created orchard data
         return created_orchard_db
 
-    def update_orchard(self, orchard_id: int, orchard: UpdateOrchardSchema):
+    async def create_orchards(self, orchards: list[CreateOrchardSchema]) -> list[OrchardBulkResultSchema]:
+        created_orchards_db = await OrchardDataManager(self.session).create_orchards(
+            [orchard.model_dump() for orchard in orchards]
+        )
+
+        # Roles of every orchard - committed by the session dependency together with the orchards,
+        # the dispatcher is woken by the commit and applies them KEYCLOAK_OUTBOX_CONCURRENCY at a time
+        for orchard in created_orchards_db:
+            enqueue_orchard_roles(self.session, orchard.id, ROLE_CREATE)
+
+        return [OrchardBulkResultSchema(orchard=orchard, roles_status="pending") for orchard in created_orchards_db]
+
+    async def update_orchard(self, orchard_id: int, orchard: UpdateOrchardSchema):
         orchard_model = Orchard(**orchard.model_dump())
-        return OrchardDataManager(self.session).update_orchard(orchard_id, orchard_model)
+        return await OrchardDataManager(self.session).update_orchard(orchard_id, orchard_model)
     
     async def delete_orchard(self, orchard_id: int) -> OrchardSchema:
         # Delete the orchard from the database
-        deleted_orchard_db = OrchardDataManager(self.session).delete_orchard(orchard_id)
+        deleted_orchard_db = await OrchardDataManager(self.session).delete_orchard(orchard_id)
 
-        # Try to delete the corresponding roles in Keycloak
-        # These operations are asynchronous - we need to await them
-        try:
-            admin_role_name = f"Orchard-{orchard_id}-Admin"
-            viewer_role_name = f"Orchard-{orchard_id}-View"
-
-            await keycloak_admin_client.delete_realm_role(admin_role_name)
-            await keycloak_admin_client.delete_realm_role(viewer_role_name)
-            
-            print(f"Successfully deleted Keycloak roles for Orchard ID {orchard_id}: {admin_role_name}, {viewer_role_name}")
-
-        except Exception as e:
-            # Handle Keycloak API errors
-            # Might want to implement rollback strategy (Orchard deleted from DB, but Keycloak role deletion fails)
-            print(f"Warning: Failed to delete Keycloak roles for Orchard ID {orchard_id}: {e}")
-            # If you want the API call to fail with a 500 if Keycloak deletion fails:
-            # raise HTTPException(
-            #     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            #     detail=f"Orchard deleted from DB but failed to delete Keycloak roles: {e}"
-            # )
+        # Delete the corresponding roles in Keycloak
+        # - written to the outbox in the same transaction, applied by the dispatcher after the commit
+        enqueue_orchard_roles(self.session, orchard_id, ROLE_DELETE)
 
         return deleted_orchard_db
 
@@ -100,11 +85,11 @@ class OrchardService(BaseService):
 class OrchardDataManager(BaseDataManager):
 
     @staticmethod
-    def _prepare_payload(model):
-        return OrchardSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return OrchardSchema.model_validate({**model.__dict__, **submodel_ids})
     
     # Filters based on user permissions
-    def get_orchard_mastertable(self, permissions: UserOrchardPermissions) -> list[OrchardSchema]:
+    async def get_orchard_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None) -> list[OrchardSchema]:
         query = select(Orchard)
 
         # If not a global admin, only retrieve orchards the user has view access to
@@ -114,44 +99,60 @@ class OrchardDataManager(BaseDataManager):
             if not permissions.allowed_view_orchard_ids:
                 return []
             
-            query = query.where(Orchard.id.in_(list(permissions.allowed_view_orchard_ids))) # .in_() converts set to list 
+            query = query.where(self._in_orchards(Orchard.id, permissions.view_orchard_ids_array))
+
+        query = self._paginate(query, Orchard.id, pagination)
 
-        model_list = self.session.scalars(query).all()
-        return [self._prepare_payload(model) for model in model_list]
+        model_list = (await self.session.scalars(query)).all()
+        submodel_ids = await self._get_submodel_ids(Orchard, query.with_only_columns(Orchard.id))
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
 
-    def get_orchard(self, orchard_id: int) -> OrchardSchema:
-        model = self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
+    async def get_orchard(self, orchard_id: int) -> OrchardSchema:
+        model = await self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
 
         if not model:
             raise HTTPException(404, f"{orchard_id=} not found")
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Orchard, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def create_orchard(self, orchard: Orchard) -> OrchardSchema:
+    async def create_orchard(self, orchard: Orchard) -> OrchardSchema:
 
         self.session.add(orchard)
-        self.session.flush()
+        await self.session.flush()
 
         # Refresh the 'orchard' object
         # - loads the newly generated ID from the database back into the 'orchard' object 
-        self.session.refresh(orchard) 
+        await self.session.refresh(orchard) 
 
-        return self._prepare_payload(orchard)
+        submodel_ids = await self._get_submodel_ids(Orchard, [orchard.id])
+        return self._prepare_payload(orchard, submodel_ids[orchard.id])
 
-    def update_orchard(self, orchard_id: int, orchard: Orchard) -> OrchardSchema:
-        model = self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
+    async def create_orchards(self, orchards: list[dict]) -> list[OrchardSchema]:
+        # One INSERT ... VALUES (...), (...) RETURNING statement, rows in the order of the parameters
+        models = (await self.session.scalars(
+            insert(Orchard).returning(Orchard, sort_by_parameter_order=True), orchards
+        )).all()
+
+        # New orchards have no trees yet
+        return [self._prepare_payload(model, {"trees": []}) for model in models]
+
+    async def update_orchard(self, orchard_id: int, orchard: Orchard) -> OrchardSchema:
+        model = await self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
 
         if not model:
             raise HTTPException(404, f"{orchard_id=} not found")
         model.update(orchard)
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Orchard, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def delete_orchard(self, orchard_id: int) -> OrchardSchema:
-        model = self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
+    async def delete_orchard(self, orchard_id: int) -> OrchardSchema:
+        model = await self.session.scalar(select(Orchard).where(Orchard.id == orchard_id))
 
         if not model:
             raise HTTPException(404, f"{orchard_id=} not found")
 
-        self.session.delete(model)
+        await self.session.delete(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Orchard, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
@@ -1,12 +1,13 @@
 from sqlalchemy import select
 from fastapi import HTTPException
-from typing import List 
+from typing import AsyncIterator, List
 
 from app.models.orchard import Spraying, Tree
 from app.schemas import CreateSprayingSchema, UpdateSprayingSchema, SprayingSchema
 from .base_service import BaseService, BaseDataManager
 
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.schemas.pagination import PaginationParams
 
 """
 get_spraying, create_spraying, update_spraying, delete_spraying
@@ -18,61 +19,102 @@ get_spraying_mastertable
 
 class SprayingService(BaseService):
 
-    def get_spraying_mastertable(self, permissions: UserOrchardPermissions) -> List[SprayingSchema]:
-        return SprayingDataManager(self.session).get_spraying_mastertable(permissions)
+    async def get_spraying_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None, fields: list[str] | None = None) -> List[SprayingSchema] | list[dict]:
+        return await SprayingDataManager(self.session).get_spraying_mastertable(permissions, pagination, fields)
 
-    def get_spraying(self, spraying_id: int):
-        return SprayingDataManager(self.session).get_spraying(spraying_id)
+    async def stream_spraying_mastertable(self, permissions: UserOrchardPermissions, fields: list[str] | None = None) -> AsyncIterator[list]:
+        async for batch in SprayingDataManager(self.session).stream_spraying_mastertable(permissions, fields):
+            yield batch
 
-    def create_spraying(self, spraying: CreateSprayingSchema):
+    async def get_spraying(self, spraying_id: int, fields: list[str] | None = None):
+        return await SprayingDataManager(self.session).get_spraying(spraying_id, fields)
+
+    async def create_spraying(self, spraying: CreateSprayingSchema):
         spraying_model = Spraying(**spraying.model_dump())
-        return SprayingDataManager(self.session).create_spraying(spraying_model)
+        return await SprayingDataManager(self.session).create_spraying(spraying_model)
     
-    def update_spraying(self, spraying_id: int, spraying: UpdateSprayingSchema):
-        return SprayingDataManager(self.session).update_spraying(spraying_id, spraying)
+    async def update_spraying(self, spraying_id: int, spraying: UpdateSprayingSchema):
+        return await SprayingDataManager(self.session).update_spraying(spraying_id, spraying)
 
-    def delete_spraying(self, spraying_id: int):
-        return SprayingDataManager(self.session).delete_spraying(spraying_id)
+    async def delete_spraying(self, spraying_id: int):
+        return await SprayingDataManager(self.session).delete_spraying(spraying_id)
 
 
 class SprayingDataManager(BaseDataManager):
 
     @staticmethod
-    def _prepare_payload(model):
-        return SprayingSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return SprayingSchema.model_validate({**model.__dict__, **submodel_ids})
     
-    # New method for mastertable
-    # Filters based on user permissions
-    def get_spraying_mastertable(self, permissions: UserOrchardPermissions) -> List[SprayingSchema]:
+    # Mastertable query filtered based on user permissions, None if nothing is visible
+    @classmethod
+    def _mastertable_query(cls, permissions: UserOrchardPermissions):
         query = select(Spraying).join(Tree, Spraying.tree_id == Tree.id) # Join with Tree
 
         # If not a global admin, only retrieve trees from orchards the user has view access to
         if not permissions.is_global_admin:
 
-            # If user has no specific orchard view permissions, return an empty list
+            # If user has no specific orchard view permissions, there is nothing to return
             if not permissions.allowed_view_orchard_ids:
-                return [] 
+                return None
             
-            query = query.where(Tree.orchard_id.in_(permissions.allowed_view_orchard_ids))
+            query = query.where(cls._in_orchards(Tree.orchard_id, permissions.view_orchard_ids_array))
+
+        return query
+
+    # New method for mastertable
+    # Filters based on user permissions
+    async def get_spraying_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None, fields: list[str] | None = None) -> List[SprayingSchema] | list[dict]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return []
         
-        model_list = self.session.scalars(query).all()
+        query = self._paginate(query, Spraying.id, pagination)
+
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            return await self._get_projected(Spraying, SprayingSchema, query, fields)
+
+        model_list = (await self.session.scalars(query)).all()
         
-        return [self._prepare_payload(model) for model in model_list]
+        submodel_ids = await self._get_submodel_ids(Spraying, query.with_only_columns(Spraying.id))
+        
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
+
+    # Streaming mode of the mastertable - batches read with a server-side cursor
+    async def stream_spraying_mastertable(self, permissions: UserOrchardPermissions, fields: list[str] | None = None) -> AsyncIterator[list]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return
+
+        async for batch in self._stream_payloads(Spraying, SprayingSchema, query, fields):
+            yield batch
+
+    async def get_spraying(self, spraying_id: int, fields: list[str] | None = None) -> SprayingSchema | dict:
+        query = select(Spraying).where(Spraying.id == spraying_id)
+
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            items = await self._get_projected(Spraying, SprayingSchema, query, fields)
+            if not items:
+                raise HTTPException(404, f"{spraying_id=} not found")
+            return items[0]
 
-    def get_spraying(self, spraying_id: int) -> SprayingSchema:
-        model = self.session.scalar(select(Spraying).where(Spraying.id == spraying_id))
+        model = await self.session.scalar(query)
         if not model:
             raise HTTPException(404, f"{spraying_id=} not found")
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Spraying, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def create_spraying(self, spraying: Spraying) -> SprayingSchema:
+    async def create_spraying(self, spraying: Spraying) -> SprayingSchema:
         self.session.add(spraying)
-        self.session.flush()
-        self.session.refresh(spraying)
-        return self._prepare_payload(spraying)
+        await self.session.flush()
+        await self.session.refresh(spraying)
+        submodel_ids = await self._get_submodel_ids(Spraying, [spraying.id])
+        return self._prepare_payload(spraying, submodel_ids[spraying.id])
     
-    def update_spraying(self, spraying_id: int, spraying: UpdateSprayingSchema) -> SprayingSchema:
-        model = self.session.scalar(select(Spraying).where(Spraying.id == spraying_id))
+    async def update_spraying(self, spraying_id: int, spraying: UpdateSprayingSchema) -> SprayingSchema:
+        model = await self.session.scalar(select(Spraying).where(Spraying.id == spraying_id))
 
         if not model:
             raise HTTPException(404, f"{spraying_id=} not found")
@@ -88,14 +130,16 @@ class SprayingDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Spraying, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def delete_spraying(self, spraying_id: int) -> SprayingSchema:
-        model = self.session.scalar(select(Spraying).where(Spraying.id == spraying_id))
+    async def delete_spraying(self, spraying_id: int) -> SprayingSchema:
+        model = await self.session.scalar(select(Spraying).where(Spraying.id == spraying_id))
         if not model:
             raise HTTPException(404, f"{spraying_id=} not found")
-        self.session.delete(model)
-        return self._prepare_payload(model)
+        await self.session.delete(model)
+        submodel_ids = await self._get_submodel_ids(Spraying, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
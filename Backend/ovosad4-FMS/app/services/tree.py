@@ -1,11 +1,13 @@
 from sqlalchemy import select
 from fastapi import HTTPException
+from typing import AsyncIterator
 
 from app.models.orchard import Tree
 from app.schemas import TreeSchema, CreateTreeSchema, UpdateTreeSchema
 from .base_service import BaseService, BaseDataManager
 
 from app.schemas.user_permissions import UserOrchardPermissions
+from app.schemas.pagination import PaginationParams
 
 """
 get_tree, create_tree, update_tree, delete_tree
@@ -16,63 +18,102 @@ get_tree_mastertable
 """
 class TreeService(BaseService):
     
-    def get_tree_mastertable(self, permissions: UserOrchardPermissions) -> list[TreeSchema]:
-        return TreeDataManager(self.session).get_tree_mastertable(permissions)
+    async def get_tree_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None, fields: list[str] | None = None) -> list[TreeSchema] | list[dict]:
+        return await TreeDataManager(self.session).get_tree_mastertable(permissions, pagination, fields)
 
-    def get_tree(self, tree_id: int):
-        return TreeDataManager(self.session).get_tree(tree_id)
+    async def stream_tree_mastertable(self, permissions: UserOrchardPermissions, fields: list[str] | None = None) -> AsyncIterator[list]:
+        async for batch in TreeDataManager(self.session).stream_tree_mastertable(permissions, fields):
+            yield batch
 
-    def create_tree(self, tree: CreateTreeSchema):
+    async def get_tree(self, tree_id: int, fields: list[str] | None = None):
+        return await TreeDataManager(self.session).get_tree(tree_id, fields)
+
+    async def create_tree(self, tree: CreateTreeSchema):
         tree_model = Tree(**tree.model_dump())
-        return TreeDataManager(self.session).create_tree(tree_model)
+        return await TreeDataManager(self.session).create_tree(tree_model)
 
-    def update_tree(self, tree_id: int, tree: UpdateTreeSchema):
-        return TreeDataManager(self.session).update_tree(tree_id, tree)
+    async def update_tree(self, tree_id: int, tree: UpdateTreeSchema):
+        return await TreeDataManager(self.session).update_tree(tree_id, tree)
 
-    def delete_tree(self, tree_id: int):
-        return TreeDataManager(self.session).delete_tree(tree_id)
+    async def delete_tree(self, tree_id: int):
+        return await TreeDataManager(self.session).delete_tree(tree_id)
 
 
 class TreeDataManager(BaseDataManager):
 
     @staticmethod
-    def _prepare_payload(model):
-        return TreeSchema.model_validate({**model.__dict__, **model.submodel_ids})
+    def _prepare_payload(model, submodel_ids):
+        return TreeSchema.model_validate({**model.__dict__, **submodel_ids})
 
-    # Filters based on user permissions
-    def get_tree_mastertable(self, permissions: UserOrchardPermissions) -> list[TreeSchema]:
+    # Mastertable query filtered based on user permissions, None if nothing is visible
+    @classmethod
+    def _mastertable_query(cls, permissions: UserOrchardPermissions):
         query = select(Tree)
 
         # If not a global admin, only retrieve trees from orchards the user has view access to
         if not permissions.is_global_admin:
 
-            # If user has no specific orchard view permissions, return an empty list
+            # If user has no specific orchard view permissions, there is nothing to return
             if not permissions.allowed_view_orchard_ids:
-                return []
+                return None
+
+            query = query.where(cls._in_orchards(Tree.orchard_id, permissions.view_orchard_ids_array))
+
+        return query
+
+    # Filters based on user permissions
+    async def get_tree_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None, fields: list[str] | None = None) -> list[TreeSchema] | list[dict]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return []
+
+        query = self._paginate(query, Tree.id, pagination)
+
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            return await self._get_projected(Tree, TreeSchema, query, fields)
+
+        model_list = (await self.session.scalars(query)).all()
+        submodel_ids = await self._get_submodel_ids(Tree, query.with_only_columns(Tree.id))
+        return [self._prepare_payload(model, submodel_ids[model.id]) for model in model_list]
+
+    # Streaming mode of the mastertable - batches read with a server-side cursor
+    async def stream_tree_mastertable(self, permissions: UserOrchardPermissions, fields: list[str] | None = None) -> AsyncIterator[list]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return
 
-            query = query.where(Tree.orchard_id.in_(list(permissions.allowed_view_orchard_ids)))
+        async for batch in self._stream_payloads(Tree, TreeSchema, query, fields):
+            yield batch
 
-        model_list = self.session.scalars(query).all()
-        return [self._prepare_payload(model) for model in model_list]
+    async def get_tree(self, tree_id: int, fields: list[str] | None = None) -> TreeSchema | dict:
+        query = select(Tree).where(Tree.id == tree_id)
 
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            items = await self._get_projected(Tree, TreeSchema, query, fields)
+            if not items:
+                raise HTTPException(404, f"{tree_id=} not found")
+            return items[0]
 
-    def get_tree(self, tree_id: int) -> TreeSchema:
-        model = self.session.scalar(select(Tree).where(Tree.id == tree_id))
+        model = await self.session.scalar(query)
 
         if not model:
             raise HTTPException(404, f"{tree_id=} not found")
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Tree, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def create_tree(self, tree: Tree) -> TreeSchema:
+    async def create_tree(self, tree: Tree) -> TreeSchema:
 
         self.session.add(tree)
-        self.session.flush()
+        await self.session.flush()
 
-        return self._prepare_payload(tree)
+        submodel_ids = await self._get_submodel_ids(Tree, [tree.id])
+        return self._prepare_payload(tree, submodel_ids[tree.id])
 
-    def update_tree(self, tree_id: int, tree: UpdateTreeSchema) -> TreeSchema:
-        model = self.session.scalar(select(Tree).where(Tree.id == tree_id))
+    async def update_tree(self, tree_id: int, tree: UpdateTreeSchema) -> TreeSchema:
+        model = await self.session.scalar(select(Tree).where(Tree.id == tree_id))
 
         if not model:
             raise HTTPException(404, f"{tree_id=} not found")
@@ -88,17 +129,19 @@ class TreeDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Tree, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
 
-    def delete_tree(self, tree_id: int) -> TreeSchema:
-        model = self.session.scalar(select(Tree).where(Tree.id == tree_id))
+    async def delete_tree(self, tree_id: int) -> TreeSchema:
+        model = await self.session.scalar(select(Tree).where(Tree.id == tree_id))
 
         if not model:
             raise HTTPException(404, f"{tree_id=} not found")
 
-        self.session.delete(model)
+        await self.session.delete(model)
 
-        return self._prepare_payload(model)
+        submodel_ids = await self._get_submodel_ids(Tree, [model.id])
+        return self._prepare_payload(model, submodel_ids[model.id])
@@ -12,35 +12,44 @@ get_tree_data, create_tree_data, update_tree_data, delete_tree_data
 
 class TreeDataService(BaseService):
 
-    def get_tree_data(self, tree_data_id: int):
-        return TreeDataDataManager(self.session).get_tree_data(tree_data_id)
+    async def get_tree_data(self, tree_data_id: int, fields: list[str] | None = None):
+        return await TreeDataDataManager(self.session).get_tree_data(tree_data_id, fields)
 
-    def create_tree_data(self, tree_data: CreateTreeDataSchema):
+    async def create_tree_data(self, tree_data: CreateTreeDataSchema):
         tree_data_model = TreeData(**tree_data.model_dump())
-        return TreeDataDataManager(self.session).create_tree_data(tree_data_model)
+        return await TreeDataDataManager(self.session).create_tree_data(tree_data_model)
     
-    def update_tree_data(self, tree_data_id: int, tree_data: UpdateTreeDataSchema):
-        return TreeDataDataManager(self.session).update_tree_data(tree_data_id, tree_data)
+    async def update_tree_data(self, tree_data_id: int, tree_data: UpdateTreeDataSchema):
+        return await TreeDataDataManager(self.session).update_tree_data(tree_data_id, tree_data)
 
-    def delete_tree_data(self, tree_data_id: int):
-        return TreeDataDataManager(self.session).delete_tree_data(tree_data_id)
+    async def delete_tree_data(self, tree_data_id: int):
+        return await TreeDataDataManager(self.session).delete_tree_data(tree_data_id)
 
 class TreeDataDataManager(BaseDataManager):
 
-    def get_tree_data(self, tree_data_id: int) -> TreeDataSchema:
-        model = self.session.scalar(select(TreeData).where(TreeData.id == tree_data_id))
+    async def get_tree_data(self, tree_data_id: int, fields: list[str] | None = None) -> TreeDataSchema | dict:
+        query = select(TreeData).where(TreeData.id == tree_data_id)
+
+        # Sparse fieldset - only the requested columns
+        if fields is not None:
+            items = await self._get_projected(TreeData, TreeDataSchema, query, fields)
+            if not items:
+                raise HTTPException(404, f"{tree_data_id=} not found")
+            return items[0]
+
+        model = await self.session.scalar(query)
         if not model:
             raise HTTPException(404, f"{tree_data_id=} not found")
         return TreeDataSchema.model_validate(model)
 
-    def create_tree_data(self, tree_data: TreeData) -> TreeDataSchema:
+    async def create_tree_data(self, tree_data: TreeData) -> TreeDataSchema:
         self.session.add(tree_data)
-        self.session.flush()
-        self.session.refresh(tree_data)
+        await self.session.flush()
+        await self.session.refresh(tree_data)
         return TreeDataSchema.model_validate(tree_data)
     
-    def update_tree_data(self, tree_data_id: int, tree_data: UpdateTreeDataSchema) -> TreeDataSchema:
-        model = self.session.scalar(select(TreeData).where(TreeData.id == tree_data_id))
+    async def update_tree_data(self, tree_data_id: int, tree_data: UpdateTreeDataSchema) -> TreeDataSchema:
+        model = await self.session.scalar(select(TreeData).where(TreeData.id == tree_data_id))
 
         if not model:
             raise HTTPException(404, f"{tree_data_id=} not found")
@@ -56,14 +65,14 @@ class TreeDataDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
         return TreeDataSchema.model_validate(model)
 
-    def delete_tree_data(self, tree_data_id: int) -> TreeDataSchema:
-        model = self.session.scalar(select(TreeData).where(TreeData.id == tree_data_id))
+    async def delete_tree_data(self, tree_data_id: int) -> TreeDataSchema:
+        model = await self.session.scalar(select(TreeData).where(TreeData.id == tree_data_id))
         if not model:
             raise HTTPException(404, f"{tree_data_id=} not found")
-        self.session.delete(model)
+        await self.session.delete(model)
         return TreeDataSchema.model_validate(model)
@@ -1,4 +1,5 @@
 import sqlalchemy.exc
+from typing import AsyncIterator
 from sqlalchemy import select
 from fastapi import HTTPException
 
@@ -7,6 +8,8 @@ from app.models.orchard import TreeImage, Tree
 from app.schemas import TreeImageSchema, UserOrchardPermissions
 from .base_service import BaseService, BaseDataManager
 
+from app.schemas.pagination import PaginationParams
+
 """
 get_tree_image, create_tree_image, update_tree_image, delete_tree_image
 - their authorization is handled by the dependencies in the router
@@ -16,13 +19,17 @@ get_tree_image_mastertable
 """
 class TreeImageService(BaseService):
 
-    def get_tree_image_mastertable(self, permissions: UserOrchardPermissions):
-        return TreeImageDataManager(self.session).get_tree_image_mastertable(permissions)
+    async def get_tree_image_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None):
+        return await TreeImageDataManager(self.session).get_tree_image_mastertable(permissions, pagination)
+
+    async def stream_tree_image_mastertable(self, permissions: UserOrchardPermissions) -> AsyncIterator[list]:
+        async for batch in TreeImageDataManager(self.session).stream_tree_image_mastertable(permissions):
+            yield batch
 
-    def get_tree_image(self, tree_image_id: int):
-        return TreeImageDataManager(self.session).get_tree_image(tree_image_id)
+    async def get_tree_image(self, tree_image_id: int):
+        return await TreeImageDataManager(self.session).get_tree_image(tree_image_id)
 
-    def create_tree_image(self, tree_image: CreateTreeImageSchema):
+    async def create_tree_image(self, tree_image: CreateTreeImageSchema):
 
         tree_image_model = TreeImage(
             tree_id=tree_image.tree_id,
@@ -30,31 +37,42 @@ class TreeImageService(BaseService):
             note=tree_image.note,
         )
 
-        return TreeImageDataManager(self.session).create_tree_image(tree_image_model)
+        return await TreeImageDataManager(self.session).create_tree_image(tree_image_model)
     
-    def update_tree_image(self, tree_image_id: int, tree_image: UpdateTreeImageSchema) -> TreeImageSchema:
-        return TreeImageDataManager(self.session).update_tree_image(tree_image_id, tree_image)
+    async def update_tree_image(self, tree_image_id: int, tree_image: UpdateTreeImageSchema) -> TreeImageSchema:
+        return await TreeImageDataManager(self.session).update_tree_image(tree_image_id, tree_image)
 
-    def delete_tree_image(self, tree_image_id: int):
-        return TreeImageDataManager(self.session).delete_tree_image(tree_image_id)
+    async def delete_tree_image(self, tree_image_id: int):
+        return await TreeImageDataManager(self.session).delete_tree_image(tree_image_id)
 
 
 class TreeImageDataManager(BaseDataManager):
     
-    # Filters based on user permissions
-    def get_tree_image_mastertable(self, permissions: UserOrchardPermissions) -> list[TreeImageSchema]:
+    # Mastertable query filtered based on user permissions, None if nothing is visible
+    @classmethod
+    def _mastertable_query(cls, permissions: UserOrchardPermissions):
         query = select(TreeImage)
 
         # If not a global admin, only retrieve trees from orchards the user has view access to
         if not permissions.is_global_admin:
 
-            # If user has no specific orchard view permissions, return an empty list
+            # If user has no specific orchard view permissions, there is nothing to return
             if not permissions.allowed_view_orchard_ids:
-                return []
+                return None
             
-            query = query.join(Tree).where(Tree.orchard_id.in_(permissions.allowed_view_orchard_ids))
+            query = query.join(Tree).where(cls._in_orchards(Tree.orchard_id, permissions.view_orchard_ids_array))
 
-        model_list = self.session.scalars(query).all()
+        return query
+
+    # Filters based on user permissions
+    async def get_tree_image_mastertable(self, permissions: UserOrchardPermissions, pagination: PaginationParams | None = None) -> list[TreeImageSchema]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return []
+
+        query = self._paginate(query, TreeImage.id, pagination)
+
+        model_list = (await self.session.scalars(query)).all()
 
         return [
             TreeImageSchema(
@@ -66,8 +84,17 @@ class TreeImageDataManager(BaseDataManager):
             for model in model_list
         ]
 
-    def get_tree_image(self, tree_image_id: int) -> TreeImageSchema:
-        model = self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
+    # Streaming mode of the mastertable - batches read with a server-side cursor
+    async def stream_tree_image_mastertable(self, permissions: UserOrchardPermissions) -> AsyncIterator[list]:
+        query = self._mastertable_query(permissions)
+        if query is None:
+            return
+
+        async for batch in self._stream_payloads(TreeImage, TreeImageSchema, query):
+            yield batch
+
+    async def get_tree_image(self, tree_image_id: int) -> TreeImageSchema:
+        model = await self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
 
         if not model:
             raise HTTPException(404, f"{tree_image_id=} not found")
@@ -79,11 +106,11 @@ class TreeImageDataManager(BaseDataManager):
             note=model.note,
         )
 
-    def create_tree_image(self, tree_image: TreeImage) -> TreeImageSchema:
+    async def create_tree_image(self, tree_image: TreeImage) -> TreeImageSchema:
 
         try:
             self.session.add(tree_image)
-            self.session.flush()
+            await self.session.flush()
         except sqlalchemy.exc.IntegrityError as e:
             raise HTTPException(409, f"Database integrity error tree_image with tree_id={tree_image.tree_id} and file_id={tree_image.file_id}: {e.orig}")
         return TreeImageSchema(
@@ -93,8 +120,8 @@ class TreeImageDataManager(BaseDataManager):
             note=tree_image.note,
         )
     
-    def update_tree_image(self, tree_image_id: int, tree_image: UpdateTreeImageSchema) -> TreeImageSchema:
-        model = self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
+    async def update_tree_image(self, tree_image_id: int, tree_image: UpdateTreeImageSchema) -> TreeImageSchema:
+        model = await self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
 
         if not model:
             raise HTTPException(404, f"{tree_image_id=} not found")
@@ -110,18 +137,18 @@ class TreeImageDataManager(BaseDataManager):
             setattr(model, key, value)
 
         self.session.add(model)
-        self.session.flush()
-        self.session.refresh(model)
+        await self.session.flush()
+        await self.session.refresh(model)
 
         return TreeImageSchema.model_validate(model)
 
-    def delete_tree_image(self, tree_image_id: int) -> TreeImageSchema:
-        model = self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
+    async def delete_tree_image(self, tree_image_id: int) -> TreeImageSchema:
+        model = await self.session.scalar(select(TreeImage).where(TreeImage.id == tree_image_id))
 
         if not model:
             raise HTTPException(404, f"{tree_image_id=} not found")
 
-        self.session.delete(model)
+        await self.session.delete(model)
 
         return TreeImageSchema(
             id=model.id,
@@ -0,0 +1,221 @@
+"""Before/after EXPLAIN benchmark of the c2f81d6a9b47 (add_indexes) migration.
+
+Seeds a large dataset, runs EXPLAIN ANALYZE of the queries the API runs most
+without the indexes (revision a45137925ac9) and with them (head) and prints
+the plans and execution times side by side.
+
+Run against a scratch database, never production - it migrates up and down:
+
+    POSTGRES_USER=postgres POSTGRES_PASSWORD=... POSTGRES_HOST=localhost \\
+    POSTGRES_DATABASE=benchmark python benchmarks/explain_indexes.py --trees 200000
+"""
+import argparse
+import json
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+password = os.getenv("POSTGRES_PASSWORD")
+user = os.getenv("POSTGRES_USER")
+host = os.getenv("POSTGRES_HOST", "localhost")
+port = os.getenv("POSTGRES_PORT", "5432")
+database = os.getenv("POSTGRES_DATABASE")
+
+sqlalchemy_uri = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{database}"
+
+BEFORE_REVISION = "a45137925ac9"
+AFTER_REVISION = "head"
+
+# Every table gets the columns of base_cols in the initial migration
+BASE_COLUMNS = "created_at, updated_at, active"
+BASE_VALUES = "ts, ts, true"
+
+# (name, query, parameters) - the same shapes the services and orchard_id_resolve send,
+# orchard filters bind one array like BaseDataManager._in_orchards (orchard_id = ANY(:orchard_ids))
+QUERIES = (
+    ("tree mastertable of a viewer",
+     'SELECT tree.id, tree."row", tree.number FROM tree WHERE tree.orchard_id = ANY(:orchard_ids)',
+     {"orchard_ids": [1, 2]}),
+    ("tree by position",
+     'SELECT tree.id FROM tree WHERE tree.orchard_id = 3 AND tree."row" = 7 AND tree.field = 1 AND tree.number = 12',
+     {}),
+    ("harvest ids of one tree",
+     "SELECT harvest.tree_id, harvest.id FROM harvest WHERE harvest.tree_id IN (4242) ORDER BY harvest.id",
+     {}),
+    ("harvest ids of a mastertable page",
+     "SELECT harvest.tree_id, harvest.id FROM harvest WHERE harvest.tree_id IN "
+     "(SELECT tree.id FROM tree WHERE tree.orchard_id = ANY(:orchard_ids) ORDER BY tree.id LIMIT 100) ORDER BY harvest.id",
+     {"orchard_ids": [1, 2]}),
+    ("spraying mastertable of a viewer",
+     "SELECT spraying.id FROM spraying JOIN tree ON spraying.tree_id = tree.id WHERE tree.orchard_id = ANY(:orchard_ids)",
+     {"orchard_ids": [1]}),
+    ("spraying ids of an agent",
+     "SELECT spraying.agent_id, spraying.id FROM spraying WHERE spraying.agent_id IN (3) ORDER BY spraying.id",
+     {}),
+    ("thinning ids of a spraying",
+     "SELECT fruit_thinning.spraying_id, fruit_thinning.id FROM fruit_thinning "
+     "WHERE fruit_thinning.spraying_id IN (777) ORDER BY fruit_thinning.id",
+     {}),
+    ("orchard_id of a tree_data",
+     "SELECT tree.orchard_id FROM tree_data JOIN tree ON tree.id = tree_data.tree_id WHERE tree_data.id = 5000",
+     {}),
+    ("file ids of a batch",
+     "SELECT file.file_batch_id, file.id FROM file WHERE file.file_batch_id IN (2) ORDER BY file.id",
+     {}),
+    ("harvests of one week",
+     "SELECT count(*) FROM harvest WHERE harvest.datetime BETWEEN '2020-06-01' AND '2020-06-08'",
+     {}),
+    ("sprayings updated in one day",
+     "SELECT count(*) FROM spraying WHERE spraying.updated_at BETWEEN '2020-03-01' AND '2020-03-02'",
+     {}),
+)
+
+
+def seed(connection, trees: int, orchards: int) -> None:
+    # Children per tree - harvests 5, tree_data 3, sprayings 3, thinnings 1 each
+    print(f"Seeding {orchards} orchards, {trees} trees and their records ...")
+
+    statements = (
+        f"""
+        INSERT INTO orchard (name, {BASE_COLUMNS})
+        SELECT 'orchard ' || g, {BASE_VALUES} FROM generate_series(1, {orchards}) g, LATERAL (SELECT now() ts) t
+        """,
+        f"""
+        INSERT INTO agent (name, description, {BASE_COLUMNS})
+        SELECT 'agent ' || g, '', {BASE_VALUES} FROM generate_series(1, 20) g, LATERAL (SELECT now() ts) t
+        """,
+        f"""
+        INSERT INTO file_batch (label, {BASE_COLUMNS})
+        SELECT 'batch ' || g, {BASE_VALUES} FROM generate_series(1, 200) g, LATERAL (SELECT now() ts) t
+        """,
+        # Trees of an orchard are planted in rows of 100
+        f"""
+        INSERT INTO tree (orchard_id, genotype_id, rootstock_id, "row", field, number, latitude, longitude, spacing,
+                          growth_type, training_shape, planting_date, initial_age, nursery_tree_type, {BASE_COLUMNS})
+        SELECT 1 + g % {orchards}, 1, 1, (g / {orchards}) / 100, 1, (g / {orchards}) % 100, 49.0, 16.0, 1.0,
+               '', '', '', '', '', {BASE_VALUES}
+        FROM generate_series(0, {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        # Records are written over time - datetime and updated_at grow with the id
+        f"""
+        INSERT INTO harvest (tree_id, datetime, elapsed_time, fruit_under_60mm_quantity, fruit_under_60mm_weight,
+                             fruit_under_70mm_quantity, fruit_under_70mm_weight, fruit_over_70mm_quantity,
+                             fruit_over_70mm_weight, average_fruit_weight, aphids_damage_quantity,
+                             aphids_damage_weight, damaged_percentage, {BASE_COLUMNS})
+        SELECT 1 + g % {trees}, ts, 0, 0, 0, 0, 0, 0, 0, 0.0, 0, 0, 0, {BASE_VALUES}
+        FROM generate_series(0, 5 * {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO tree_data (tree_id, datetime, one_year_height, fruiting_wood_height, total_height, trunk_girth,
+                               suckering, summer_pruning_date, winter_pruning_date, summer_pruning_note,
+                               winter_pruning_note, {BASE_COLUMNS})
+        SELECT 1 + g % {trees}, ts, 0, 0, 0, 0, 0, ts::date, ts::date, '', '', {BASE_VALUES}
+        FROM generate_series(0, 3 * {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO spraying (tree_id, agent_id, datetime, volume, {BASE_COLUMNS})
+        SELECT 1 + g % {trees}, 1 + g % 20, ts, 1.0, {BASE_VALUES}
+        FROM generate_series(0, 3 * {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO fruit_thinning (tree_id, spraying_id, datetime, mechanical, cropload_for_4, cropload_for_3,
+                                    cropload_for_1, fruit_for_thinning, fruit_thinning_time, {BASE_COLUMNS})
+        SELECT 1 + g % {trees}, 1 + g, ts, false, 0, 0, 0, 0, 0, {BASE_VALUES}
+        FROM generate_series(0, {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO flower_thinning (tree_id, spraying_id, datetime, mechanical, flower_clusters_before_thinning,
+                                     flower_clusters_for_thinning, flower_clusters_after_thinning,
+                                     flower_clusters_before_thinning_one_year, flower_clusters_for_thinning_one_year,
+                                     flower_clusters_after_thinning_one_year, {BASE_COLUMNS})
+        SELECT 1 + g % {trees}, 1 + g, ts, false, 0, 0, 0, 0, 0, 0, {BASE_VALUES}
+        FROM generate_series(0, {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO file (file_batch_id, name, datetime, mime, uid, {BASE_COLUMNS})
+        SELECT 1 + g % 200, 'image.jpg', ts, 'image/jpeg', md5(g::text), {BASE_VALUES}
+        FROM generate_series(0, {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+        f"""
+        INSERT INTO tree_image (tree_id, file_id, {BASE_COLUMNS})
+        SELECT 1 + g, 1 + g, {BASE_VALUES}
+        FROM generate_series(0, {trees} - 1) g, LATERAL (SELECT timestamp '2020-01-01' + g * interval '1 minute' ts) t
+        """,
+    )
+
+    for statement in statements:
+        connection.execute(text(statement))
+    connection.commit()
+
+
+def explain(engine) -> dict[str, tuple[float, str]]:
+    # (execution time in ms, plan node types) of every query
+    results = {}
+
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+
+        for name, query, parameters in QUERIES:
+            # Warm up the cache, then measure - arrays are sent as bound parameters like the services send them
+            connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), parameters)
+            [[plan]] = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), parameters).one()
+            results[name] = (plan["Execution Time"], plan_nodes(plan["Plan"]))
+
+    return results
+
+
+def plan_nodes(node: dict) -> str:
+    # e.g. "Sort <- Bitmap Heap Scan(harvest) <- Bitmap Index Scan(ix_harvest_tree_id)"
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f"({node['Index Name']})"
+    elif "Relation Name" in node:
+        label += f"({node['Relation Name']})"
+
+    children = [plan_nodes(child) for child in node.get("Plans", [])]
+    return " <- ".join([label, *children]) if children else label
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=200_000, help="number of seeded trees (records scale with it)")
+    parser.add_argument("--orchards", type=int, default=50, help="number of seeded orchards")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    alembic_cfg = Config(os.path.join(os.path.dirname(__file__), "..", "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "..", "alembic"))
+    engine = create_engine(sqlalchemy_uri)
+
+    command.upgrade(alembic_cfg, BEFORE_REVISION)
+    command.downgrade(alembic_cfg, BEFORE_REVISION)
+
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT count(*) FROM tree")).scalar():
+            print("Database already has trees, using the existing data")
+        else:
+            seed(connection, args.trees, args.orchards)
+
+    print("EXPLAIN without indexes ...")
+    before = explain(engine)
+
+    command.upgrade(alembic_cfg, AFTER_REVISION)
+    print("EXPLAIN with indexes ...")
+    after = explain(engine)
+
+    for name, _, _ in QUERIES:
+        before_time, before_plan = before[name]
+        after_time, after_plan = after[name]
+        print(f"\n{name}: {before_time:.2f} ms -> {after_time:.2f} ms ({before_time / max(after_time, 0.001):.1f}x)")
+        print(f"  before: {before_plan}")
+        print(f"  after:  {after_plan}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"before": before, "after": after}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
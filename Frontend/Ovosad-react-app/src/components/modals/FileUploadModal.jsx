@@ -2,7 +2,7 @@ import React, { useState, useCallback, useEffect } from "react";
 import { useDropzone } from "react-dropzone";
 import Modal from "react-modal";
 import { useKeycloak } from "../../auth/KeycloakProvider";
-import { uploadFile } from "../../services/fileService";
+import { uploadFiles } from "../../services/fileService";
 
 // STYLES
 import styles from "./FileUploadModal.module.css";
@@ -50,21 +50,19 @@ export function FileUploadModal({
       }))
     );
 
-    const uploadPromises = selectedFiles.map((file) =>
-      uploadFile(getToken, file, batchId)
-    );
-    const results = await Promise.allSettled(uploadPromises);
+    // Bulk requests, the result of every file is reported - also when a later request fails
+    const results = await uploadFiles(getToken, selectedFiles, batchId);
 
     setUploadProgress((currentProgress) =>
       currentProgress.map((progress, index) => {
         const result = results[index];
-        if (result.status === "fulfilled") {
+        if (result && !result.error) {
           return { ...progress, status: "success" };
         }
         return {
           ...progress,
           status: "error",
-          error: result.reason.message || "Upload failed",
+          error: result?.error || "Upload failed",
         };
       })
     );
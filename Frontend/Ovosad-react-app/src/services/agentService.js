@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- AGENT SERVICE ---
 
 // GET - Get all Agents (Mastertable)
 export const fetchAllAgents = (getToken) => {
-  return apiRequest(getToken, "/agent/", "GET");
+  return fetchAllPages(getToken, "/agent/");
 };
 
 // POST - Create Agent
@@ -15,6 +15,48 @@ export const apiRequest = async (
   method = "GET",
   body = null
 ) => {
+  const response = await authorizedFetch(getToken, url, method, body);
+
+  // Check if response has content to parse
+  const contentType = response.headers.get("content-type");
+  if (contentType && contentType.includes("application/json")) {
+    return response.json();
+  } else {
+    // For successful requests with no content
+    return { status: response.status, message: "Operation successful" };
+  }
+};
+
+// Response header with the cursor of the next mastertable page, missing on the last page
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+
+/**
+Fetches all items of a paginated mastertable
+  - the API returns one page per request, the X-Next-Cursor header of a page leads to the next one
+  - getToken - Function to retrieve the authentication token
+  - url - The mastertable path, e.g. "/tree/"
+  - {Promise<Array>} The items of all pages
+ */
+export const fetchAllPages = async (getToken, url) => {
+  const items = [];
+  let cursor = null;
+
+  do {
+    const separator = url.includes("?") ? "&" : "?";
+    const pageUrl = cursor
+      ? `${url}${separator}cursor=${encodeURIComponent(cursor)}`
+      : url;
+    const response = await authorizedFetch(getToken, pageUrl, "GET");
+
+    items.push(...(await response.json()));
+    cursor = response.headers.get(NEXT_CURSOR_HEADER);
+  } while (cursor);
+
+  return items;
+};
+
+// Sends the request with the access token, throws on error responses
+const authorizedFetch = async (getToken, url, method, body = null) => {
   const token = await getToken();
 
   // Check for access token
@@ -49,12 +91,5 @@ export const apiRequest = async (
     );
   }
 
-  // Check if response has content to parse
-  const contentType = response.headers.get("content-type");
-  if (contentType && contentType.includes("application/json")) {
-    return response.json();
-  } else {
-    // For successful requests with no content
-    return { status: response.status, message: "Operation successful" };
-  }
+  return response;
 };
@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- FILE BATCH SERVICE ---
 
 // GET - Get all File Batches (Mastertable)
 export const fetchAllFileBatches = (getToken) => {
-  return apiRequest(getToken, "/file_batch/", "GET");
+  return fetchAllPages(getToken, "/file_batch/");
 };
 
 // POST - Create File Batch
@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- FILE SERVICE ---
 
 // GET - Get all Files (Mastertable)
 export const fetchAllFiles = (getToken) => {
-  return apiRequest(getToken, "/file/", "GET");
+  return fetchAllPages(getToken, "/file/");
 };
 
 // // POST - Create File - wrong sends json
@@ -49,6 +49,18 @@ export const fetchImageBlob = async (getToken, id) => {
   return response.blob();
 };
 
+// Datetime of an upload in the format the API expects - %y%m%d_%H%M%S
+const formatFileDatetime = (now) => {
+  const year = now.getFullYear().toString().slice(-2);
+  const month = (now.getMonth() + 1).toString().padStart(2, "0");
+  const day = now.getDate().toString().padStart(2, "0");
+  const hours = now.getHours().toString().padStart(2, "0");
+  const minutes = now.getMinutes().toString().padStart(2, "0");
+  const seconds = now.getSeconds().toString().padStart(2, "0");
+
+  return `${year}${month}${day}_${hours}${minutes}${seconds}`;
+};
+
 // POST - File upload to specific Batch
 // - Handles multipart/form-data and sends required data as query parameters
 export const uploadFile = async (getToken, file, batchId) => {
@@ -59,15 +71,7 @@ export const uploadFile = async (getToken, file, batchId) => {
   formData.append("upload_file", file);
 
   // Construct the URL
-  const now = new Date();
-  const year = now.getFullYear().toString().slice(-2);
-  const month = (now.getMonth() + 1).toString().padStart(2, "0");
-  const day = now.getDate().toString().padStart(2, "0");
-  const hours = now.getHours().toString().padStart(2, "0");
-  const minutes = now.getMinutes().toString().padStart(2, "0");
-  const seconds = now.getSeconds().toString().padStart(2, "0");
-
-  const Datetime = `${year}${month}${day}_${hours}${minutes}${seconds}`;
+  const Datetime = formatFileDatetime(new Date());
 
   const url = `/api/v1/file/?file_batch_id=${batchId}&file_datetime=${Datetime}`;
 
@@ -89,3 +93,64 @@ export const uploadFile = async (getToken, file, batchId) => {
 
   return response.json();
 };
+
+// POST - Upload many files to a specific Batch
+// - one request per BULK_UPLOAD_SIZE files, the API answers with a result per file
+// - returns [{ name, status_code, file, error }] in the order of the files, never throws -
+//   when a request fails its files and the files of the later requests get an error,
+//   the files of the earlier requests keep their results (they are stored)
+const BULK_UPLOAD_SIZE = 50;
+
+export const uploadFiles = async (getToken, files, batchId) => {
+  const results = [];
+
+  for (let start = 0; start < files.length; start += BULK_UPLOAD_SIZE) {
+    const chunk = files.slice(start, start + BULK_UPLOAD_SIZE);
+
+    try {
+      results.push(...(await uploadFileChunk(getToken, chunk, batchId)));
+    } catch (error) {
+      const message = error.message || "Upload failed";
+      files.slice(start).forEach((file, index) => {
+        results.push({
+          name: file.name,
+          error:
+            index < chunk.length
+              ? message
+              : `Not uploaded, an earlier request failed: ${message}`,
+        });
+      });
+      break;
+    }
+  }
+
+  return results;
+};
+
+const uploadFileChunk = async (getToken, files, batchId) => {
+  const token = await getToken();
+  const formData = new FormData();
+
+  // The API expects the files under the key 'upload_files'
+  files.forEach((file) => formData.append("upload_files", file));
+
+  const url = `/api/v1/file/bulk?file_batch_id=${batchId}&file_datetime=${formatFileDatetime(new Date())}`;
+
+  const response = await fetch(url, {
+    method: "POST",
+    headers: {
+      Authorization: `Bearer ${token}`,
+      // 'Content-Type' - browser handles it for multipart/form-data.
+    },
+    body: formData,
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(
+      errorData.detail || `Failed to upload files: ${response.statusText}`
+    );
+  }
+
+  return response.json();
+};
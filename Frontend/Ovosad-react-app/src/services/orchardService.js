@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- ORCHARD SERVICE ---
 
 // GET - ORCHARD MASTERTABLE
 export const fetchOrchards = (getToken) => {
-  return apiRequest(getToken, "/orchard/", "GET");
+  return fetchAllPages(getToken, "/orchard/");
 };
 
 // GET - ORCHARD BY ID
@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- SPRAYING SERVICE ---
 
 // GET - Get all Sprayings (Mastertable)
 export const fetchAllSprayings = (getToken) => {
-  return apiRequest(getToken, "/spraying/", "GET");
+  return fetchAllPages(getToken, "/spraying/");
 };
 
 // GET - Get Sprayings by list of IDs
@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- TREE IMAGE SERVICE ---
 
 // GET - Get all Tree Images (Mastertable)
 export const fetchAllTreeImages = (getToken) => {
-  return apiRequest(getToken, "/tree_image/", "GET");
+  return fetchAllPages(getToken, "/tree_image/");
 };
 
 // POST - Create Tree Image
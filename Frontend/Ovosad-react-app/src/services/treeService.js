@@ -1,10 +1,10 @@
-import { apiRequest } from "./baseService";
+import { apiRequest, fetchAllPages } from "./baseService";
 
 // --- TREE SERVICE ---
 
 // GET - TREE MASTERTABLE
 export const fetchTrees = (getToken) => {
-  return apiRequest(getToken, "/tree/", "GET");
+  return fetchAllPages(getToken, "/tree/");
 };
 
 // POST - CREATE TREE
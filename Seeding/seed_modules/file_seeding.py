@@ -1,7 +1,8 @@
 import httpx
 import os
 import pathlib
-from typing import List
+from typing import Dict, List
+from collections import defaultdict
 from datetime import datetime, timezone
 import random
 import mimetypes
@@ -35,6 +36,9 @@ async def post_initial_files(
 
     created_file_ids: List[int] = []
 
+    # Randomly assign every file to a file_batch_id - one bulk upload per batch
+    files_by_batch: Dict[int, List[pathlib.Path]] = defaultdict(list)
+
     for filename in IMAGE_FILENAMES:
         file_path = FILE_STORAGE_DIR / filename
         
@@ -42,44 +46,48 @@ async def post_initial_files(
             print(f"Warning: File not found at '{file_path}'. Skipping this file")
             continue
 
-        # Randomly select a file_batch_id
-        file_batch_id = random.choice(created_file_batch_ids)
+        files_by_batch[random.choice(created_file_batch_ids)].append(file_path)
+
+    for file_batch_id, file_paths in files_by_batch.items():
 
         # Get current datetime and format it
         file_datetime_obj = datetime.now(timezone.utc)
         file_datetime_str = file_datetime_obj.strftime("%y%m%d_%H%M%S")
 
-        # Infer MIME type
-        mime_type, _ = mimetypes.guess_type(str(file_path))
-        if mime_type is None:
-            mime_type = 'application/octet-stream'
-
         try:
-            # Open the file in binary mode for upload
-            with open(file_path, "rb") as f:
-                file_content = f.read()
+            files_payload = []
+            for file_path in file_paths:
+                # Infer MIME type
+                mime_type, _ = mimetypes.guess_type(str(file_path))
+                if mime_type is None:
+                    mime_type = 'application/octet-stream'
+
+                # Open the file in binary mode for upload
+                with open(file_path, "rb") as f:
+                    files_payload.append(('upload_files', (file_path.name, f.read(), mime_type)))
+
+            # Construct the URL with query parameters
+            url = f"{fastapi_api_prefix}/file/bulk?file_batch_id={file_batch_id}&file_datetime={file_datetime_str}"
 
-                files_payload = {
-                    'upload_file': (filename, file_content, mime_type)
-                }
+            response = await client.post(url, files=files_payload)
+            response.raise_for_status()
 
-                # Construct the URL with query parameters
-                url = f"{fastapi_api_prefix}/file/?file_batch_id={file_batch_id}&file_datetime={file_datetime_str}"
-                
-                response = await client.post(url, files=files_payload)
-                response.raise_for_status() 
-                created_file = response.json()
-                created_file_ids.append(created_file['id'])
-                # print(f"Successfully uploaded file '{filename}' (ID: {created_file['id']}) to Batch ID: {file_batch_id}")
+            # Result per file
+            for result in response.json():
+                if result['error']:
+                    print(f"ERROR posting File '{result['name']}': {result['status_code']} - {result['error']}")
+                    continue
+                created_file_ids.append(result['file']['id'])
+                # print(f"Successfully uploaded file '{result['name']}' (ID: {result['file']['id']}) to Batch ID: {file_batch_id}")
 
         except httpx.HTTPStatusError as e:
-            print(f"ERROR posting File '{filename}': {e.response.status_code} - {e.response.text}")
+            print(f"ERROR posting Files to Batch ID {file_batch_id}: {e.response.status_code} - {e.response.text}")
             raise 
         except httpx.RequestError as e:
-            print(f"ERROR network issue posting File '{filename}': {e}")
+            print(f"ERROR network issue posting Files to Batch ID {file_batch_id}: {e}")
             raise
         except IOError as e:
-            print(f"ERROR reading file '{file_path}': {e}")
+            print(f"ERROR reading files: {e}")
             raise
     
     print(f"--- Files seeding complete ---")